@@ -0,0 +1,99 @@
+"""
+Bytes per live object for the core models, measured with tracemalloc:
+
+    python -m benchmarks.memory [count] [revision]
+
+Each figure is everything allocated while building count objects (stats,
+caches and all, but not shared things like the weapon wielded), divided
+by count.
+
+Given a git revision, the same objects are measured with dnd5e as it was
+at that revision as well, side by side. To see what __slots__ saved,
+compare against the models from before they had any:
+
+    python -m benchmarks.memory 100000 "$(git log --format=%h -1 \\
+        --grep='Use __slots__')^"
+"""
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from dnd5e import Character, roll_dice
+from dnd5e.characters import AttackResult, CharacterStat, HitType
+from dnd5e.items import Armor, ArmorType, Weapon, WeaponDamageType
+from dnd5e.srd_weapons import longsword
+
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bytes_per_object(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Don't charge the objects for the list holding them.
+    return (after - before - sys.getsizeof(objects)) / len(objects)
+
+
+def measure(count):
+    """Bytes per object of each model, by name."""
+    hit_dice = roll_dice('5d8')
+    target = Character('target')
+    attack_roll = roll_dice('1d20') + 5
+
+    builders = {
+        'Character': lambda i: Character('hero', 'human', 'fighter',
+                                         level=5, hit_dice=hit_dice,
+                                         str_score=16),
+        'CharacterStat': lambda i: CharacterStat('Strength', 16, 1),
+        'AttackResult': lambda i: AttackResult(
+            HitType.FULL, 9, attack_roll, 3, 2, target=target,
+            attack_with=longsword),
+        'Armor': lambda i: Armor('Half plate', 15, ArmorType.MEDIUM),
+        'Weapon': lambda i: Weapon('Longsword', '1d8', '1d10',
+                                   WeaponDamageType.SLASHING,
+                                   versatile=True),
+    }
+    return {name: bytes_per_object(build, count)
+            for name, build in builders.items()}
+
+
+def measure_revision(count, revision):
+    """measure(count) in a fresh process, with dnd5e as of revision."""
+    with tempfile.TemporaryDirectory() as checkout:
+        archive = subprocess.run(['git', 'archive', revision, 'dnd5e'],
+                                 cwd=REPO, check=True,
+                                 stdout=subprocess.PIPE).stdout
+        subprocess.run(['tar', '-x', '-C', checkout], input=archive,
+                       check=True)
+        # The old dnd5e comes first on the path, this module after it.
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import json, benchmarks.memory as m; '
+             'print(json.dumps(m.measure(%i)))' % count],
+            cwd=checkout, check=True, stdout=subprocess.PIPE,
+            env=dict(os.environ, PYTHONPATH=REPO)).stdout
+    return json.loads(output)
+
+
+def main(count=100000, revision=None):
+    current = measure(count)
+    if revision is None:
+        for name, size in current.items():
+            print('%-14s %8.1f bytes' % (name, size))
+        return
+    baseline = measure_revision(count, revision)
+    print('%-14s %10s %10s' % ('', revision[:10], 'now'))
+    for name, size in current.items():
+        print('%-14s %10.1f %10.1f bytes' % (name, baseline[name], size))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
@@ -0,0 +1,55 @@
+"""
+Saving and loading characters with dumps()/loads() against repr()/eval():
+
+    python -m benchmarks.serialization [count]
+"""
+import sys
+import time
+
+from dnd5e import Character, roll_dice
+from dnd5e.characters import CharacterStat  # noqa: F401, for eval
+from dnd5e.dicerolls import DiceResult, DieResult  # noqa: F401
+from dnd5e.items import (Armor, ArmorType, Weapon,  # noqa: F401
+                         WeaponDamageType, WeaponType)
+from dnd5e.serialization import dumps, loads
+from dnd5e.srd_armor import chain_mail
+from dnd5e.srd_weapons import longsword
+
+
+def party(count):
+    characters = []
+    for i in range(count):
+        character = Character('hero %i' % i, 'human', 'fighter',
+                              armor=chain_mail, level=5,
+                              hit_dice=roll_dice('5d10'), str_score=16,
+                              proficiencies=[ArmorType.HEAVY,
+                                             WeaponType.MARTIAL])
+        character.wield_main(longsword)
+        characters.append(character)
+    return characters
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main(count=100000):
+    characters = party(count)
+
+    text, repr_seconds = timed(lambda: [repr(c) for c in characters])
+    _, eval_seconds = timed(lambda: [eval(t) for t in text])
+    data, dumps_seconds = timed(dumps, characters)
+    loaded, loads_seconds = timed(loads, data)
+    assert [repr(c) for c in loaded] == text
+
+    print('%i characters' % count)
+    print('repr   %8.0f bytes each  dump %6.2fs  load %6.2fs' % (
+        sum(map(len, text)) / count, repr_seconds, eval_seconds))
+    print('binary %8.0f bytes each  dump %6.2fs  load %6.2fs' % (
+        len(data) / count, dumps_seconds, loads_seconds))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -1,2 +1,4 @@
 from .characters import Character
-from .dicerolls import drop_lowest, reroll_if, roll, roll_dice
+from .dicerolls import (drop_highest, drop_lowest, keep_highest, keep_lowest,
+                        reroll_if, roll, roll_batch, roll_d20, roll_dice,
+                        roll_pool, roll_stream)
@@ -0,0 +1,322 @@
+"""
+Many attacks at once, by the same rules as Character.attack.
+
+resolve_attacks() takes attackers and targets either as parallel lists
+of Characters or as CharacterTables (with the rows to use), and returns
+an AttackBatch of NumPy arrays instead of one AttackResult per swing.
+
+attack_odds() skips the dice altogether and works out the exact chances
+of every outcome of one attack.
+"""
+from __future__ import annotations
+
+import functools
+from typing import (List, NamedTuple, Optional, Sequence, Tuple, Union)
+
+import numpy as np
+
+from .characters import Character, HitType, required_proficiency_bit
+from .dicerolls import compile_dice
+from .distributions import Distribution, plan_distribution
+from .rng import DiceRNG, get_rng
+from .tables import DEX, STR, CharacterTable
+
+
+Combatants = Union[CharacterTable, Sequence[Character]]
+Flags = Union[bool, Sequence[bool], np.ndarray]
+Distances = Union[int, Sequence[int], np.ndarray]
+
+MISS = 0    # hit_type code for a miss; otherwise the HitType's value
+
+
+class AttackBatch(NamedTuple):
+    """
+    The outcome of every attack in a resolve_attacks() call: arrays with
+    one entry per attack. hit_type holds MISS or a HitType's value.
+    """
+    hit_type: np.ndarray
+    critical_hit: np.ndarray
+    damage: np.ndarray
+    attack_roll: np.ndarray     # the d20 plus modifier and proficiency
+    d20: np.ndarray
+    modifier: np.ndarray
+    proficiency_bonus: np.ndarray
+
+    def __len__(self):
+        return len(self.hit_type)
+
+    @property
+    def hits(self) -> np.ndarray:
+        return self.hit_type == HitType.FULL.value
+
+    def hit_types(self) -> List[Optional[HitType]]:
+        """hit_type as AttackResult.hit_type would have it."""
+        return [None if code == MISS else HitType(code)
+                for code in self.hit_type.tolist()]
+
+
+class WeaponColumns(NamedTuple):
+    """Per-weapon properties of a table's weapon catalog, indexed by id."""
+    one_handed: np.ndarray      # damage expression ids
+    two_handed: np.ndarray
+    has_reach: np.ndarray
+    has_range: np.ndarray
+    finesse: np.ndarray
+    thrown: np.ndarray
+    names: List[str]
+
+
+def weapon_columns(table: CharacterTable,
+                   expressions: List[str]) -> WeaponColumns:
+    """
+    Columns for every weapon in table's catalog, plus a last entry for
+    unarmed strikes (weapon id -1). Damage expressions are added to
+    expressions, whose first entry must be '1d1'.
+    """
+    def expression_id(damage: Optional[str]) -> int:
+        if damage is None:
+            return 0
+        if damage not in expressions:
+            expressions.append(damage)
+        return expressions.index(damage)
+
+    weapons = list(table.weapons)
+    one_handed = [expression_id(weapon.damage) for weapon in weapons]
+    two_handed = [expression_id(weapon.two_handed_damage if weapon.versatile
+                                else weapon.damage) for weapon in weapons]
+
+    def column(values, last, dtype):
+        return np.array(list(values) + [last], dtype=dtype)
+
+    return WeaponColumns(
+        column(one_handed, 0, np.int16), column(two_handed, 0, np.int16),
+        column((w.has_reach for w in weapons), False, bool),
+        column((w.has_range for w in weapons), False, bool),
+        column((w.finesse_weapon for w in weapons), False, bool),
+        column((w.can_be_thrown for w in weapons), False, bool),
+        [weapon.name for weapon in weapons] + ['unarmed strike'])
+
+
+def proficiency_bits(things: Sequence) -> np.ndarray:
+    """
+    The proficiency bit needed for each of things (armor or weapons), plus
+    a last entry of 0 for none, to AND with CharacterTable.proficiencies.
+    """
+    return np.array([required_proficiency_bit(thing) for thing in things] +
+                    [0], dtype=np.uint16)
+
+
+def as_table(combatants: Combatants,
+             rows: Optional[np.ndarray]) -> Tuple[CharacterTable, np.ndarray]:
+    if not isinstance(combatants, CharacterTable):
+        combatants = CharacterTable.from_characters(list(combatants))
+    if rows is None:
+        rows = np.arange(len(combatants))
+    return combatants, np.asarray(rows, dtype=np.intp)
+
+
+def resolve_attacks(attackers: Combatants, targets: Combatants,
+                    attacker_rows: Optional[np.ndarray] = None,
+                    target_rows: Optional[np.ndarray] = None,
+                    main_hand: Flags = True,
+                    using_two_hands: Flags = False,
+                    with_advantage: Flags = False,
+                    with_disadvantage: Flags = False,
+                    distance: Distances = 5,
+                    rng: Optional[DiceRNG] = None) -> AttackBatch:
+    """
+    Attack number i is attackers[attacker_rows[i]].attack(
+    targets[target_rows[i]], main_hand[i], using_two_hands[i], ...),
+    resolved by exactly the same rules, but for all attacks at once.
+    Without rows, the ith attacker attacks the ith target. The options
+    may be single values or one per attack.
+
+    Every attack sees the combatants as they were before the batch.
+    Afterwards, thrown weapons are dropped from the hand that threw them,
+    as attack() would, in the table or on the Characters passed in.
+    Dice are drawn in a different order than attack() would draw them.
+
+    Raises RuntimeError, like attack(), if any attacker is dead or out of
+    range; no attack in the batch is resolved then.
+    """
+    attacker_table, attacker_rows = as_table(attackers, attacker_rows)
+    target_table, target_rows = as_table(targets, target_rows)
+    n = len(attacker_rows)
+    if len(target_rows) != n:
+        raise ValueError('Need as many targets as attackers, not %i and '
+                         '%i' % (len(target_rows), n))
+    main_hand = np.broadcast_to(np.asarray(main_hand, dtype=bool), n)
+    using_two_hands = np.broadcast_to(
+        np.asarray(using_two_hands, dtype=bool), n)
+    advantage = np.broadcast_to(np.asarray(with_advantage, dtype=bool), n)
+    disadvantage = np.broadcast_to(
+        np.asarray(with_disadvantage, dtype=bool), n)
+    distance = np.broadcast_to(np.asarray(distance, dtype=np.int64), n)
+    rng = rng or get_rng()
+
+    if (attacker_table.hp[attacker_rows] < 1).any():
+        dead = attacker_rows[attacker_table.hp[attacker_rows] < 1][0]
+        raise RuntimeError("%s is dead and can't attack." %
+                           attacker_table.names[dead])
+
+    # Non-proficient armor imposes disadvantage; both cancel out.
+    proficiencies = attacker_table.proficiencies[attacker_rows]
+    armor = attacker_table.armor[attacker_rows]
+    armor_bits = proficiency_bits(list(attacker_table.armors))
+    disadvantage = disadvantage | ((armor >= 0) &
+                                   (proficiencies & armor_bits[armor] == 0))
+    both = advantage & disadvantage
+    advantage = advantage & ~both
+    disadvantage = disadvantage & ~both
+
+    # Which weapon (and which damage) each attack uses.
+    expressions = ['1d1']
+    weapons = weapon_columns(attacker_table, expressions)
+    main_weapon = attacker_table.main_hand[attacker_rows]
+    off_weapon = attacker_table.off_hand[attacker_rows]
+    two_hands = using_two_hands & (main_weapon >= 0)
+    use_main = two_hands | (main_hand & (main_weapon >= 0))
+    use_off = ~use_main & ~main_hand & (off_weapon >= 0)
+    weapon = np.where(use_main, main_weapon,
+                      np.where(use_off, off_weapon, -1))
+    expression = np.where(two_hands, weapons.two_handed[weapon],
+                          weapons.one_handed[weapon])
+
+    threshold = np.where(weapons.has_reach[weapon], 10, 5)
+    ranged = distance > threshold
+    out_of_range = ranged & ~weapons.has_range[weapon]
+    if out_of_range.any():
+        first = int(np.flatnonzero(out_of_range)[0])
+        raise RuntimeError("Cannot attack with %s at range %i." % (
+            weapons.names[weapon[first]], distance[first]))
+
+    modifiers = attacker_table.modifiers[attacker_rows].astype(np.int32)
+    strength, dexterity = modifiers[:, STR], modifiers[:, DEX]
+    modifier = np.where(ranged, dexterity,
+                        np.where(weapons.finesse[weapon],
+                                 np.maximum(strength, dexterity), strength))
+
+    weapon_bits = proficiency_bits(list(attacker_table.weapons))
+    proficient = (weapon < 0) | (proficiencies & weapon_bits[weapon] != 0)
+    proficiency_bonus = np.where(
+        proficient, attacker_table.proficiency_bonus[attacker_rows], 0)
+
+    faces = rng.faces(20, (n, 2), dtype=np.int32)
+    d20 = np.where(advantage, faces.max(axis=1),
+                   np.where(disadvantage, faces.min(axis=1), faces[:, 0]))
+    critical_hit = d20 >= 20
+    attack_roll = d20 + modifier + proficiency_bonus
+
+    target_ac = target_table.AC[target_rows]
+    hit = (attack_roll > target_ac) | critical_hit
+    shield = target_table.uses_shield[target_rows]
+    hit_type = np.full(n, MISS, dtype=np.int8)
+    hit_type[attack_roll > 10] = HitType.ARMOR_GLANCE.value
+    hit_type[shield & (attack_roll > target_ac - 2)] = \
+        HitType.SHIELD_GLANCE.value
+    hit_type[hit] = HitType.FULL.value
+
+    damage = np.zeros(n, dtype=np.int64)
+    damage_modifier = np.where(main_hand, modifier, np.minimum(modifier, 0))
+    for expression_id in np.unique(expression[hit]):
+        plan = compile_dice(expressions[expression_id])
+        rolled = hit & (expression == expression_id)
+        damage[rolled] = plan.roll_totals(int(rolled.sum()), rng)
+        crits = rolled & critical_hit
+        damage[crits] += (plan.roll_totals(int(crits.sum()), rng) -
+                          plan.modifier)
+    damage = np.where(hit, np.maximum(damage + damage_modifier, 1), 0)
+
+    drop_thrown(attackers, attacker_table, attacker_rows,
+                ranged & weapons.thrown[weapon] & (weapon >= 0), main_hand)
+
+    return AttackBatch(hit_type, critical_hit, damage.astype(np.int32),
+                       attack_roll, d20.astype(np.uint8), modifier,
+                       proficiency_bonus)
+
+
+def drop_thrown(attackers: Combatants, table: CharacterTable,
+                rows: np.ndarray, thrown: np.ndarray, main_hand: np.ndarray):
+    for attack in np.flatnonzero(thrown).tolist():
+        row = rows[attack]
+        if main_hand[attack]:
+            table.main_hand[row] = -1
+        else:
+            table.off_hand[row] = -1
+            table.uses_shield[row] = False
+        if not isinstance(attackers, CharacterTable):
+            if main_hand[attack]:
+                attackers[row].wield_main(None)
+            else:
+                attackers[row].wield_off(None)
+
+
+class AttackOdds(NamedTuple):
+    """
+    Exact chances of each outcome of an attack. hit includes critical
+    hits; damage is the distribution of AttackResult.damage, 0 included.
+    """
+    miss: float
+    armor_glance: float
+    shield_glance: float
+    hit: float
+    critical_hit: float
+    damage: Distribution
+
+    @property
+    def expected_damage(self) -> float:
+        return self.damage.mean
+
+
+D20_EXPRESSIONS = {0: '1d20', 1: '1d20adv', -1: '1d20dis'}
+
+
+def attack_odds(attacker: Character, target: Character,
+                main_hand: bool = True, using_two_hands: bool = False,
+                with_advantage: bool = False,
+                with_disadvantage: bool = False,
+                distance: int = 5) -> AttackOdds:
+    """
+    The odds of attacker.attack(target, ...) with the same options,
+    worked out from the same rules (Character.plan_attack) rather than
+    sampled. Answers are memoized, so asking again is nearly free.
+
+    Raises RuntimeError when attack() would.
+    """
+    plan = attacker.plan_attack(target, main_hand, using_two_hands,
+                                with_advantage, with_disadvantage, distance)
+    return _attack_odds(
+        int(plan.with_advantage) - int(plan.with_disadvantage),
+        plan.modifier + plan.proficiency_bonus, target.AC,
+        target.uses_shield, plan.damage, plan.damage_modifier)
+
+
+@functools.lru_cache(maxsize=4096)
+def _attack_odds(advantage: int, attack_bonus: int, armor_class: int,
+                 uses_shield: bool, damage: str,
+                 damage_modifier: int) -> AttackOdds:
+    miss = armor_glance = shield_glance = hit = critical_hit = 0.
+    d20 = plan_distribution(D20_EXPRESSIONS[advantage])
+    for face, chance in d20.as_dict().items():
+        attack_roll = face + attack_bonus
+        if attack_roll > armor_class or face >= 20:
+            hit += chance
+            if face >= 20:
+                critical_hit += chance
+        elif uses_shield and attack_roll > armor_class - 2:
+            shield_glance += chance
+        elif attack_roll > 10:
+            armor_glance += chance
+        else:
+            miss += chance
+
+    damage_plan = compile_dice(damage)
+    rolled = plan_distribution(damage_plan)
+    dice = rolled - damage_plan.modifier
+    damage_dist = Distribution.mixture((
+        (1. - hit, Distribution.constant(0)),
+        (hit - critical_hit, (rolled + damage_modifier).clip_below(1)),
+        (critical_hit, (rolled + dice + damage_modifier).clip_below(1)),
+    ))
+    return AttackOdds(miss, armor_glance, shield_glance, hit, critical_hit,
+                      damage_dist)
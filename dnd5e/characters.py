@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import enum
-from typing import Iterable, List, Optional, Tuple, Union
-from .dicerolls import roll_dice, DiceResult
+from typing import (Any, Callable, Dict, Iterable, List, MutableSequence,
+                    NamedTuple, Optional, Tuple, Union)
+from .dicerolls import compile_dice, DiceResult, roll_d20
+from .events import get_bus
+from .rng import DiceRNG
 from .items import (Armor, ArmorType, SimpleWeapon, MartialWeapon,
                     Weapon, WeaponType)
 
@@ -14,6 +17,10 @@ class HitType(enum.Enum):
 
 
 class AttackResult:
+    __slots__ = ('hit_type', 'damage', 'attack_roll', 'damage_roll',
+                 'modifier', 'proficiency_bonus', 'critical_hit', 'target',
+                 'attack_with', 'with_advantage', 'with_disadvantage')
+
     def __init__(self, hit_type: Optional[HitType] = None, damage: int = 0,
                  attack_roll: Optional[DiceResult] = None, modifier: int = 0,
                  proficiency_bonus: int = 0, critical_hit: bool = False,
@@ -34,39 +41,143 @@ class AttackResult:
         self.with_advantage = bool(with_advantage)
         self.with_disadvantage = bool(with_disadvantage)
 
-    def describe(self):
-        if self.attack_with is None:
+    @property
+    def description(self) -> str:
+        return AttackEvent.from_result(self).describe()
+
+    def describe(self, attacker: Optional[Character] = None):
+        """
+        Publish this attack to the current event bus, to be described by
+        whichever sinks are listening (see events.use_bus).
+        """
+        bus = get_bus()
+        if bus.active:
+            bus.publish(AttackEvent.from_result(self, attacker))
+        return self
+
+
+class AttackEvent(NamedTuple):
+    """An attack as plain values, for event sinks."""
+    attacker: Optional[str]
+    target: Optional[str]
+    weapon: Optional[str]
+    d20: Optional[int]
+    modifier: int
+    proficiency_bonus: int
+    hit_type: Optional[HitType]
+    critical_hit: bool
+    damage: int
+
+    @classmethod
+    def from_result(cls, result: AttackResult,
+                    attacker: Optional[Character] = None) -> AttackEvent:
+        d20 = None
+        if result.attack_roll is not None:
+            d20 = (result.attack_roll.total - result.modifier -
+                   result.proficiency_bonus)
+        return cls(None if attacker is None else attacker.name,
+                   None if result.target is None else result.target.name,
+                   (None if result.attack_with is None
+                    else result.attack_with.name),
+                   d20, result.modifier, result.proficiency_bonus,
+                   result.hit_type, result.critical_hit, result.damage)
+
+    def describe(self) -> str:
+        if self.weapon is None:
             attack_type = 'The attack'
         else:
-            attack_type = 'The %s attack' % self.attack_with.name
+            attack_type = 'The %s attack' % self.weapon
+        if self.attacker is not None:
+            attack_type = '%s\'s %s' % (self.attacker,
+                                        attack_type[4:].lstrip())
 
-        if self.target is None:
-            target = 'target'
-        else:
-            target = self.target.name
+        target = 'target' if self.target is None else self.target
 
         if self.hit_type == HitType.SHIELD_GLANCE:
-            desc = attack_type + ' glances off %s\'s shield.' % target
+            return attack_type + ' glances off %s\'s shield.' % target
         elif self.hit_type == HitType.ARMOR_GLANCE:
-            desc = attack_type + (' bounces harmlessly off %s\'s '
+            return attack_type + (' bounces harmlessly off %s\'s '
                                   'armor.' % target)
         elif self.hit_type == HitType.FULL:
-            desc = attack_type + ' hits %s for %i damage!' % (target,
+            return attack_type + ' hits %s for %i damage!' % (target,
                                                               self.damage)
-        else:
-            desc = attack_type + ' missed %s.' % target
+        return attack_type + ' missed %s.' % target
 
-        print(desc)
-        return self
+    def as_dict(self) -> Dict[str, Any]:
+        event = self._asdict()
+        event['hit_type'] = (None if self.hit_type is None
+                             else self.hit_type.name)
+        return event
+
+
+class CacheCounter:
+    """Hits and misses of the cached derived stats of every character."""
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def __repr__(self):
+        return '<CacheCounter: %i hits, %i misses>' % (self.hits,
+                                                       self.misses)
+
+
+DERIVED_STAT_CACHE = CacheCounter()
+
+
+StatWatcher = Callable[['CharacterStat'], None]
 
 
 class CharacterStat:
+    __slots__ = ('__fullname', '__watchers', '__modifier', '__base_value',
+                 '__bonus')
+
     def __init__(self, full_name: str, base_value: Optional[int] = None,
                  bonus: Optional[int] = None):
         self.__fullname = str(full_name)
+        self.__watchers: Tuple[StatWatcher, ...] = ()
+        self.__modifier: Optional[int] = None
         self.base_value = base_value and int(base_value) or 10
         self.bonus = bonus and int(bonus) or 0
 
+    @property
+    def base_value(self) -> int:
+        return self.__base_value
+
+    @base_value.setter
+    def base_value(self, base_value: int):
+        self.__base_value = int(base_value)
+        self.__changed()
+
+    @property
+    def bonus(self) -> int:
+        return self.__bonus
+
+    @bonus.setter
+    def bonus(self, bonus: int):
+        self.__bonus = int(bonus)
+        self.__changed()
+
+    def watch(self, watcher: StatWatcher):
+        """Call watcher(stat) whenever this stat's value changes."""
+        self.__watchers += (watcher,)
+
+    def unwatch(self, watcher: StatWatcher):
+        self.__watchers = tuple(w for w in self.__watchers if w != watcher)
+
+    def __changed(self):
+        self.__modifier = None
+        for watcher in self.__watchers:
+            watcher(self)
+
     @property
     def full_name(self) -> str:
         return self.__fullname.title()
@@ -77,10 +188,15 @@ class CharacterStat:
 
     @property
     def modifier(self) -> int:
+        if self.__modifier is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__modifier
+        DERIVED_STAT_CACHE.misses += 1
         if self.value >= 10:
-            return int((self.value - 10) / 2)
+            self.__modifier = int((self.value - 10) / 2)
         else:
-            return int((self.value - 11) / 2)
+            self.__modifier = int((self.value - 11) / 2)
+        return self.__modifier
 
     @property
     def value(self) -> int:
@@ -108,8 +224,136 @@ CharacterStats = Tuple[Optional[CharacterStat], Optional[CharacterStat],
 
 Proficiency = Union[ArmorType, WeaponType, CharacterStat]
 
+# Every kind of proficiency has its own bit in a Proficiencies mask. These
+# bits are stored in CharacterTables, so only ever add new ones.
+PROFICIENCY_BITS: Dict[Union[ArmorType, WeaponType], int] = {
+    ArmorType.LIGHT: 1 << 0,
+    ArmorType.MEDIUM: 1 << 1,
+    ArmorType.HEAVY: 1 << 2,
+    WeaponType.SIMPLE: 1 << 3,
+    WeaponType.MARTIAL: 1 << 4,
+}
+STAT_PROFICIENCY_BITS = {
+    'STR': 1 << 5, 'DEX': 1 << 6, 'CON': 1 << 7,
+    'INT': 1 << 8, 'WIS': 1 << 9, 'CHA': 1 << 10,
+}
+
+
+def proficiency_bit(proficiency: Proficiency) -> int:
+    """The mask bit for proficiency, or 0 if it hasn't got one."""
+    if isinstance(proficiency, CharacterStat):
+        return STAT_PROFICIENCY_BITS.get(proficiency.abbr, 0)
+    return PROFICIENCY_BITS.get(proficiency, 0)
+
+
+# The bit each exact weapon class needs, to skip the isinstance checks.
+WEAPON_CLASS_BITS: Dict[type, int] = {
+    SimpleWeapon: PROFICIENCY_BITS[WeaponType.SIMPLE],
+    MartialWeapon: PROFICIENCY_BITS[WeaponType.MARTIAL],
+    Weapon: 0,
+}
+
+
+def required_proficiency_bit(thing: Weapon | Armor) -> int:
+    """The bit a character needs to be proficient with thing, or 0."""
+    if isinstance(thing, SimpleWeapon):
+        return PROFICIENCY_BITS[WeaponType.SIMPLE]
+    elif isinstance(thing, MartialWeapon):
+        return PROFICIENCY_BITS[WeaponType.MARTIAL]
+    elif isinstance(thing, Armor) and thing.armor_type is not None:
+        return PROFICIENCY_BITS[thing.armor_type]
+    return 0
+
+
+class Proficiencies(MutableSequence[Proficiency]):
+    """
+    A list of proficiencies that also keeps them as a bitmask, so that
+    `proficiency in proficiencies` is a single AND. A stat proficiency
+    is in the list if any stat with the same abbreviation is.
+    """
+    __slots__ = ('__items', 'mask')
+
+    def __init__(self, proficiencies: Iterable[Proficiency] = ()):
+        self.__items: List[Proficiency] = list(proficiencies)
+        self.mask = 0
+        self.__update()
+
+    @classmethod
+    def from_mask(cls, mask: int,
+                  stats: Iterable[CharacterStat] = ()) -> Proficiencies:
+        """
+        The proficiencies set in mask, in bit order. Stat proficiencies
+        are taken from stats, e.g. a character's own stats.
+        """
+        proficiencies: List[Proficiency] = [
+            proficiency for proficiency, bit in PROFICIENCY_BITS.items()
+            if mask & bit]
+        proficiencies += [stat for stat in stats
+                          if mask & STAT_PROFICIENCY_BITS.get(stat.abbr, 0)]
+        return cls(proficiencies)
+
+    def __update(self):
+        mask = 0
+        for proficiency in self.__items:
+            mask |= proficiency_bit(proficiency)
+        self.mask = mask
+
+    def __contains__(self, proficiency) -> bool:
+        bit = proficiency_bit(proficiency)
+        if bit:
+            return bool(self.mask & bit)
+        return proficiency in self.__items
+
+    def __getitem__(self, index):
+        return self.__items[index]
+
+    def __setitem__(self, index, value):
+        self.__items[index] = value
+        self.__update()
+
+    def __delitem__(self, index):
+        del self.__items[index]
+        self.__update()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def insert(self, index: int, proficiency: Proficiency):
+        self.__items.insert(index, proficiency)
+        self.mask |= proficiency_bit(proficiency)
+
+    def clear(self):
+        self.__items.clear()
+        self.mask = 0
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Proficiencies):
+            return self.__items == other.__items
+        return self.__items == other
+
+    def __repr__(self):
+        return repr(self.__items)
+
+
+class AttackPlan(NamedTuple):
+    weapon: Optional[Weapon]
+    damage: str
+    ranged: bool
+    modifier: int
+    proficiency_bonus: int
+    damage_modifier: int
+    with_advantage: bool
+    with_disadvantage: bool
+
 
 class Character:
+    __slots__ = ('name', 'race', 'class_', 'base_movement_speed',
+                 '__proficiencies', '__base_armor_class', '__armor',
+                 '__uses_shield', '__include_stats_in_AC', '__level',
+                 '__hit_dice', '__wounds', '__stats', '__main_hand',
+                 '__off_hand', '__AC', '__maxhp', '__hp_percent',
+                 '__hp_status', '__proficiency_bonus')
+
     def __init__(self, name: Optional[str] = None,
                  race: Optional[str] = None,
                  class_: Optional[str] = None,
@@ -132,6 +376,12 @@ class Character:
                  wis_score: Optional[int] = None,
                  cha_bonus: Optional[int] = None,
                  cha_score: Optional[int] = None):
+        self.__AC: Optional[int] = None
+        self.__maxhp: Optional[int] = None
+        self.__hp_percent: Optional[float] = None
+        self.__hp_status: Optional[str] = None
+        self.__proficiency_bonus: Optional[int] = None
+        self.__stats: List[CharacterStat] = []
         self.name = name
         self.race = race
         self.class_ = class_
@@ -145,18 +395,170 @@ class Character:
         if self.hit_dice:
             assert len(self.hit_dice) == self.level
         self.base_movement_speed = int(base_movement_speed)
-        self.STR = CharacterStat('Strength', str_score, str_bonus)
-        self.DEX = CharacterStat('Dexterity', dex_score, dex_bonus)
-        self.CON = CharacterStat('Constitution', con_score, con_bonus)
-        self.INT = CharacterStat('Intelligence', int_score, int_bonus)
-        self.WIS = CharacterStat('Wisdom', wis_score, wis_bonus)
-        self.CHA = CharacterStat('Charisma', cha_score, cha_bonus)
+        self.__stats = [
+            CharacterStat('Strength', str_score, str_bonus),
+            CharacterStat('Dexterity', dex_score, dex_bonus),
+            CharacterStat('Constitution', con_score, con_bonus),
+            CharacterStat('Intelligence', int_score, int_bonus),
+            CharacterStat('Wisdom', wis_score, wis_bonus),
+            CharacterStat('Charisma', cha_score, cha_bonus),
+        ]
+        stat_changed = self.stat_changed
+        for stat in self.__stats:
+            stat.watch(stat_changed)
         self.__main_hand: Optional[Weapon] = None
         self.__off_hand: Optional[Weapon] = None
-        self.proficiencies: List[Proficiency] = list(proficiencies or ())
+        self.proficiencies = proficiencies or ()
+
+    # Derived stats are cached, and forgotten as soon as anything they are
+    # derived from is set: see __forget below. Changing an Armor or the
+    # hit_dice DiceResult in place isn't noticed; set them again instead.
+
+    def __forget(self, AC: bool = False, hp: bool = False,
+                 level: bool = False):
+        if AC:
+            self.__AC = None
+        if hp or level:
+            self.__maxhp = None
+            self.__hp_percent = None
+            self.__hp_status = None
+        if level:
+            self.__proficiency_bonus = None
+
+    def stat_changed(self, stat: CharacterStat):
+        """Forget whatever was derived from stat, which just changed."""
+        ac_stats = [name.upper()[:3] for name in self.include_stats_in_AC]
+        self.__forget(AC=stat is self.DEX or stat.abbr in ac_stats,
+                      hp=stat is self.CON)
+
+    def __set_stat(self, index: int, stat: CharacterStat):
+        self.__stats[index].unwatch(self.stat_changed)
+        self.__stats[index] = stat
+        stat.watch(self.stat_changed)
+        self.__forget(AC=True, hp=True)
+
+    @property
+    def STR(self) -> CharacterStat:
+        return self.__stats[0]
+
+    @STR.setter
+    def STR(self, stat: CharacterStat):
+        self.__set_stat(0, stat)
+
+    @property
+    def DEX(self) -> CharacterStat:
+        return self.__stats[1]
+
+    @DEX.setter
+    def DEX(self, stat: CharacterStat):
+        self.__set_stat(1, stat)
+
+    @property
+    def CON(self) -> CharacterStat:
+        return self.__stats[2]
+
+    @CON.setter
+    def CON(self, stat: CharacterStat):
+        self.__set_stat(2, stat)
+
+    @property
+    def INT(self) -> CharacterStat:
+        return self.__stats[3]
+
+    @INT.setter
+    def INT(self, stat: CharacterStat):
+        self.__set_stat(3, stat)
+
+    @property
+    def WIS(self) -> CharacterStat:
+        return self.__stats[4]
+
+    @WIS.setter
+    def WIS(self, stat: CharacterStat):
+        self.__set_stat(4, stat)
+
+    @property
+    def CHA(self) -> CharacterStat:
+        return self.__stats[5]
+
+    @CHA.setter
+    def CHA(self, stat: CharacterStat):
+        self.__set_stat(5, stat)
+
+    @property
+    def base_armor_class(self) -> int:
+        return self.__base_armor_class
+
+    @base_armor_class.setter
+    def base_armor_class(self, base_armor_class: int):
+        self.__base_armor_class = int(base_armor_class)
+        self.__forget(AC=True)
+
+    @property
+    def armor(self) -> Optional[Armor]:
+        return self.__armor
+
+    @armor.setter
+    def armor(self, armor: Optional[Armor]):
+        self.__armor = armor
+        self.__forget(AC=True)
+
+    @property
+    def uses_shield(self) -> bool:
+        return self.__uses_shield
+
+    @uses_shield.setter
+    def uses_shield(self, uses_shield: bool):
+        self.__uses_shield = bool(uses_shield)
+        self.__forget(AC=True)
+
+    @property
+    def include_stats_in_AC(self) -> Tuple[str, ...]:
+        return self.__include_stats_in_AC
+
+    @include_stats_in_AC.setter
+    def include_stats_in_AC(self, include_stats_in_AC: Tuple[str, ...]):
+        self.__include_stats_in_AC = tuple(include_stats_in_AC)
+        self.__forget(AC=True)
+
+    @property
+    def level(self) -> int:
+        return self.__level
+
+    @level.setter
+    def level(self, level: int):
+        self.__level = int(level)
+        self.__forget(level=True)
+
+    @property
+    def hit_dice(self) -> Optional[DiceResult]:
+        return self.__hit_dice
+
+    @hit_dice.setter
+    def hit_dice(self, hit_dice: Optional[DiceResult]):
+        self.__hit_dice = hit_dice
+        self.__forget(hp=True)
+
+    @property
+    def wounds(self) -> int:
+        return self.__wounds
+
+    @wounds.setter
+    def wounds(self, wounds: int):
+        self.__wounds = int(wounds)
+        self.__hp_percent = None
+        self.__hp_status = None
 
     @property
     def AC(self) -> int:
+        if self.__AC is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__AC
+        DERIVED_STAT_CACHE.misses += 1
+        self.__AC = self.__armor_class()
+        return self.__AC
+
+    def __armor_class(self) -> int:
         ac = self.base_armor_class
 
         if self.armor:
@@ -178,16 +580,21 @@ class Character:
 
         return ac
 
-    def attack(self, other: Character, main_hand: bool = True,
-               using_two_hands: bool = False,
-               with_advantage: bool = False,
-               with_disadvantage: bool = False,
-               distance: int = 5) -> AttackResult:
+    def plan_attack(self, other: Character, main_hand: bool = True,
+                    using_two_hands: bool = False,
+                    with_advantage: bool = False,
+                    with_disadvantage: bool = False,
+                    distance: int = 5) -> AttackPlan:
+        """
+        Everything about attack() that is settled before any dice are
+        rolled: the weapon, its damage, the modifiers and whether the roll
+        has advantage or disadvantage.
+        """
         if not isinstance(other, Character):
             raise ValueError("Unsure how to attack a(n) "
                              "%s." % other.__class__.__name__)
 
-        if self.armor and self.armor.armor_type not in self.proficiencies:
+        if self.armor and not self.is_proficient_with(self.armor):
             with_disadvantage = True
 
         if with_advantage and with_disadvantage:
@@ -233,13 +640,29 @@ class Character:
         if weapon is None or self.is_proficient_with(weapon):
             proficiency_bonus = self.proficiency_bonus
 
-        attack_roll = roll_dice('1d20')
-        if with_advantage or with_disadvantage:
-            attack_reroll = roll_dice('1d20')
-            if ((with_advantage and attack_reroll.total > attack_roll.total) or
-                    (with_disadvantage and
-                     attack_reroll.total < attack_roll.total)):
-                attack_roll = attack_reroll
+        if main_hand:
+            damage_modifier = modifier
+        else:
+            damage_modifier = min(modifier, 0)
+
+        return AttackPlan(weapon, damage, ranged, modifier, proficiency_bonus,
+                          damage_modifier, with_advantage, with_disadvantage)
+
+    def attack(self, other: Character, main_hand: bool = True,
+               using_two_hands: bool = False,
+               with_advantage: bool = False,
+               with_disadvantage: bool = False,
+               distance: int = 5,
+               rng: Optional[DiceRNG] = None) -> AttackResult:
+        plan = self.plan_attack(other, main_hand, using_two_hands,
+                                with_advantage, with_disadvantage, distance)
+        weapon, damage, modifier = plan.weapon, plan.damage, plan.modifier
+        proficiency_bonus = plan.proficiency_bonus
+        with_advantage = plan.with_advantage
+        with_disadvantage = plan.with_disadvantage
+
+        attack_roll = roll_d20(int(with_advantage) - int(with_disadvantage),
+                               rng)
         critical_threshold = 20
         critical_hit = False
         if attack_roll.total >= critical_threshold:
@@ -256,17 +679,14 @@ class Character:
             critical_hit=critical_hit,
         )
         if attack_roll.total > other.AC or critical_hit:
+            damage_plan = compile_dice(damage)
+            damage_roll = damage_plan.roll(rng)
             if critical_hit:
-                damage_roll = roll_dice(damage) + roll_dice(damage)
-            else:
-                damage_roll = roll_dice(damage)
+                damage_roll += damage_plan.roll(rng)
             result.damage_roll = damage_roll
             result.hit_type = HitType.FULL
-            if main_hand:
-                damage_modifier = modifier
-            else:
-                damage_modifier = min(modifier, 0)
-            result.damage = max((damage_roll + damage_modifier).total, 1)
+            damage_roll += damage_plan.modifier + plan.damage_modifier
+            result.damage = max(damage_roll.total, 1)
         elif other.uses_shield and attack_roll.total > (other.AC - 2):
             result.hit_type = HitType.SHIELD_GLANCE
         elif attack_roll.total > 10:
@@ -274,7 +694,7 @@ class Character:
         else:
             result.hit_type = None
 
-        if ranged and weapon is not None and weapon.can_be_thrown:
+        if plan.ranged and weapon is not None and weapon.can_be_thrown:
             if main_hand:
                 self.wield_main(None)
             else:
@@ -282,15 +702,19 @@ class Character:
 
         return result
 
+    @property
+    def proficiencies(self) -> Proficiencies:
+        return self.__proficiencies
+
+    @proficiencies.setter
+    def proficiencies(self, proficiencies: Iterable[Proficiency]):
+        self.__proficiencies = Proficiencies(proficiencies)
+
     def is_proficient_with(self, thing: Weapon | Armor):
-        if isinstance(thing, SimpleWeapon):
-            return WeaponType.SIMPLE in self.proficiencies
-        elif isinstance(thing, MartialWeapon):
-            return WeaponType.MARTIAL in self.proficiencies
-        elif isinstance(thing, Armor):
-            return thing.armor_type in self.proficiencies
-        else:
-            return False
+        bit = WEAPON_CLASS_BITS.get(type(thing))
+        if bit is None:
+            bit = required_proficiency_bit(thing)
+        return bool(self.__proficiencies.mask & bit)
 
     @property
     def hp(self) -> int:
@@ -298,34 +722,56 @@ class Character:
 
     @property
     def hp_percent(self) -> float:
+        if self.__hp_percent is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__hp_percent
+        DERIVED_STAT_CACHE.misses += 1
         if self.maxhp == 0:
-            return 0.
-        return (self.hp / self.maxhp) * 100
+            self.__hp_percent = 0.
+        else:
+            self.__hp_percent = (self.hp / self.maxhp) * 100
+        return self.__hp_percent
 
     @property
     def hp_status(self) -> str:
+        if self.__hp_status is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__hp_status
+        DERIVED_STAT_CACHE.misses += 1
+        self.__hp_status = self.__describe_hp()
+        return self.__hp_status
+
+    def __describe_hp(self) -> str:
+        hp_percent = self.hp_percent
         if self.hp < 1:
             return 'dead'
-        elif self.hp_percent < 11:
+        elif hp_percent < 11:
             return 'critically wounded'
-        elif self.hp_percent < 25:
+        elif hp_percent < 25:
             return 'badly wounded'
-        elif self.hp_percent < 50:
+        elif hp_percent < 50:
             return 'bloodied'
-        elif self.hp_percent < 70:
+        elif hp_percent < 70:
             return 'injured'
-        elif self.hp_percent < 90:
+        elif hp_percent < 90:
             return 'roughed up'
-        elif self.hp_percent < 99:
+        elif hp_percent < 99:
             return 'slightly injured'
         else:
             return 'unscathed'
 
     @property
     def maxhp(self) -> int:
+        if self.__maxhp is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__maxhp
+        DERIVED_STAT_CACHE.misses += 1
         if not self.hit_dice:
-            return 0
-        return sum(self.hit_dice) + (self.CON.modifier * self.level)
+            self.__maxhp = 0
+        else:
+            self.__maxhp = (sum(self.hit_dice) +
+                            (self.CON.modifier * self.level))
+        return self.__maxhp
 
     @property
     def movement_speed(self) -> int:
@@ -337,7 +783,12 @@ class Character:
 
     @property
     def proficiency_bonus(self) -> int:
-        return 2 + ((self.level - 1) // 4)
+        if self.__proficiency_bonus is not None:
+            DERIVED_STAT_CACHE.hits += 1
+            return self.__proficiency_bonus
+        DERIVED_STAT_CACHE.misses += 1
+        self.__proficiency_bonus = 2 + ((self.level - 1) // 4)
+        return self.__proficiency_bonus
 
     @property
     def stats(self) -> CharacterStats:
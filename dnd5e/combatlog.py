@@ -0,0 +1,236 @@
+"""
+Combat logs: every attack of a session, appended to a file as one
+fixed-width binary record.
+
+A log is LOG_MAGIC followed by RECORD_SIZE-byte little-endian records of
+RECORD fields. Who the attacker, target and weapon ids stand for is up to
+whoever writes the log; CombatLogWriter.write_result() numbers them in
+the order they first show up. Weapon NO_WEAPON is an unarmed strike, and
+hit_type is attacks.MISS or the HitType's value.
+
+CombatLog memory-maps a log and hands out its columns as NumPy views, so
+reading back even billions of records copies nothing up front:
+
+    with CombatLog('session.log') as log:
+        damage_by_weapon = np.bincount(log['weapon'], log['damage'])
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+
+from .attacks import MISS, AttackBatch
+from .characters import AttackResult, Character, HitType
+from .items import Weapon
+from .tables import Catalog
+
+
+LOG_MAGIC = b'DNDLOG\x00\x01'
+NO_WEAPON = 0xFFFF
+
+RECORD = np.dtype([
+    ('attacker', '<u4'),
+    ('target', '<u4'),
+    ('weapon', '<u2'),
+    ('d20', 'u1'),
+    ('modifier', 'i1'),
+    ('proficiency_bonus', 'u1'),
+    ('hit_type', 'u1'),
+    ('critical_hit', '?'),
+    ('damage', '<u2'),
+])
+RECORD_STRUCT = struct.Struct('<IIHBbBB?H')
+RECORD_SIZE = RECORD.itemsize     # 17 bytes, the same as RECORD_STRUCT
+
+PathOrFile = Union[str, os.PathLike, BinaryIO]
+
+
+class CombatLogWriter:
+    """
+    Appends records to log, a path or a binary file opened for reading and
+    appending (like 'a+b'). Records are packed into a buffer and written
+    out buffer_size bytes at a time; call close(), or use the writer in a
+    with block, to write the rest.
+
+    A new or empty log gets LOG_MAGIC first. An existing log must start
+    with LOG_MAGIC, and a partly written last record is cut off before
+    anything is appended, so that new records line up.
+    """
+    def __init__(self, log: PathOrFile, buffer_size: int = 1 << 16):
+        if isinstance(log, (str, os.PathLike)):
+            self.__file: BinaryIO = open(log, 'a+b')
+            self.__owns_file = True
+        else:
+            self.__file = log
+            self.__owns_file = False
+        try:
+            self.__start()
+        except BaseException:
+            if self.__owns_file:
+                self.__file.close()
+            raise
+        self.__buffer = bytearray()
+        self.buffer_size = int(buffer_size)
+        self.records = 0
+        self.characters: Catalog[Character] = Catalog()
+        self.weapons: Catalog[Weapon] = Catalog()
+
+    def __start(self):
+        log_file = self.__file
+        size = log_file.seek(0, os.SEEK_END)
+        if not size:
+            log_file.write(LOG_MAGIC)
+            return
+        log_file.seek(0)
+        if log_file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise ValueError('Not a combat log')
+        torn = (size - len(LOG_MAGIC)) % RECORD_SIZE
+        if torn:
+            log_file.truncate(size - torn)
+        log_file.seek(0, os.SEEK_END)
+
+    def write(self, attacker: int, target: int, weapon: int, d20: int,
+              modifier: int, proficiency_bonus: int, hit_type: int,
+              critical_hit: bool, damage: int):
+        try:
+            self.__buffer += RECORD_STRUCT.pack(
+                attacker, target, weapon, d20, modifier, proficiency_bonus,
+                hit_type, critical_hit, damage)
+        except struct.error as e:
+            raise ValueError('Attack does not fit in a log record: %s' % e)
+        self.records += 1
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_result(self, result: AttackResult, attacker: Character):
+        """Log an AttackResult, numbering characters and weapons as seen."""
+        d20 = 0
+        if result.attack_roll is not None:
+            d20 = (result.attack_roll.total - result.modifier -
+                   result.proficiency_bonus)
+        weapon = self.weapons.add(result.attack_with)
+        if weapon >= NO_WEAPON:
+            raise ValueError('Too many different weapons to log')
+        self.write(self.characters.add(attacker),
+                   self.characters.add(result.target),
+                   NO_WEAPON if weapon < 0 else weapon,
+                   d20, result.modifier, result.proficiency_bonus,
+                   MISS if result.hit_type is None else result.hit_type.value,
+                   result.critical_hit, result.damage)
+
+    def write_batch(self, batch: AttackBatch, attackers: np.ndarray,
+                    targets: np.ndarray, weapons: np.ndarray):
+        """Log a whole AttackBatch, with the ids of who attacked whom."""
+        weapons = np.asarray(weapons)
+        if weapons.size and weapons.max() >= NO_WEAPON:
+            raise ValueError('Attack does not fit in a log record: weapon '
+                             'ids must be below %i; use -1 for none'
+                             % NO_WEAPON)
+        columns = {
+            'attacker': attackers,
+            'target': targets,
+            'weapon': np.where(weapons < 0, NO_WEAPON, weapons),
+        }
+        for field in ('d20', 'modifier', 'proficiency_bonus', 'hit_type',
+                      'critical_hit', 'damage'):
+            columns[field] = getattr(batch, field)
+
+        records = np.empty(len(batch), dtype=RECORD)
+        for field, values in columns.items():
+            records[field] = fit_column(field, values)
+        self.flush()
+        self.__file.write(records.tobytes())
+        self.records += len(records)
+
+    def flush(self):
+        self.__file.write(self.__buffer)
+        self.__buffer.clear()
+        self.__file.flush()
+
+    def close(self):
+        self.flush()
+        if self.__owns_file:
+            self.__file.close()
+
+    def __enter__(self) -> CombatLogWriter:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fit_column(field: str, values: np.ndarray) -> np.ndarray:
+    """
+    values, checked to fit in the RECORD field without wrapping around, as
+    write() checks single records.
+    """
+    values = np.asarray(values)
+    dtype = RECORD[field]
+    if dtype.kind == 'b':
+        if values.dtype.kind != 'b':
+            raise ValueError('Attack does not fit in a log record: %s '
+                             'must be booleans' % field)
+        return values
+    if values.dtype.kind not in 'biu':
+        raise ValueError('Attack does not fit in a log record: %s must be '
+                         'integers, not %s' % (field, values.dtype))
+    limits = np.iinfo(dtype)
+    if values.size and (values.min() < limits.min or
+                        values.max() > limits.max):
+        raise ValueError('Attack does not fit in a log record: %s must be '
+                         'from %i to %i' % (field, limits.min, limits.max))
+    return values
+
+
+class CombatLog:
+    """
+    A combat log, memory-mapped if given a path. log['damage'] and so on
+    are read-only views into the file; a partly written last record is
+    left out. Views may outlive the log: the file stays mapped until
+    both the log is closed and the last view is gone.
+    """
+    def __init__(self, log: Union[str, os.PathLike, bytes]):
+        self.__mmap: Optional[mmap.mmap] = None
+        if isinstance(log, (str, os.PathLike)):
+            with open(log, 'rb') as log_file:
+                self.__mmap = mmap.mmap(log_file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            data: Union[bytes, mmap.mmap] = self.__mmap
+        else:
+            data = log
+        if bytes(data[:len(LOG_MAGIC)]) != LOG_MAGIC:
+            if self.__mmap is not None:
+                self.__mmap.close()
+            raise ValueError('Not a combat log')
+        count = (len(data) - len(LOG_MAGIC)) // RECORD_SIZE
+        self.records = np.frombuffer(data, dtype=RECORD, count=count,
+                                     offset=len(LOG_MAGIC))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.records[field]
+
+    @property
+    def hits(self) -> np.ndarray:
+        return self.records['hit_type'] == HitType.FULL.value
+
+    def close(self):
+        self.records = np.empty(0, dtype=RECORD)
+        if self.__mmap is not None:
+            try:
+                self.__mmap.close()
+            except BufferError:
+                pass    # views are still out; they keep it mapped
+            self.__mmap = None
+
+    def __enter__(self) -> CombatLog:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import functools
+import heapq
 import operator
-import random
 import re
-from typing import Callable, Generator, Iterable, Optional, Tuple, Union
+from array import array
+from typing import (Callable, Generator, Iterable, List, NamedTuple,
+                    Optional, Sequence, Tuple, Union)
+
+import numpy as np
+
+from .rng import DiceRNG, get_rng
 
 
 class DieResult:
@@ -11,14 +18,17 @@ class DieResult:
     Stores a max_die_value (e.g. 6 for a 6-sided die) and result, making them
     resistant to rewrites once set.
     """
+    __slots__ = ('__die_max_value', '__result')
+
     def __init__(self, die_max_value: int, result: Optional[int] = None):
         self.__die_max_value = int(die_max_value)
         self.__result = None
         if result is not None:
             self.result = result
 
-    def reroll(self):
-        return self.__class__(result=random.randint(1, self.die_max_value),
+    def reroll(self, rng: Optional[DiceRNG] = None):
+        rng = rng or get_rng()
+        return self.__class__(result=rng.randint(self.die_max_value),
                               die_max_value=self.die_max_value)
 
     @property
@@ -80,35 +90,90 @@ DieResultSet = Union[Iterable[DieResult], Generator[DieResult, None, None]]
 
 
 class DiceResult:
-    """Summed iterable of DieResults"""
+    """
+    Summed iterable of DieResults
+
+    Faces are packed into a byte array (wider only for enormous dice) and
+    the dice total is worked out once; DieResults are only created when
+    the result is indexed or iterated.
+    """
+    __slots__ = ('__faces', '__sides', '__dice_total', 'modifier')
 
     def __init__(self, results: DieResultSet):
-        self.rolls = tuple(results)
+        rolls = tuple(results)
+        self.__set_faces([roll.die_max_value for roll in rolls],
+                         [int(roll) for roll in rolls])
         self.modifier = 0
 
+    @classmethod
+    def from_faces(cls, die_max_value: int | Sequence[int],
+                   faces: Sequence[int], modifier: int = 0) -> DiceResult:
+        """
+        Build a result straight from die faces, all rolled on a
+        die_max_value-sided die, or each on its own die if die_max_value
+        is a sequence.
+        """
+        result = cls.__new__(cls)
+        if isinstance(die_max_value, int):
+            die_max_value = (die_max_value,) * len(faces)
+        result.__set_faces(die_max_value, faces)
+        result.modifier = int(modifier)
+        return result
+
+    def __set_faces(self, sides: Sequence[int], faces: Sequence[int]):
+        self.__faces = compact_array(faces)
+        self.__dice_total = sum(self.__faces)
+        if sides and all(side == sides[0] for side in sides):
+            self.__sides: int | array = sides[0]
+        else:
+            self.__sides = compact_array(sides)
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        return all(roll.result == other_roll.result and
-                   roll.die_max_value == other_roll.die_max_value
-                   for roll, other_roll in zip(self.rolls, other.rolls))
+        return (self.__faces.tolist() == other.__faces.tolist() and
+                self.die_max_values == other.die_max_values)
 
     def __getitem__(self, index: int):
-        return self.rolls[index]
+        if isinstance(index, slice):
+            return self.rolls[index]
+        face = self.__faces[index]
+        return DieResult(self.__side(index), result=face)
 
     def __iter__(self):
-        return iter(self.rolls)
+        for index, face in enumerate(self.__faces):
+            yield DieResult(self.__side(index), result=face)
 
     def __len__(self):
-        return len(self.rolls)
+        return len(self.__faces)
+
+    def __side(self, index: int) -> int:
+        if isinstance(self.__sides, int):
+            return self.__sides
+        return self.__sides[index]
+
+    @property
+    def rolls(self) -> Tuple[DieResult, ...]:
+        return tuple(self)
+
+    @property
+    def die_max_values(self) -> Tuple[int, ...]:
+        if isinstance(self.__sides, int):
+            return (self.__sides,) * len(self.__faces)
+        return tuple(self.__sides)
+
+    @property
+    def dice_total(self) -> int:
+        """Total of the dice alone, without the modifier."""
+        return self.__dice_total
 
     @property
     def total(self):
-        return sum(map(int, self.rolls)) + self.modifier
+        return self.__dice_total + self.modifier
 
     @property
     def int_results(self):
-        return map(int, self.rolls)
+        return iter(self.__faces)
 
     @property
     def str_results(self):
@@ -116,7 +181,10 @@ class DiceResult:
 
     def __add__(self, value: int | DiceResult) -> DiceResult:
         if isinstance(value, DiceResult):
-            return DiceResult(list(self.rolls) + list(value.rolls))
+            return DiceResult.from_faces(
+                self.die_max_values + value.die_max_values,
+                self.__faces.tolist() + value.__faces.tolist(),
+                modifier=self.modifier)
         else:
             self.modifier = int(value)
         return self
@@ -135,9 +203,21 @@ class DiceResult:
                                                           self.modifier)
 
 
+def compact_array(values: Iterable[int]) -> array:
+    """Pack ints into the narrowest array typecode that holds them all."""
+    values = list(values)
+    for typecode in ('B', 'H', 'i', 'q'):
+        try:
+            return array(typecode, values)
+        except OverflowError:
+            continue
+    raise OverflowError('Die results must fit in 64 bits')
+
+
 def roll_dice(mDn: str,
-              rerolling_if: Optional[Iterable[str]] = None,
-              dropping_lowest: bool = False) -> DiceResult:
+              rerolling_if: RerollConditions = None,
+              dropping_lowest: bool = False,
+              rng: Optional[DiceRNG] = None) -> DiceResult:
     """
     Syntactic sugar for roll with other functions as options.
 
@@ -148,32 +228,116 @@ def roll_dice(mDn: str,
     roll_dice('4d6', rerolling_if='x==1', dropping_lowest=True)
     is equivalent to
     drop_lowest(reroll_if(roll('4d6'), 'x==1'))
+
+    mDn may also be any expression understood by compile_dice, like
+    '2d6+3' or '4d6kh3'; it is only parsed the first time it is seen.
+
+    Dice come from rng if given, or else from get_rng().
     """
-    rolls = roll(mDn)
-    if rerolling_if:
-        rolls = reroll_if(rolls, rerolling_if)
-    if dropping_lowest:
-        rolls = drop_lowest(rolls)
+    plan = compile_dice(mDn)
+    if rerolling_if or dropping_lowest:
+        plan = _plan_with_options(plan,
+                                  RerollPolicy.from_conditions(rerolling_if),
+                                  bool(dropping_lowest))
+    return plan.roll(rng)
+
 
-    return DiceResult(rolls)
+@functools.lru_cache(maxsize=512)
+def _plan_with_options(plan: DicePlan, rerolling_if: RerollPolicy,
+                       dropping_lowest: bool) -> DicePlan:
+    return plan.with_options(rerolling_if, dropping_lowest)
 
 
-def roll(mDn: str) -> DieResultSet:
+def roll(mDn: str, rng: Optional[DiceRNG] = None) -> DieResultSet:
     """
     Roll mDn, a standard dice signifier like '3d6' (m=3, n=6)
 
     Returns a DieResult, like <DieResult: 4 (d6)>
 
+    Raises ValueError or TypeError on improper mDn formatting.
+    """
+    m, n = parse_mDn(mDn)
+    rng = rng or get_rng()
+    for die_roll in range(m):
+        yield DieResult(die_max_value=n, result=rng.randint(n))
+
+    return None
+
+
+def roll_batch(mDn: str, n: int, summed: bool = False,
+               rerolling_if: RerollConditions = None,
+               dropping_lowest: int = 0, dropping_highest: int = 0,
+               rng: Optional[DiceRNG] = None) -> np.ndarray:
+    """
+    Roll mDn n times at once, without creating any DieResults.
+
+    Returns an array of die faces shaped (n, m), or, if summed is True,
+    a vector of n totals. roll_batch('4d6', 1000, summed=True) gives the
+    same distribution as 1000 calls to roll_dice('4d6').total.
+
+    Dice matching rerolling_if are rerolled once, as in reroll_if(); then
+    the dropping_lowest lowest and dropping_highest highest dice of each
+    roll are dropped, leaving m - dropped columns in no particular order.
+
+    Dice come from rng if given, or else from get_rng(); by default that
+    is seeded from the random module, so random.seed() makes batches
+    reproducible just like roll().
+    """
+    m, sides = parse_mDn(mDn)
+    n = int(n)
+    if n < 0:
+        raise ValueError('Cannot roll a negative number of times')
+
+    rng = rng or get_rng()
+    if sides < 1:
+        faces = np.zeros((n, m), dtype=face_dtype(sides))
+    else:
+        faces = rng.faces(sides, (n, m), dtype=face_dtype(sides))
+    if rerolling_if:
+        RerollPolicy.from_conditions(rerolling_if).apply(faces, sides, rng)
+    if dropping_lowest or dropping_highest:
+        faces = select_batch(faces, int(dropping_lowest),
+                             int(dropping_highest))
+    if summed:
+        return faces.sum(axis=1, dtype=np.int64)
+    return faces
+
+
+def parse_mDn(mDn: str) -> Tuple[int, int]:
+    """
+    Split mDn, a standard dice signifier like '3d6', into (m, n).
+
     Raises ValueError or TypeError on improper mDn formatting.
     """
     if not mDn:
         raise ValueError('Must specify a die roll like "3d6"')
 
     m, n = map(int, str(mDn).split('d', 1))
-    for die_roll in range(m):
-        yield DieResult(die_max_value=n, result=random.randint(1, n))
+    return m, n
 
-    return None
+
+def face_dtype(die_max_value: int) -> np.dtype:
+    """Smallest unsigned dtype able to hold every face of a die."""
+    if die_max_value <= np.iinfo(np.uint8).max:
+        return np.dtype(np.uint8)
+    elif die_max_value <= np.iinfo(np.uint16).max:
+        return np.dtype(np.uint16)
+    return np.dtype(np.int64)
+
+
+CONDITION_REGEX = re.compile(r'^(x|\d+) ?(<|>|<=|>=|==|!=) ?(x|\d+)')
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+OPPOSITE_OPERATORS = {'<': '>', '<=': '>=', '==': '==',
+                      '>': '<', '>=': '<=', '!=': '!='}
 
 
 def parse_condition(condition: str) -> Tuple[Callable[[int, int], bool], int]:
@@ -184,8 +348,7 @@ def parse_condition(condition: str) -> Tuple[Callable[[int, int], bool], int]:
 
     If a string like '1 > x' is used, it will be converted to 'x < 1' first.
     """
-    condition_regex = re.compile(r'^(x|\d+) ?(<|>|<=|>=|==|!=) ?(x|\d+)')
-    matches = condition_regex.match(str(condition))
+    matches = CONDITION_REGEX.match(str(condition))
     if not matches:
         raise ValueError('Unrecognized condition string')
 
@@ -194,45 +357,570 @@ def parse_condition(condition: str) -> Tuple[Callable[[int, int], bool], int]:
     else:
         op, val = matches[2], int(matches[1])
 
-    op_dict = {
-        '<': operator.lt,
-        '<=': operator.le,
-        '==': operator.eq,
-        '!=': operator.ne,
-        '>=': operator.ge,
-        '>': operator.gt,
-    }
-
-    opposite_op = {'<': '>', '<=': '>=', '==': '==',
-                   '>': '<', '>=': '<=', '!=': '!='}
-
     try:
         if matches[1] == 'x':
-            real_op = op_dict[op]
+            real_op = OPERATORS[op]
         else:
-            real_op = op_dict[opposite_op[op]]
+            real_op = OPERATORS[OPPOSITE_OPERATORS[op]]
     except KeyError:
         raise ValueError('Unrecognized operation "%s"' % op)
 
     return real_op, val
 
 
+class RerollPolicy:
+    """
+    Reroll conditions like 'x==1' parsed once, for use wherever
+    rerolling_if is accepted.
+
+    A die is rerolled (once) if its face matches any of the conditions.
+    Policies combine with |. Which faces match is worked out up front, so
+    checking a face, or masking a whole array of faces, is a table lookup.
+    """
+    def __init__(self, conditions: Union[str, Iterable[str]] = ()):
+        if isinstance(conditions, str):
+            conditions = (conditions,)
+        self.__source = tuple(map(str, conditions))
+        parsed = []
+        for condition in map(parse_condition, self.__source):
+            if condition not in parsed:
+                parsed.append(condition)
+        self.__conditions = tuple(parsed)
+        self.__table = np.zeros(0, dtype=bool)
+        self.face_table(100)
+
+    @classmethod
+    def from_conditions(cls, conditions: RerollConditions) -> RerollPolicy:
+        """The policy for conditions, which may already be a policy."""
+        if isinstance(conditions, RerollPolicy):
+            return conditions
+        if isinstance(conditions, str):
+            conditions = (conditions,)
+        return _reroll_policy(tuple(conditions or ()))
+
+    @property
+    def conditions(self) -> Tuple[Tuple[Callable[[int, int], bool], int],
+                                  ...]:
+        return self.__conditions
+
+    def matches(self, face: int) -> bool:
+        return any(op(face, val) for op, val in self.conditions)
+
+    def face_table(self, max_face: int) -> np.ndarray:
+        """Boolean array, indexed by face, of the faces this rerolls."""
+        if len(self.__table) <= max_face:
+            self.__table = np.array([self.matches(face)
+                                     for face in range(max_face + 1)],
+                                    dtype=bool)
+            self.__table.flags.writeable = False
+        return self.__table
+
+    def mask(self, faces: np.ndarray) -> np.ndarray:
+        """Which of an array of faces this policy rerolls."""
+        if not faces.size:
+            return np.zeros(faces.shape, dtype=bool)
+        return self.face_table(int(faces.max()))[faces]
+
+    def apply(self, faces: np.ndarray, die_max_value: int,
+              rng: Optional[DiceRNG] = None) -> np.ndarray:
+        """
+        Reroll, in place and in one masked pass, every face in a batch of
+        die_max_value-sided dice that matches this policy. Returns faces.
+        """
+        if self.conditions:
+            mask = self.mask(faces)
+            rerolls = int(np.count_nonzero(mask))
+            if rerolls:
+                rng = rng or get_rng()
+                faces[mask] = rng.faces(die_max_value, rerolls,
+                                        dtype=faces.dtype)
+        return faces
+
+    def __call__(self, face: int) -> bool:
+        if face is not None and 0 <= face < len(self.__table):
+            return bool(self.__table[face])
+        return self.matches(face)
+
+    def __bool__(self):
+        return bool(self.conditions)
+
+    def __or__(self, other: RerollConditions) -> RerollPolicy:
+        other = self.from_conditions(other)
+        return self.from_conditions(self.__source + other.__source)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return set(self.conditions) == set(other.conditions)
+
+    def __hash__(self):
+        return hash(frozenset(self.conditions))
+
+    def __repr__(self):
+        return 'RerollPolicy(%r)' % (self.__source,)
+
+
+RerollConditions = Union[str, Iterable[str], RerollPolicy, None]
+
+
+@functools.lru_cache(maxsize=512)
+def _reroll_policy(conditions: Tuple[str, ...]) -> RerollPolicy:
+    return RerollPolicy(conditions)
+
+
 def reroll_if(rolls: DieResultSet,
-              conditions: Union[str, Iterable[str]]) -> DieResultSet:
-    if isinstance(conditions, str):
-        conditions = (conditions,)
+              conditions: RerollConditions,
+              rng: Optional[DiceRNG] = None) -> DieResultSet:
+    policy = RerollPolicy.from_conditions(conditions)
 
     for roll in rolls:
-        if any(op(roll.result, val) for op, val in map(parse_condition,
-                                                       conditions)):
-            yield roll.reroll()
+        if policy(roll.result):
+            yield roll.reroll(rng)
         else:
             yield roll
 
     return None
 
 
-def drop_lowest(rolls: DieResultSet) -> DieResultSet:
+def drop_lowest(rolls: DieResultSet, count: int = 1) -> DieResultSet:
+    """
+    Drop the count lowest rolls, keeping the rest in order. Of tied rolls,
+    the first ones are dropped.
+    """
+    result = list(rolls)
+    if count > len(result):
+        raise ValueError('Cannot drop %i of %i dice' % (count, len(result)))
+    faces = [int(die) for die in result]
+    return [result[i] for i in kept_indices(faces, drop_lowest=count)]
+
+
+def drop_highest(rolls: DieResultSet, count: int = 1) -> DieResultSet:
+    """Drop the count highest rolls, keeping the rest in order."""
+    result = list(rolls)
+    if count > len(result):
+        raise ValueError('Cannot drop %i of %i dice' % (count, len(result)))
+    faces = [int(die) for die in result]
+    return [result[i] for i in kept_indices(faces, drop_highest=count)]
+
+
+def keep_highest(rolls: DieResultSet, count: int) -> DieResultSet:
+    """Keep only the count highest rolls, like 10d6kh3."""
     result = list(rolls)
-    result.remove(min(result))
-    return result
+    return drop_lowest(result, max(len(result) - count, 0))
+
+
+def keep_lowest(rolls: DieResultSet, count: int) -> DieResultSet:
+    """Keep only the count lowest rolls, like 20d20kl5."""
+    result = list(rolls)
+    return drop_highest(result, max(len(result) - count, 0))
+
+
+def kept_indices(faces: Sequence[int], drop_lowest: int = 0,
+                 drop_highest: int = 0) -> List[int]:
+    """
+    Indices, in order, of the faces left after dropping the drop_lowest
+    lowest and drop_highest highest. Only the dropped dice are selected
+    (by heap), so dropping a few of many dice never sorts them all.
+    """
+    dropped = set()
+    if drop_lowest:
+        dropped.update(heapq.nsmallest(drop_lowest, range(len(faces)),
+                                       key=faces.__getitem__))
+    if drop_highest:
+        remaining = [i for i in range(len(faces)) if i not in dropped]
+        dropped.update(heapq.nlargest(drop_highest, remaining,
+                                      key=faces.__getitem__))
+    return [i for i in range(len(faces)) if i not in dropped]
+
+
+def select_batch(faces: np.ndarray, drop_lowest: int = 0,
+                 drop_highest: int = 0) -> np.ndarray:
+    """
+    The vectorized kept_indices: drop the drop_lowest lowest and
+    drop_highest highest faces from every row of a batch, by partial
+    partitioning where that is enough. Kept faces come back in no
+    particular order.
+    """
+    dice = faces.shape[-1]
+    kept = dice - drop_lowest - drop_highest
+    if kept <= 0:
+        return faces[..., :0]
+    if drop_lowest and drop_highest:
+        faces = np.partition(faces, (drop_lowest, dice - drop_highest - 1),
+                             axis=-1)
+    elif drop_lowest:
+        faces = np.partition(faces, drop_lowest, axis=-1)
+    elif drop_highest:
+        faces = np.partition(faces, kept - 1, axis=-1)
+    return faces[..., drop_lowest:drop_lowest + kept]
+
+
+MAX_EXPLOSIONS = 20
+
+
+class DiceGroup(NamedTuple):
+    """
+    One mDn term of a dice expression and everything done to its dice.
+
+    Each die matching the reroll policy is rerolled once, then the
+    drop_lowest lowest and drop_highest highest dice are dropped. With
+    advantage (1) or disadvantage (-1) the whole group is rolled twice
+    and the better (or worse) total is kept.
+
+    Exploding dice roll one more die every time they show their highest
+    face, up to MAX_EXPLOSIONS times in a row. Exploding dice can't also
+    be kept or dropped.
+    """
+    dice_count: int
+    sides: int
+    reroll: RerollPolicy = RerollPolicy()
+    drop_lowest: int = 0
+    drop_highest: int = 0
+    advantage: int = 0
+    explode: bool = False
+
+    def roll(self, rng: Optional[DiceRNG] = None) -> List[int]:
+        rng = rng or get_rng()
+        faces = self.roll_once(rng)
+        if self.advantage:
+            other_faces = self.roll_once(rng)
+            if ((self.advantage > 0 and sum(other_faces) > sum(faces)) or
+                    (self.advantage < 0 and sum(other_faces) < sum(faces))):
+                faces = other_faces
+        return faces
+
+    def roll_once(self, rng: DiceRNG) -> List[int]:
+        sides = self.sides
+        randint = rng.randint
+        faces = [randint(sides) for die in range(self.dice_count)]
+        if self.reroll:
+            reroll = self.reroll
+            faces = [randint(sides) if reroll(face) else face
+                     for face in faces]
+        if self.explode:
+            exploding = faces.count(sides)
+            for chain in range(MAX_EXPLOSIONS):
+                if not exploding:
+                    break
+                extra = [randint(sides) for die in range(exploding)]
+                faces.extend(extra)
+                exploding = extra.count(sides)
+        if self.drop_lowest or self.drop_highest:
+            faces = [faces[i] for i in kept_indices(faces, self.drop_lowest,
+                                                    self.drop_highest)]
+        return faces
+
+    def roll_batch(self, n: int, rng: Optional[DiceRNG] = None) -> np.ndarray:
+        """
+        The kept faces of n rolls of this group, shaped (n, dice kept).
+        When dice are dropped, each row's faces come in no particular order.
+        Exploding dice come back as the total of each die's explosions.
+        """
+        rng = rng or get_rng()
+        faces = self.roll_batch_once(n, rng)
+        if self.advantage:
+            other_faces = self.roll_batch_once(n, rng)
+            totals = faces.sum(axis=1, dtype=np.int64)
+            other_totals = other_faces.sum(axis=1, dtype=np.int64)
+            if self.advantage > 0:
+                use_other = other_totals > totals
+            else:
+                use_other = other_totals < totals
+            faces[use_other] = other_faces[use_other]
+        return faces
+
+    def roll_batch_once(self, n: int, rng: DiceRNG) -> np.ndarray:
+        dtype = face_dtype(self.sides)
+        if not self.dice_count:
+            return np.zeros((n, 0), dtype=dtype)
+        faces = rng.faces(self.sides, (n, self.dice_count), dtype=dtype)
+        if self.reroll:
+            self.reroll.apply(faces, self.sides, rng)
+        if self.explode:
+            faces = faces.astype(np.int64)
+            exploding = faces == self.sides
+            for chain in range(MAX_EXPLOSIONS):
+                count = int(exploding.sum())
+                if not count:
+                    break
+                extra = rng.faces(self.sides, count, dtype=np.int64)
+                faces[exploding] += extra
+                exploding[exploding] = extra == self.sides
+        if self.drop_lowest or self.drop_highest:
+            faces = select_batch(faces, self.drop_lowest, self.drop_highest)
+        return faces
+
+
+class DicePlan:
+    """
+    A compiled dice expression like '2d6+1d4+3' or '4d6kh3', ready to be
+    rolled any number of times without parsing it again.
+
+    Use compile_dice() rather than building plans by hand, so that plans
+    for the same expression are shared.
+    """
+    def __init__(self, expression: str, groups: Iterable[DiceGroup] = (),
+                 modifier: int = 0):
+        self.__expression = str(expression)
+        self.__groups = tuple(groups)
+        self.__modifier = int(modifier)
+
+    @property
+    def expression(self) -> str:
+        return self.__expression
+
+    @property
+    def groups(self) -> Tuple[DiceGroup, ...]:
+        return self.__groups
+
+    @property
+    def modifier(self) -> int:
+        return self.__modifier
+
+    def roll(self, rng: Optional[DiceRNG] = None) -> DiceResult:
+        if len(self.groups) == 1:
+            group = self.groups[0]
+            return DiceResult.from_faces(group.sides, group.roll(rng),
+                                         modifier=self.modifier)
+
+        rng = rng or get_rng()
+        sides: List[int] = []
+        faces: List[int] = []
+        for group in self.groups:
+            group_faces = group.roll(rng)
+            sides.extend([group.sides] * len(group_faces))
+            faces.extend(group_faces)
+        return DiceResult.from_faces(sides, faces, modifier=self.modifier)
+
+    def roll_totals(self, n: int,
+                    rng: Optional[DiceRNG] = None) -> np.ndarray:
+        """Totals of n rolls of this plan at once, as a NumPy vector."""
+        rng = rng or get_rng()
+        totals = np.full(int(n), self.modifier, dtype=np.int64)
+        for group in self.groups:
+            totals += group.roll_batch(n, rng).sum(axis=1, dtype=np.int64)
+        return totals
+
+    def with_options(self, rerolling_if: RerollConditions = None,
+                     dropping_lowest: bool = False) -> DicePlan:
+        """
+        The roll_dice() options applied to every group of this plan:
+        extra reroll conditions and dropping one more lowest die.
+        """
+        policy = RerollPolicy.from_conditions(rerolling_if)
+        groups = (group._replace(
+                      reroll=group.reroll | policy,
+                      drop_lowest=group.drop_lowest + int(dropping_lowest))
+                  for group in self.groups)
+        return self.__class__(self.expression, groups, self.modifier)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return (self.groups == other.groups and
+                self.modifier == other.modifier)
+
+    def __hash__(self):
+        return hash((self.groups, self.modifier))
+
+    def __repr__(self):
+        return 'compile_dice(%r)' % self.expression
+
+
+TERM_REGEX = re.compile(r'\s*(?P<sign>[+-]?)\s*(?:'
+                        r'(?P<count>\d*)d(?P<sides>\d+)'
+                        r'(?P<options>(?:kh\d*|kl\d*|dh\d*|dl\d*|adv|dis|!|'
+                        r'r(?:<=|>=|==|!=|<|>|=)?\d+)*)'
+                        r'|(?P<constant>\d+))\s*', re.IGNORECASE)
+OPTION_REGEX = re.compile(r'(kh|kl|dh|dl|adv|dis|r|!)(<=|>=|==|!=|<|>|=)?'
+                          r'(\d*)', re.IGNORECASE)
+
+
+def compile_dice(expression: str) -> DicePlan:
+    """
+    Compile a dice expression into a DicePlan. Plans are kept in a bounded
+    LRU cache keyed by the expression, so compiling is only paid once.
+
+    Expressions are mDn terms and integers joined by + or -. Terms may be
+    followed by any of:
+        khN / klN    keep the highest / lowest N dice (N defaults to 1)
+        dhN / dlN    drop the highest / lowest N dice (N defaults to 1)
+        adv / dis    roll the term twice, keep the better / worse total
+        rN, r<N...   reroll each die once if it equals (or compares to) N
+        !            explode: roll another die on each highest face
+
+    compile_dice('4d6r1dl') rolls like roll_dice('4d6', 'x==1', True).
+
+    Raises ValueError on improper expressions.
+    """
+    if not expression:
+        raise ValueError('Must specify a die roll like "3d6"')
+    return _compile_dice(str(expression))
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_dice(expression: str) -> DicePlan:
+    groups = []
+    modifier = 0
+    position = 0
+    while position < len(expression):
+        term = TERM_REGEX.match(expression, position)
+        if not term or term.end() == position or (
+                position and not term['sign']):
+            raise ValueError('Unrecognized dice expression '
+                             '"%s"' % expression)
+        position = term.end()
+
+        if term['constant'] is not None:
+            value = int(term['constant'])
+            modifier += -value if term['sign'] == '-' else value
+        elif term['sign'] == '-':
+            raise ValueError('Cannot subtract dice in "%s"' % expression)
+        else:
+            groups.append(parse_dice_group(term['count'], term['sides'],
+                                           term['options']))
+
+    return DicePlan(expression, groups, modifier)
+
+
+def parse_dice_group(count: str, sides: str, options: str) -> DiceGroup:
+    group = DiceGroup(dice_count=int(count or 1), sides=int(sides))
+    for option, op, value in OPTION_REGEX.findall(options):
+        option = option.lower()
+        number = int(value or 1)
+        # Keeping keeps number of the dice left after any earlier drops.
+        surplus = max(group.dice_count - group.drop_lowest -
+                      group.drop_highest - number, 0)
+        if option == 'kh':
+            group = group._replace(drop_lowest=group.drop_lowest + surplus)
+        elif option == 'kl':
+            group = group._replace(drop_highest=group.drop_highest + surplus)
+        elif option == 'dl':
+            group = group._replace(drop_lowest=group.drop_lowest + number)
+        elif option == 'dh':
+            group = group._replace(drop_highest=group.drop_highest + number)
+        elif option == 'adv':
+            group = group._replace(advantage=1)
+        elif option == 'dis':
+            group = group._replace(advantage=-1)
+        elif option == '!':
+            group = group._replace(explode=True)
+        else:
+            condition = 'x%s%i' % ('==' if op in ('', '=') else op, number)
+            group = group._replace(reroll=group.reroll | condition)
+    dropped = group.drop_lowest + group.drop_highest
+    if dropped and dropped >= group.dice_count:
+        raise ValueError('Cannot drop %i of %i dice' % (dropped,
+                                                        group.dice_count))
+    if group.explode:
+        if group.sides < 2:
+            raise ValueError('A d%i cannot explode' % group.sides)
+        if group.drop_lowest or group.drop_highest:
+            raise ValueError('Cannot keep or drop exploding dice')
+    return group
+
+
+def roll_d20(advantage: int = 0,
+             rng: Optional[DiceRNG] = None) -> DiceResult:
+    """
+    A d20 rolled straight, with advantage (advantage > 0) or with
+    disadvantage (advantage < 0), as a DiceResult holding the die kept.
+    """
+    rng = rng or get_rng()
+    face = rng.randint(20)
+    if advantage:
+        other_face = rng.randint(20)
+        face = (max(face, other_face) if advantage > 0
+                else min(face, other_face))
+    return DiceResult.from_faces(20, (face,))
+
+
+def roll_d20_batch(n: int, advantage: int = 0,
+                   rng: Optional[DiceRNG] = None) -> np.ndarray:
+    """The faces kept from n rolls of roll_d20(advantage), as a vector."""
+    rng = rng or get_rng()
+    n = int(n)
+    if not advantage:
+        return rng.faces(20, n, dtype=np.uint8)
+    faces = rng.faces(20, (n, 2), dtype=np.uint8)
+    return faces.max(axis=1) if advantage > 0 else faces.min(axis=1)
+
+
+class PoolResult(NamedTuple):
+    """How many dice of a pool succeeded, and the dice themselves."""
+    successes: int
+    dice: DiceResult
+
+
+def roll_pool(expression: str, success_on: int,
+              rng: Optional[DiceRNG] = None) -> PoolResult:
+    """
+    Roll a dice pool like '6d10' and count the dice showing success_on or
+    higher. Any options of compile_dice() apply first, except exploding;
+    constant terms are ignored.
+    """
+    plan = pool_plan(expression)
+    dice = plan.roll(rng)
+    successes = sum(face >= success_on for face in dice.int_results)
+    return PoolResult(successes, dice)
+
+
+def roll_pool_batch(expression: str, n: int, success_on: int,
+                    rng: Optional[DiceRNG] = None) -> np.ndarray:
+    """The successes of n rolls of roll_pool() at once, as a vector."""
+    plan = pool_plan(expression)
+    rng = rng or get_rng()
+    successes = np.zeros(int(n), dtype=np.int64)
+    for group in plan.groups:
+        successes += (group.roll_batch(n, rng) >= success_on).sum(axis=1)
+    return successes
+
+
+def pool_plan(expression: str) -> DicePlan:
+    plan = compile_dice(expression)
+    if any(group.explode for group in plan.groups):
+        raise ValueError('Cannot count successes of exploding dice')
+    return plan
+
+
+class RollChunk(NamedTuple):
+    """A chunk of totals from roll_stream(), with its summary statistics."""
+    totals: np.ndarray
+    mean: float
+    variance: float
+    minimum: int
+    maximum: int
+
+
+def roll_stream(expression: str, chunk_size: int = 4096,
+                chunks: Optional[int] = None, with_stats: bool = False,
+                rng: Optional[DiceRNG] = None
+                ) -> Generator[Union[np.ndarray, RollChunk], None, None]:
+    """
+    Endlessly roll a dice expression, yielding NumPy arrays of chunk_size
+    totals at a time (or stopping after chunks chunks).
+
+    The expression is compiled once up front; each chunk is then a single
+    batched draw. With with_stats, RollChunks are yielded instead, carrying
+    the chunk's mean, variance, minimum and maximum alongside its totals.
+
+    for totals in roll_stream('4d6kh3', chunks=100):
+        ...
+    """
+    plan = compile_dice(expression)
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        raise ValueError('Chunks must hold at least one roll')
+    rng = rng or get_rng()
+
+    chunk = 0
+    while chunks is None or chunk < chunks:
+        totals = plan.roll_totals(chunk_size, rng)
+        if with_stats:
+            yield RollChunk(totals, float(totals.mean()), float(totals.var()),
+                            int(totals.min()), int(totals.max()))
+        else:
+            yield totals
+        chunk += 1
+
+    return None
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import functools
+import math
+from typing import Dict, Iterable, Sequence, Tuple, Union
+
+import numpy as np
+
+from .dicerolls import (MAX_EXPLOSIONS, DiceGroup, DicePlan, RerollConditions,
+                        RerollPolicy, compile_dice, pool_plan)
+
+
+class Distribution:
+    """
+    Exact probability mass function of an integer-valued roll.
+
+    probabilities[i] is the chance of rolling offset + i; impossible outcomes
+    at either end are trimmed off. Distributions are
+    immutable, since dice_distribution hands the same instance to every
+    caller asking about the same roll.
+    """
+    def __init__(self, probabilities: Sequence[float] | np.ndarray,
+                 offset: int = 0):
+        probs = np.array(probabilities, dtype=np.float64)
+        if probs.ndim != 1:
+            raise ValueError('A distribution must be one-dimensional')
+        possible = np.flatnonzero(probs > 0)
+        if not len(possible):
+            raise ValueError('A distribution needs at least one outcome')
+        probs = probs[possible[0]:possible[-1] + 1]
+        probs.flags.writeable = False
+        self.__probabilities = probs
+        self.__offset = int(offset) + int(possible[0])
+
+    @classmethod
+    def constant(cls, value: int) -> Distribution:
+        return cls((1.,), offset=value)
+
+    @classmethod
+    def mixture(cls, weighted: Iterable[Tuple[float, Distribution]]
+                ) -> Distribution:
+        """
+        The distribution of picking one of several rolls, each with the
+        given chance, and rolling it. The chances should add up to 1.
+        """
+        weighted = [(weight, dist) for weight, dist in weighted if weight > 0]
+        low = min(dist.min_value for weight, dist in weighted)
+        high = max(dist.max_value for weight, dist in weighted)
+        probs = np.zeros(high - low + 1)
+        for weight, dist in weighted:
+            start = dist.min_value - low
+            probs[start:start + len(dist.probabilities)] += \
+                weight * dist.probabilities
+        return cls(probs, offset=low)
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        return self.__probabilities
+
+    @property
+    def offset(self) -> int:
+        return self.__offset
+
+    @property
+    def min_value(self) -> int:
+        return self.offset
+
+    @property
+    def max_value(self) -> int:
+        return self.offset + len(self.probabilities) - 1
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.arange(self.min_value, self.max_value + 1)
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(self.values, self.probabilities))
+
+    @property
+    def variance(self) -> float:
+        deviations = self.values - self.mean
+        return float(np.dot(deviations * deviations, self.probabilities))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def pmf(self, value: int) -> float:
+        """P(X == value)"""
+        index = int(value) - self.offset
+        if 0 <= index < len(self.probabilities):
+            return float(self.probabilities[index])
+        return 0.
+
+    def cdf(self, value: int) -> float:
+        """P(X <= value)"""
+        index = int(value) - self.offset
+        if index < 0:
+            return 0.
+        return min(float(self.probabilities[:index + 1].sum()), 1.)
+
+    def at_least(self, value: int) -> float:
+        """P(X >= value)"""
+        return max(1. - self.cdf(int(value) - 1), 0.)
+
+    def clip_below(self, low: int) -> Distribution:
+        """Distribution of max(X, low)."""
+        if low <= self.min_value:
+            return self
+        if low >= self.max_value:
+            return Distribution.constant(low)
+        probs = self.probabilities[low - self.offset:].copy()
+        probs[0] += self.probabilities[:low - self.offset].sum()
+        return Distribution(probs, offset=low)
+
+    def as_dict(self) -> Dict[int, float]:
+        return {int(value): float(prob)
+                for value, prob in zip(self.values, self.probabilities)
+                if prob > 0}
+
+    def __add__(self, other: int | Distribution) -> Distribution:
+        """Distribution of the sum of two independent rolls, or a shift."""
+        if isinstance(other, Distribution):
+            return Distribution(np.convolve(self.probabilities,
+                                            other.probabilities),
+                                offset=self.offset + other.offset)
+        return Distribution(self.probabilities,
+                            offset=self.offset + int(other))
+
+    def __radd__(self, other: int) -> Distribution:
+        return self.__add__(other)
+
+    def __sub__(self, value: int) -> Distribution:
+        return self.__add__(-int(value))
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return (self.offset == other.offset and
+                len(self.probabilities) == len(other.probabilities) and
+                bool(np.allclose(self.probabilities, other.probabilities)))
+
+    def __repr__(self):
+        return 'Distribution(%r, offset=%r)' % (self.probabilities.tolist(),
+                                                self.offset)
+
+    def __str__(self):
+        return '<Distribution: %i..%i (Mean %.3f; SD %.3f)>' % (
+            self.min_value, self.max_value, self.mean, self.std)
+
+
+def dice_distribution(mDn: str, rerolling_if: RerollConditions = None,
+                      dropping_lowest: bool = False) -> Distribution:
+    """
+    Exact distribution of roll_dice(mDn, rerolling_if, dropping_lowest).total
+
+    mDn may be anything roll_dice() accepts, like '2d6+3' or '4d6kh3'.
+    Matches the sampling semantics exactly: each die matching any of the
+    rerolling_if conditions is rerolled once and the new face is kept
+    whatever it is, then the single lowest die is dropped.
+
+    Results are memoized, so asking twice about the same roll is free.
+    """
+    plan = compile_dice(mDn)
+    if rerolling_if or dropping_lowest:
+        plan = plan.with_options(rerolling_if, bool(dropping_lowest))
+    return plan_distribution(plan)
+
+
+def plan_distribution(plan: Union[str, DicePlan]) -> Distribution:
+    """
+    Exact distribution of compile_dice(plan).roll().total, for any
+    expression compile_dice() understands: rerolls, keeping and dropping,
+    advantage and exploding dice included.
+
+    Results are memoized, so asking twice about the same roll is free.
+    """
+    if not isinstance(plan, DicePlan):
+        plan = compile_dice(plan)
+    return _plan_distribution(plan)
+
+
+@functools.lru_cache(maxsize=1024)
+def _plan_distribution(plan: DicePlan) -> Distribution:
+    distribution = Distribution.constant(plan.modifier)
+    for group in plan.groups:
+        distribution += group_distribution(group)
+    return distribution
+
+
+def group_distribution(group: DiceGroup) -> Distribution:
+    """Exact distribution of the total of one DiceGroup's kept dice."""
+    if group.dice_count <= group.drop_lowest + group.drop_highest:
+        return Distribution.constant(0)     # no dice kept, as in roll()
+    if group.sides < 1:
+        raise ValueError('Dice need at least one face')
+    die = die_face_probabilities(group.sides, group.reroll)
+    if group.explode:
+        die = exploding_face_probabilities(die)
+    if group.drop_lowest or group.drop_highest:
+        totals = kept_sum_probabilities(die, group.dice_count,
+                                        group.drop_lowest, group.drop_highest)
+    else:
+        totals = convolve_power(die, group.dice_count)
+
+    if group.advantage:
+        below = np.cumsum(totals)
+        if group.advantage > 0:
+            # P(best of two <= t) = P(one <= t) ** 2
+            totals = np.diff(below * below, prepend=0.)
+        else:
+            above = 1. - below + totals
+            totals = above * above - np.append(above[1:] * above[1:], 0.)
+        totals = np.clip(totals, 0., None)
+    return Distribution(totals)
+
+
+def exploding_face_probabilities(die: np.ndarray) -> np.ndarray:
+    """
+    Probabilities of each total of a die that explodes on its highest face,
+    given the probabilities of its first face. Dice rolled in explosions
+    are never rerolled, and stop after MAX_EXPLOSIONS in a row.
+    """
+    n = len(die) - 1
+    uniform = np.full(n + 1, 1. / n)
+    uniform[0] = 0.
+    totals = np.zeros((MAX_EXPLOSIONS + 1) * n + 1)
+    totals[:n] = die[:n]
+    chance = die[n]     # of still exploding after this many dice
+    for chain in range(1, MAX_EXPLOSIONS + 1):
+        start = chain * n
+        totals[start + 1:start + n] = chance * uniform[1:n]
+        chance *= uniform[n]
+    totals[-1] = chance
+    return totals
+
+
+def kept_sum_probabilities(die: np.ndarray, m: int, drop_lowest: int = 0,
+                           drop_highest: int = 0) -> np.ndarray:
+    """
+    Distribution of the sum of m dice with face probabilities die, after
+    dropping the drop_lowest lowest and drop_highest highest, indexed by sum.
+
+    Goes through the faces from lowest to highest, counting the ways the
+    next few dice in sorted order can all show that face; only the ones
+    landing in the kept middle of the order add to the sum.
+    """
+    if drop_lowest + drop_highest > m:
+        raise ValueError('Cannot drop %i of %i dice' % (
+            drop_lowest + drop_highest, m))
+    kept_end = m - drop_highest
+    n = len(die) - 1
+    length = (kept_end - drop_lowest) * n + 1
+    # ways[j] is the distribution of the kept sum so far, given the
+    # lowest j dice have been placed on faces already gone through.
+    ways = [np.zeros(length) for placed in range(m + 1)]
+    ways[0][0] = 1.
+    for face in range(1, n + 1):
+        if not die[face]:
+            continue
+        next_ways = [w.copy() for w in ways]
+        for placed in range(m):
+            if not ways[placed].any():
+                continue
+            for count in range(1, m - placed + 1):
+                kept = max(min(placed + count, kept_end) -
+                           max(placed, drop_lowest), 0)
+                weight = math.comb(m - placed, count) * die[face] ** count
+                shift = face * kept
+                next_ways[placed + count][shift:] += (
+                    weight * ways[placed][:length - shift])
+        ways = next_ways
+    return ways[m]
+
+
+def pool_distribution(expression: str, success_on: int) -> Distribution:
+    """
+    Exact distribution of roll_pool(expression, success_on).successes, for
+    pools whose dice are not kept, dropped or rolled with advantage.
+    """
+    distribution = Distribution.constant(0)
+    for group in pool_plan(expression).groups:
+        if group.drop_lowest or group.drop_highest or group.advantage:
+            raise ValueError('Only plain (or rerolled) dice pools have '
+                             'exact distributions')
+        die = die_face_probabilities(group.sides, group.reroll)
+        success = float(die[max(int(success_on), 1):].sum())
+        distribution += Distribution(convolve_power(
+            np.array((1. - success, success)), group.dice_count))
+    return distribution
+
+
+def die_face_probabilities(n: int,
+                           reroll: RerollConditions = None) -> np.ndarray:
+    """
+    Probabilities of each face of a dn, indexed by face value, when any
+    face matching reroll is rerolled once.
+    """
+    rerolled = RerollPolicy.from_conditions(reroll).mask(np.arange(n + 1))
+    rerolled[0] = False
+
+    probs = np.full(n + 1, 1. / n)
+    probs[0] = 0.
+    probs[rerolled] = 0.
+    probs[1:] += rerolled.sum() / (n * n)
+    return probs
+
+
+def convolve_power(probabilities: np.ndarray, m: int) -> np.ndarray:
+    """Distribution of the sum of m independent draws, indexed by sum."""
+    result = np.ones(1)
+    for _ in range(m):
+        result = np.convolve(result, probabilities)
+    return result
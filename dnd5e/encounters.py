@@ -0,0 +1,350 @@
+"""
+Encounters: sides of Characters fighting it out with attack(), turn by
+turn in initiative order, until only one side is left standing.
+
+    fight = Encounter([hero], [kobold, kobold_2], target_policy=weakest)
+    result = fight.run()
+
+Who attacks whom, and how, is up to pluggable policies:
+
+    target_policy(attacker, foes, rng) -> one of the living foes
+    weapon_policy(attacker, target) -> the AttackOptions to attack with
+
+Encounters remember how everyone started out, so the same Encounter can
+be run again and again; every run starts from the same wounds and
+weapons. simulate() runs millions of them across a process pool:
+
+    summary = simulate(Encounter([hero], copies(kobold, 3)), 10 ** 6,
+                       seed=42, workers=8)
+"""
+from __future__ import annotations
+
+import copy
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import (Callable, Dict, Iterator, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+import numpy as np
+
+from .characters import AttackEvent, Character, HitType
+from .events import get_bus
+from .items import Weapon
+from .rng import DiceRNG, PooledRNG, get_rng
+from .stats import Accumulator, RunningStats
+
+
+class AttackOptions(NamedTuple):
+    main_hand: bool = True
+    using_two_hands: bool = False
+    distance: int = 5
+
+
+ONE_HANDED = AttackOptions()
+TWO_HANDED = AttackOptions(using_two_hands=True)
+OFF_HAND = AttackOptions(main_hand=False)
+THROWN = AttackOptions(distance=20)
+
+TargetPolicy = Callable[[Character, List[Character], DiceRNG], Character]
+WeaponPolicy = Callable[[Character, Character], AttackOptions]
+
+
+def first_foe(attacker: Character, foes: List[Character],
+              rng: DiceRNG) -> Character:
+    return foes[0]
+
+
+def random_foe(attacker: Character, foes: List[Character],
+               rng: DiceRNG) -> Character:
+    return foes[rng.randint(len(foes)) - 1]
+
+
+def weakest_foe(attacker: Character, foes: List[Character],
+                rng: DiceRNG) -> Character:
+    """The foe with the fewest hit points left, to finish them off."""
+    return min(foes, key=hp_left)
+
+
+def hp_left(character: Character) -> int:
+    return character.hp
+
+
+def melee(attacker: Character, target: Character) -> AttackOptions:
+    """
+    Close in and strike with the main hand, using both hands for
+    two-handed weapons and for versatile ones when the other hand is free.
+    Attacks with the off hand if only that hand holds a weapon.
+    """
+    main_hand, off_hand = attacker.wielding
+    if main_hand is None:
+        return ONE_HANDED if off_hand is None else OFF_HAND
+    if main_hand.requires_two_hands or (
+            main_hand.versatile and off_hand is None and
+            not attacker.uses_shield):
+        return TWO_HANDED
+    return ONE_HANDED
+
+
+def throw_first(attacker: Character, target: Character) -> AttackOptions:
+    """Throw the main-hand weapon from 20 feet if it can be thrown."""
+    main_hand = attacker.wielding[0]
+    if main_hand is not None and main_hand.can_be_thrown:
+        return THROWN
+    return melee(attacker, target)
+
+
+class EncounterResult(NamedTuple):
+    winner: Optional[int]       # index of the last side standing, if any
+    rounds: int
+    attacks: int
+    hits: int
+    damage: Tuple[int, ...]     # dealt by each side
+    survivors: Tuple[int, ...]  # left standing on each side
+
+
+class Encounter:
+    """
+    Sides of Characters fighting until only one side has anyone left
+    standing, or until max_rounds have gone by (a draw).
+
+    Each round, everyone still standing takes a turn in initiative order
+    (d20 plus DEX modifier, rolled at the start of each run) and makes one
+    attack. Damage is taken off the target's hit points as wounds.
+    Every attack is published to the current event bus, if anyone is
+    listening.
+    """
+    def __init__(self, *sides: Sequence[Character],
+                 target_policy: TargetPolicy = first_foe,
+                 weapon_policy: WeaponPolicy = melee,
+                 max_rounds: int = 100):
+        if len(sides) < 2:
+            raise ValueError('An encounter needs at least two sides')
+        self.sides = tuple(tuple(side) for side in sides)
+        self.combatants = [character for side in self.sides
+                           for character in side]
+        self.side_of = [index for index, side in enumerate(self.sides)
+                        for character in side]
+        if len(set(map(id, self.combatants))) < len(self.combatants):
+            raise ValueError('A character can only fight once per '
+                             'encounter; use copies() for more of them')
+        self.__side_by_id = self.__sides_by_id()
+        self.target_policy = target_policy
+        self.weapon_policy = weapon_policy
+        self.max_rounds = int(max_rounds)
+        self.thrown: List[Tuple[Character, Weapon]] = []
+        self.__start = [(character, character.wounds, character.wielding,
+                         character.uses_shield)
+                        for character in self.combatants]
+
+    def __sides_by_id(self) -> Dict[int, int]:
+        return {id(character): index for character, index
+                in zip(self.combatants, self.side_of)}
+
+    def __setstate__(self, state):
+        # Characters unpickled in another process are new objects.
+        self.__dict__.update(state)
+        self.__side_by_id = self.__sides_by_id()
+
+    def reset(self):
+        """Put everyone back as they were when the encounter was set up."""
+        for character, wounds, (main_hand, off_hand), uses_shield in \
+                self.__start:
+            character.wounds = wounds
+            character.wield_main(main_hand)
+            character.wield_off(off_hand)
+            character.uses_shield = uses_shield
+        self.thrown.clear()
+
+    def roll_initiative(self, rng: DiceRNG) -> List[int]:
+        """Indexes into combatants, in the order they take their turns."""
+        rolls = [(rng.randint(20) + character.DEX.modifier,
+                  character.DEX.modifier, -index)
+                 for index, character in enumerate(self.combatants)]
+        return sorted(range(len(rolls)), key=rolls.__getitem__,
+                      reverse=True)
+
+    def run(self, rng: Optional[DiceRNG] = None) -> EncounterResult:
+        rng = rng or get_rng()
+        self.reset()
+        combatants = self.combatants
+        side_of = self.side_of
+        side_by_id = self.__side_by_id
+        target_policy = self.target_policy
+        weapon_policy = self.weapon_policy
+        thrown = self.thrown
+        full_hit = HitType.FULL
+        bus = get_bus()
+        publishing = bus.active
+
+        standing = [[character for character in side if character.hp > 0]
+                    for side in self.sides]
+        sides_standing = sum(1 for side in standing if side)
+        two_sides = len(standing) == 2
+        damage = [0] * len(standing)
+        attacks = hits = 0
+        order = self.roll_initiative(rng)
+
+        rounds = 0
+        while sides_standing > 1 and rounds < self.max_rounds:
+            rounds += 1
+            for index in order:
+                attacker = combatants[index]
+                if attacker.hp < 1:
+                    continue
+                side = side_of[index]
+                if two_sides:
+                    foes = standing[1 - side]
+                else:
+                    foes = [foe for other, members in enumerate(standing)
+                            if other != side for foe in members]
+                target = target_policy(attacker, foes, rng)
+                options = weapon_policy(attacker, target)
+                weapon = attacker.wielding[0 if options.main_hand else 1]
+
+                result = attacker.attack(target, options.main_hand,
+                                         options.using_two_hands,
+                                         distance=options.distance, rng=rng)
+                attacks += 1
+                if publishing:
+                    bus.publish(AttackEvent.from_result(result, attacker))
+                if weapon is not None and weapon.can_be_thrown and \
+                        attacker.wielding[0 if options.main_hand else 1] \
+                        is None:
+                    thrown.append((attacker, weapon))
+                if result.hit_type is not full_hit:
+                    continue
+
+                hits += 1
+                damage[side] += result.damage
+                target.wounds += result.damage
+                if target.hp < 1:
+                    target_side = standing[side_by_id[id(target)]]
+                    target_side.remove(target)
+                    if not target_side:
+                        sides_standing -= 1
+                        if sides_standing < 2:
+                            break
+
+        survivors = tuple(len(side) for side in standing)
+        winner = None
+        if sides_standing == 1:
+            winner = next(index for index, count in enumerate(survivors)
+                          if count)
+        return EncounterResult(winner, rounds, attacks, hits, tuple(damage),
+                               survivors)
+
+    def run_many(self, n: int,
+                 rng: Optional[DiceRNG] = None) -> Iterator[EncounterResult]:
+        """Run the encounter n times over, from the same start each time."""
+        rng = rng or get_rng()
+        for _ in range(int(n)):
+            yield self.run(rng)
+        self.reset()
+
+
+def copies(template: Character, n: int) -> List[Character]:
+    """
+    n independent copies of a character, e.g. enemies.kobold, to fight
+    side by side. The copies share the template's weapons and armor.
+    """
+    shared = [item for item in template.wielding + (template.armor,)
+              if item is not None]
+    return [copy.deepcopy(template, {id(item): item for item in shared})
+            for _ in range(int(n))]
+
+
+class EncounterSummary(Accumulator):
+    """
+    Wins, draws, rounds and damage over many runs of one encounter.
+
+    Summaries filled in different processes merge into one; merged in the
+    same order, they come out bit for bit the same.
+    """
+    def __init__(self, sides: int):
+        self.fights = 0
+        self.wins = np.zeros(int(sides), dtype=np.int64)
+        self.draws = 0
+        self.rounds = RunningStats()
+        self.attacks = 0
+        self.hits = 0
+        self.damage = [RunningStats() for _ in range(int(sides))]
+        self.survivors = np.zeros(int(sides), dtype=np.int64)
+
+    def add(self, result: EncounterResult) -> EncounterSummary:
+        self.fights += 1
+        if result.winner is None:
+            self.draws += 1
+        else:
+            self.wins[result.winner] += 1
+        self.rounds.add(result.rounds)
+        self.attacks += result.attacks
+        self.hits += result.hits
+        for side, damage in enumerate(result.damage):
+            self.damage[side].add(damage)
+        self.survivors += result.survivors
+        return self
+
+    def merge(self, other: EncounterSummary) -> EncounterSummary:
+        self.fights += other.fights
+        self.wins += other.wins
+        self.draws += other.draws
+        self.rounds.merge(other.rounds)
+        self.attacks += other.attacks
+        self.hits += other.hits
+        for damage, other_damage in zip(self.damage, other.damage):
+            damage.merge(other_damage)
+        self.survivors += other.survivors
+        return self
+
+    @property
+    def win_rates(self) -> np.ndarray:
+        return self.wins / max(self.fights, 1)
+
+    def __repr__(self):
+        return '<EncounterSummary: %i fights (Wins %s; %i draws; ' \
+               '%.2f rounds)>' % (self.fights, self.wins.tolist(),
+                                  self.draws, self.rounds.mean)
+
+
+def run_shard(encounter: Encounter, seed: int, shard: int,
+              fights: int) -> EncounterSummary:
+    """Run one shard of simulate(), on that shard's own dice stream."""
+    summary = EncounterSummary(len(encounter.sides))
+    rng = PooledRNG.for_worker(seed, shard)
+    for result in encounter.run_many(fights, rng):
+        summary.add(result)
+    return summary
+
+
+def simulate(encounter: Encounter, fights: int, seed: Optional[int] = None,
+             workers: Optional[int] = 1,
+             shard_size: int = 10000) -> EncounterSummary:
+    """
+    Run encounter fights times over, shard_size fights per shard, with the
+    shards spread over a pool of workers processes (None for one per
+    CPU; 1 to run them here without a pool).
+
+    Shard i always rolls from PooledRNG.for_worker(seed, i), and shard
+    summaries are merged in shard order, so the same seed and shard_size
+    give exactly the same summary however many workers there are.
+    """
+    if seed is None:
+        seed = secrets.randbits(64)
+    fights = int(fights)
+    shard_size = max(int(shard_size), 1)
+    shards = [(shard, min(shard_size, fights - start))
+              for shard, start in enumerate(range(0, fights, shard_size))]
+
+    summary = EncounterSummary(len(encounter.sides))
+    if workers == 1 or len(shards) < 2:
+        for shard, count in shards:
+            summary.merge(run_shard(encounter, seed, shard, count))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard_summary in executor.map(
+                run_shard, [encounter] * len(shards), [seed] * len(shards),
+                [shard for shard, count in shards],
+                [count for shard, count in shards]):
+            summary.merge(shard_summary)
+    return summary
@@ -0,0 +1,263 @@
+"""
+A structured event bus for what happens in combat.
+
+Events are records (like characters.AttackEvent) with describe(), which
+renders them as text, and as_dict(), for JSON. Nothing is rendered until
+a sink asks for it, and with no sinks listening, publishers skip even
+building the event:
+
+    bus = get_bus()
+    if bus.active:
+        bus.publish(AttackEvent.from_result(result))
+
+Sinks are where events end up: NullSink, RingBuffer, TextSink and
+JSONLSink, and BackgroundSink to move any of them off the hot thread.
+
+    with EventBus(BackgroundSink(JSONLSink('fight.jsonl'))) as bus, \
+            use_bus(bus):
+        encounter.run()
+"""
+from __future__ import annotations
+
+import abc
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import threading
+from typing import (Any, Deque, Dict, Iterator, List, Optional, Protocol,
+                    TextIO, Union)
+
+
+PathOrTextFile = Union[str, os.PathLike, TextIO]
+
+
+class Event(Protocol):
+    def describe(self) -> str:
+        ...
+
+    def as_dict(self) -> Dict[str, Any]:
+        ...
+
+
+class Sink(abc.ABC):
+    """Base for sinks: write one event; flush and close if buffered."""
+    @abc.abstractmethod
+    def write(self, event: Event):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NullSink(Sink):
+    """Throws every event away."""
+    def write(self, event: Event):
+        pass
+
+
+class RingBuffer(Sink):
+    """Keeps the last capacity events in memory, oldest first."""
+    def __init__(self, capacity: int = 1024):
+        self.events: Deque[Event] = collections.deque(maxlen=int(capacity))
+
+    def write(self, event: Event):
+        self.events.append(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.events)
+
+    def describe(self) -> List[str]:
+        return [event.describe() for event in self.events]
+
+
+class TextSink(Sink):
+    """
+    Writes one line per event to file, a path or a text file, as rendered
+    by render(). Files opened from a path are closed with the sink.
+    """
+    def __init__(self, file: PathOrTextFile, buffer_size: int = 1 << 16):
+        if isinstance(file, (str, os.PathLike)):
+            self.__file: TextIO = open(file, 'w', buffering=buffer_size)
+            self.__owns_file = True
+        else:
+            self.__file = file
+            self.__owns_file = False
+
+    def render(self, event: Event) -> str:
+        return event.describe()
+
+    def write(self, event: Event):
+        self.__file.write(self.render(event) + '\n')
+
+    def flush(self):
+        if not self.__file.closed:
+            self.__file.flush()
+
+    def close(self):
+        self.flush()
+        if self.__owns_file:
+            self.__file.close()
+
+
+class JSONLSink(TextSink):
+    """Writes each event's as_dict() as a line of JSON."""
+    def render(self, event: Event) -> str:
+        return json.dumps(event.as_dict())
+
+
+_STOP = object()
+
+
+class BackgroundSink(Sink):
+    """
+    Hands events to sink on a background thread, so publishing costs a
+    queue put and the writing happens elsewhere. The thread writes
+    whatever has queued up in one go and flushes when it runs dry.
+
+    If sink raises, the thread carries on with the next event, and the
+    first error is raised again by the next flush() or close().
+    """
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.__error: Optional[BaseException] = None
+        self.__queue: queue.Queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__drain, daemon=True,
+                                         name='event-sink')
+        self.__thread.start()
+
+    def __drain(self):
+        events = self.__queue
+        stopping = False
+        while not stopping:
+            batch = [events.get()]
+            while True:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for event in batch:
+                    if event is _STOP:
+                        stopping = True
+                    else:
+                        self.__guarded(self.sink.write, event)
+                self.__guarded(self.sink.flush)
+            finally:
+                # Only now, so that flush() waits for the flush as well.
+                for _ in batch:
+                    events.task_done()
+
+    def __guarded(self, method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            if self.__error is None:
+                self.__error = e
+
+    def __raise_error(self):
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def write(self, event: Event):
+        self.__queue.put(event)
+
+    def flush(self):
+        """Wait until every event so far has been written and flushed."""
+        self.__queue.join()
+        self.__raise_error()
+
+    def close(self):
+        if self.__thread.is_alive():
+            self.__queue.put(_STOP)
+            self.__thread.join()
+        self.sink.close()
+        self.__raise_error()
+
+
+class EventBus:
+    """Passes every event published to each of its sinks."""
+    def __init__(self, *sinks: Sink):
+        self.sinks = list(sinks)
+
+    @property
+    def active(self) -> bool:
+        """Whether anyone is listening; if not, don't build events."""
+        return bool(self.sinks)
+
+    def subscribe(self, sink: Sink) -> Sink:
+        self.sinks.append(sink)
+        return sink
+
+    def unsubscribe(self, sink: Sink):
+        self.sinks.remove(sink)
+
+    def publish(self, event: Event):
+        for sink in self.sinks:
+            sink.write(event)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self) -> EventBus:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class QuietBus(EventBus):
+    """
+    The bus used outside use_bus(). It never has any sinks, so that
+    nothing subscribed in one place starts publishing everywhere else.
+    """
+    def subscribe(self, sink: Sink) -> Sink:
+        raise RuntimeError('Nothing can listen to the quiet bus; subscribe '
+                           'to a bus set with use_bus() instead')
+
+
+QUIET_BUS = QuietBus()
+
+_current_bus: contextvars.ContextVar[EventBus] = contextvars.ContextVar(
+    'event_bus', default=QUIET_BUS)
+
+
+def get_bus() -> EventBus:
+    """
+    Where events go: whatever use_bus() set in this thread or task, or
+    else a bus with no sinks.
+    """
+    return _current_bus.get()
+
+
+@contextlib.contextmanager
+def use_bus(bus: Optional[EventBus] = None) -> Iterator[EventBus]:
+    """
+    Publish events inside the with block to bus. If none is given, a new
+    bus is used, and its sinks are closed on the way out; a bus passed in
+    is left open for its owner to close.
+    """
+    owned = bus is None
+    if bus is None:
+        bus = EventBus()
+    token = _current_bus.set(bus)
+    try:
+        yield bus
+    finally:
+        _current_bus.reset(token)
+        if owned:
+            bus.close()
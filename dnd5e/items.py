@@ -12,6 +12,9 @@ class ArmorType(enum.Enum):
 
 
 class Armor:
+    __slots__ = ('name', 'armor_class', 'armor_type', 'min_str_requirement',
+                 'disadvantages_stealth')
+
     def __init__(self, name: str, armor_class: int,
                  armor_type: Optional[ArmorType] = None,
                  min_str_requirement: Optional[int] = None,
@@ -78,6 +81,11 @@ class WeaponDamageType(enum.Enum):
 
 
 class Weapon:
+    __slots__ = ('name', 'damage', 'two_handed_damage', 'damage_type',
+                 'range_increment', 'finesse_weapon', 'slow_loading',
+                 'has_reach', '__requires_ammo', '__is_heavy', '__is_light',
+                 '__can_be_thrown', '__requires_two_hands', '__versatile')
+
     def __init__(self, name: str, damage: Optional[str] = None,
                  two_handed_damage: Optional[str] = None,
                  damage_type: Optional[WeaponDamageType] = None,
@@ -230,8 +238,8 @@ class Weapon:
 
 
 class SimpleWeapon(Weapon):
-    pass
+    __slots__ = ()
 
 
 class MartialWeapon(Weapon):
-    pass
+    __slots__ = ()
@@ -0,0 +1,135 @@
+"""
+Monte Carlo estimates that stop as soon as they are precise enough.
+
+Samples are drawn a batch at a time and folded into a RunningStats; after
+each batch the confidence interval around the mean is checked against the
+precision asked for. Easy questions stop after a batch or two, hard ones
+keep going up to max_samples.
+
+    estimate(attack_sampler(fighter, kobold), precision=0.05)
+"""
+from __future__ import annotations
+
+import math
+import statistics
+import time
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+import numpy as np
+
+from .characters import Character, HitType
+from .dicerolls import DicePlan, compile_dice
+from .rng import DiceRNG, get_rng
+from .stats import Numbers, RunningStats
+
+
+Sampler = Callable[[int, DiceRNG], Numbers]
+
+
+class Estimate(NamedTuple):
+    mean: float
+    std_error: float
+    low: float              # of the confidence interval
+    high: float
+    confidence: float
+    samples: int
+    seconds: float
+    converged: bool
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    def __str__(self):
+        return '<Estimate: %.4f ± %.4f (%i samples in %.3fs%s)>' % (
+            self.mean, self.half_width, self.samples, self.seconds,
+            '' if self.converged else '; not converged')
+
+
+def estimate(sampler: Sampler, precision: float = 0.01,
+             confidence: float = 0.95, relative: bool = False,
+             batch_size: int = 4096, min_samples: int = 1000,
+             max_samples: int = 10 ** 7,
+             rng: Optional[DiceRNG] = None) -> Estimate:
+    """
+    Estimate the mean of whatever sampler(n, rng) returns n samples of.
+
+    Stops once the confidence interval is no wider than precision either
+    side of the mean (or precision times the mean, if relative), or after
+    max_samples. Never stops before min_samples, so that rare outcomes
+    have a chance to show up in the variance.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1')
+    if precision <= 0:
+        raise ValueError('precision must be positive')
+    batch_size = max(int(batch_size), 1)
+    rng = rng or get_rng()
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+
+    started = time.perf_counter()
+    stats = RunningStats()
+    half_width = math.inf
+    while stats.count < max_samples:
+        n = min(batch_size, max_samples - stats.count)
+        stats.add_many(sampler(n, rng))
+        half_width = z * math.sqrt(stats.sample_variance / stats.count)
+        target = precision * abs(stats.mean) if relative else precision
+        if stats.count >= min_samples and half_width <= target:
+            converged = True
+            break
+    else:
+        target = precision * abs(stats.mean) if relative else precision
+        converged = half_width <= target
+
+    return Estimate(stats.mean, half_width / z, stats.mean - half_width,
+                    stats.mean + half_width, confidence, stats.count,
+                    time.perf_counter() - started, converged)
+
+
+def roll_sampler(plan: Union[str, DicePlan]) -> Sampler:
+    """Samples totals of a dice expression, a whole batch at a time."""
+    if not isinstance(plan, DicePlan):
+        plan = compile_dice(plan)
+    return plan.roll_totals
+
+
+OUTCOMES = {
+    'damage': lambda result: result.damage,
+    'hit': lambda result: result.hit_type is HitType.FULL,
+    'critical': lambda result: result.critical_hit,
+    'glance': lambda result: result.hit_type in (HitType.ARMOR_GLANCE,
+                                                 HitType.SHIELD_GLANCE),
+}
+
+
+def attack_sampler(attacker: Character, target: Character,
+                   outcome: str = 'damage',
+                   **attack_kwargs: Any) -> Sampler:
+    """
+    Samples one outcome of attacker.attack(target, **attack_kwargs):
+    'damage' dealt, or whether it was a 'hit', 'critical' or 'glance'.
+
+    Thrown weapons are picked back up after every attack, so each sample
+    is an attack from the same starting position.
+    """
+    try:
+        measure = OUTCOMES[outcome]
+    except KeyError:
+        raise ValueError('Unknown outcome "%s"' % outcome)
+    main_hand = attack_kwargs.get('main_hand', True)
+
+    def sample(n: int, rng: DiceRNG) -> np.ndarray:
+        weapon = attacker.wielding[0 if main_hand else 1]
+        samples = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            samples[i] = measure(attacker.attack(target, rng=rng,
+                                                 **attack_kwargs))
+            if attacker.wielding[0 if main_hand else 1] is not weapon:
+                if main_hand:
+                    attacker.wield_main(weapon)
+                else:
+                    attacker.wield_off(weapon)
+        return samples
+
+    return sample
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import abc
+import contextlib
+import contextvars
+import random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+Shape = Union[int, Tuple[int, ...]]
+
+
+class DiceRNG(abc.ABC):
+    """
+    Where dicerolls gets its die faces from.
+
+    randint draws a single face; faces draws a whole NumPy array of them.
+    Subclasses must implement both.
+    """
+    @abc.abstractmethod
+    def randint(self, die_max_value: int) -> int:
+        """A face from 1 to die_max_value inclusive."""
+
+    @abc.abstractmethod
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        """An array of faces from 1 to die_max_value inclusive."""
+
+
+class PythonRNG(DiceRNG):
+    """
+    Draws from a random.Random, or by default from the random module
+    itself, so random.seed() still makes every roll reproducible.
+    """
+    def __init__(self, source: Optional[random.Random] = None):
+        self.source = source
+        self.__randint = (source or random).randint
+        self.__getrandbits = (source or random).getrandbits
+
+    @classmethod
+    def from_seed(cls, seed: int) -> PythonRNG:
+        return cls(random.Random(seed))
+
+    def randint(self, die_max_value: int) -> int:
+        return self.__randint(1, die_max_value)
+
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        generator = np.random.default_rng(self.__getrandbits(64))
+        return generator.integers(1, die_max_value, size=size, dtype=dtype,
+                                  endpoint=True)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.source)
+
+
+class NumpyRNG(DiceRNG):
+    """
+    Draws from a NumPy bit generator (PCG64 by default, or Philox).
+
+    Streams handed out by spawn() or for_worker() are statistically
+    independent of each other and reproducible from the parent seed, so
+    parallel simulations give the same answer however they are scheduled.
+    """
+    BIT_GENERATORS = {
+        'pcg64': np.random.PCG64,
+        'philox': np.random.Philox,
+    }
+
+    def __init__(self, seed: Optional[int | np.random.SeedSequence] = None,
+                 bit_generator: str = 'pcg64'):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        try:
+            bit_generator_class = self.BIT_GENERATORS[bit_generator.lower()]
+        except KeyError:
+            raise ValueError('Unknown bit generator "%s"' % bit_generator)
+        self.bit_generator = bit_generator.lower()
+        self.generator = np.random.Generator(
+            bit_generator_class(self.seed_sequence))
+
+    @classmethod
+    def for_worker(cls, seed: int, worker: int | Sequence[int],
+                   bit_generator: str = 'pcg64') -> NumpyRNG:
+        """The stream for one worker (or shard) of a seeded job."""
+        if isinstance(worker, int):
+            worker = (worker,)
+        return cls(np.random.SeedSequence(seed, spawn_key=tuple(worker)),
+                   bit_generator=bit_generator)
+
+    def spawn(self, n: int) -> List[NumpyRNG]:
+        """n new independent streams, e.g. one per thread."""
+        return [self.__class__(seed_sequence,
+                               bit_generator=self.bit_generator)
+                for seed_sequence in self.seed_sequence.spawn(n)]
+
+    def randint(self, die_max_value: int) -> int:
+        return int(self.generator.integers(1, die_max_value, endpoint=True))
+
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        return self.generator.integers(1, die_max_value, size=size,
+                                       dtype=dtype, endpoint=True)
+
+
+class PooledRNG(NumpyRNG):
+    """
+    A NumpyRNG that draws faces from a pool of random 16-bit words, refilled
+    a block at a time, instead of asking NumPy for every die.
+
+    Faces are unbiased: a word w is only used for a dn if it falls below
+    the largest multiple of n that fits in 16 bits, and is then sliced down
+    to w % n + 1. Otherwise it is thrown away and the next word is tried.
+    Dice with more sides than there are words are drawn straight from
+    NumPy, as by NumpyRNG.
+    """
+    WORD_BITS = 16
+    WORD_VALUES = 1 << WORD_BITS
+
+    def __init__(self, seed: Optional[int | np.random.SeedSequence] = None,
+                 bit_generator: str = 'pcg64', block_size: int = 1 << 16):
+        super().__init__(seed, bit_generator=bit_generator)
+        self.block_size = int(block_size)
+        self.__pool: List[int] = []
+        self.__position = 0
+        self.__limits: Dict[int, int] = {}
+
+    def __limit(self, die_max_value: int) -> int:
+        limit = self.__limits.get(die_max_value)
+        if limit is None:
+            if die_max_value < 1:
+                raise ValueError('A die must have at least 1 side')
+            limit = self.WORD_VALUES - self.WORD_VALUES % die_max_value
+            self.__limits[die_max_value] = limit
+        return limit
+
+    def __words(self, count: int) -> np.ndarray:
+        return self.generator.integers(0, self.WORD_VALUES, size=count,
+                                       dtype=np.uint16)
+
+    def randint(self, die_max_value: int) -> int:
+        if die_max_value > self.WORD_VALUES:
+            return super().randint(die_max_value)
+        limit = self.__limit(die_max_value)
+        while True:
+            if self.__position >= len(self.__pool):
+                self.__pool = self.__words(self.block_size).tolist()
+                self.__position = 0
+            word = self.__pool[self.__position]
+            self.__position += 1
+            if word < limit:
+                return word % die_max_value + 1
+
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        if die_max_value > self.WORD_VALUES:
+            return super().faces(die_max_value, size, dtype=dtype)
+        limit = self.__limit(die_max_value)
+        count = int(np.prod(size))
+        accepted = np.empty(0, dtype=np.uint16)
+        while len(accepted) < count:
+            # Draw enough extra words that one pass nearly always suffices.
+            needed = count - len(accepted)
+            words = self.__words(needed + needed * (self.WORD_VALUES - limit)
+                                 // limit + 64)
+            accepted = np.concatenate((accepted, words[words < limit]))
+        # Widened first: a d65536 doesn't fit in a word once 1 is added.
+        faces = accepted[:count].astype(np.uint32) % die_max_value + 1
+        return faces.astype(dtype, copy=False).reshape(size)
+
+
+DEFAULT_RNG = PythonRNG()
+
+_current_rng: contextvars.ContextVar[DiceRNG] = contextvars.ContextVar(
+    'dice_rng', default=DEFAULT_RNG)
+
+
+def get_rng() -> DiceRNG:
+    """
+    The RNG rolls use when none is passed in: whatever use_rng() set in
+    this thread or task, or else the random module.
+    """
+    return _current_rng.get()
+
+
+@contextlib.contextmanager
+def use_rng(rng: DiceRNG) -> Iterator[DiceRNG]:
+    """
+    Roll everything inside the with block from rng. Only affects the
+    current thread (or asyncio task), so each worker can use its own.
+    """
+    token = _current_rng.set(rng)
+    try:
+        yield rng
+    finally:
+        _current_rng.reset(token)
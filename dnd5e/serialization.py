@@ -0,0 +1,390 @@
+"""
+Compact binary dumps of Characters, Weapons and Armor, and lists of them.
+
+    data = dumps(party)
+    party = loads(data)
+
+Unlike repr() and eval(), nothing in the data is ever run, and it keeps
+what repr() leaves out: the weapons wielded and hit dice modifiers.
+
+A dump is DUMP_MAGIC, the SCHEMA_VERSION and the kind of thing dumped,
+then tables of the strings, armor, weapons and characters in it. Every
+string and every custom item is written once however many characters
+share it, and standard SRD items aren't written at all: they are
+referred to by their SRD_ARMOR or SRD_WEAPONS id, and come back as the
+very same objects. Those ids are part of the format; only ever add to
+the end of those lists.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from . import srd_armor, srd_weapons
+from .characters import Character, CharacterStat, Proficiency
+from .dicerolls import DiceResult
+from .items import (Armor, ArmorType, MartialWeapon, SimpleWeapon, Weapon,
+                    WeaponDamageType, WeaponType)
+
+
+DUMP_MAGIC = b'D5BN'
+SCHEMA_VERSION = 1
+
+SRD_ARMOR = tuple(getattr(srd_armor, name) for name in (
+    'padded_armor', 'leather_armor', 'studded_armor', 'hide',
+    'chain_shirt', 'scale_mail', 'breastplate', 'half_plate', 'ring_mail',
+    'chain_mail', 'splint_mail', 'plate_mail',
+))
+SRD_WEAPONS = tuple(getattr(srd_weapons, name) for name in (
+    'club', 'dagger', 'greatclub', 'handaxe', 'javelin', 'lt_hammer',
+    'mace', 'quarterstaff', 'sickle', 'spear', 'lt_xbow', 'dart',
+    'shortbow', 'sling', 'battleaxe', 'flail', 'glaive', 'greataxe',
+    'greatsword', 'halberd', 'lance', 'longsword', 'maul', 'morningstar',
+    'pike', 'rapier', 'scimitar', 'shortsword', 'trident', 'war_pick',
+    'warhammer', 'whip', 'blowgun', 'hand_xbow', 'heavy_xbow', 'longbow',
+    'net',
+))
+
+# What was dumped. A list of things has LIST set as well.
+CHARACTER, WEAPON, ARMOR = 1, 2, 3
+LIST = 0x80
+
+NO_STRING = 0xFFFFFFFF
+# Item references: NO_ITEM, an SRD id with SRD_ITEM set, or an index into
+# the dump's own table of items.
+NO_ITEM = 0xFFFF
+SRD_ITEM = 0x8000
+NO_STR_REQUIREMENT = 0xFF
+
+WEAPON_CLASSES = (Weapon, SimpleWeapon, MartialWeapon)
+DAMAGE_TYPES = (None,) + tuple(WeaponDamageType)
+ARMOR_TYPES = (None,) + tuple(ArmorType)
+STAT_NAMES = ('STR', 'DEX', 'CON', 'INT', 'WIS', 'CHA')
+# Proficiencies in armor and weapon types have a code each; proficiency
+# in a stat is STAT_PROFICIENCY plus the stat's index in STAT_NAMES.
+PROFICIENCY_TYPES = tuple(ArmorType) + tuple(WeaponType)
+STAT_PROFICIENCY = 0x10
+
+HEADER = struct.Struct('<4sBB')
+COUNT = struct.Struct('<I')
+STRING_LENGTH = struct.Struct('<H')
+ARMOR_RECORD = struct.Struct('<IhBB?')
+WEAPON_RECORD = struct.Struct('<IIIBBHHH')
+CHARACTER_RECORD = struct.Struct('<IIIhH?HihhhhhhhhhhhhhHHBHhB')
+DIE = struct.Struct('<HH')
+
+# Weapon flags
+(REQUIRES_AMMO, FINESSE, HEAVY, LIGHT, LOADING, REACH, THROWN, TWO_HANDED,
+ VERSATILE, HAS_RANGE) = (1 << bit for bit in range(10))
+WEAPON_FLAGS = (('requires_ammo', REQUIRES_AMMO),
+                ('finesse_weapon', FINESSE), ('is_heavy', HEAVY),
+                ('is_light', LIGHT), ('slow_loading', LOADING),
+                ('has_reach', REACH), ('can_be_thrown', THROWN),
+                ('requires_two_hands', TWO_HANDED),
+                ('versatile', VERSATILE))
+
+Dumpable = Union[Character, Weapon, Armor]
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.armor: Dict[int, int] = {}
+        self.weapons: Dict[int, int] = {}
+        self.armor_records: List[bytes] = []
+        self.weapon_records: List[bytes] = []
+        self.character_records: List[bytes] = []
+        self.srd_armor = {id(armor): SRD_ITEM | index
+                          for index, armor in enumerate(SRD_ARMOR)}
+        self.srd_weapons = {id(weapon): SRD_ITEM | index
+                            for index, weapon in enumerate(SRD_WEAPONS)}
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def add_armor(self, armor: Optional[Armor]) -> int:
+        if armor is None:
+            return NO_ITEM
+        ref = self.srd_armor.get(id(armor))
+        if ref is None:
+            ref = self.armor.get(id(armor))
+        if ref is None:
+            ref = self.armor[id(armor)] = len(self.armor_records)
+            if ref >= SRD_ITEM:
+                raise ValueError('Too many different armors to dump')
+            if armor.min_str_requirement is not None and \
+                    armor.min_str_requirement >= NO_STR_REQUIREMENT:
+                raise ValueError('Cannot dump a strength requirement of '
+                                 '%i' % armor.min_str_requirement)
+            self.armor_records.append(ARMOR_RECORD.pack(
+                self.string(armor.name), armor.armor_class,
+                ARMOR_TYPES.index(armor.armor_type),
+                NO_STR_REQUIREMENT if armor.min_str_requirement is None
+                else armor.min_str_requirement,
+                armor.disadvantages_stealth))
+        return ref
+
+    def add_weapon(self, weapon: Optional[Weapon]) -> int:
+        if weapon is None:
+            return NO_ITEM
+        ref = self.srd_weapons.get(id(weapon))
+        if ref is None:
+            ref = self.weapons.get(id(weapon))
+        if ref is None:
+            ref = self.weapons[id(weapon)] = len(self.weapon_records)
+            if ref >= SRD_ITEM:
+                raise ValueError('Too many different weapons to dump')
+            flags = 0
+            for attribute, flag in WEAPON_FLAGS:
+                if getattr(weapon, attribute):
+                    flags |= flag
+            near = far = 0
+            if weapon.range_increment is not None:
+                flags |= HAS_RANGE
+                near, far = weapon.range_increment
+            self.weapon_records.append(WEAPON_RECORD.pack(
+                self.string(weapon.name), self.string(weapon.damage),
+                self.string(weapon.two_handed_damage),
+                DAMAGE_TYPES.index(weapon.damage_type),
+                WEAPON_CLASSES.index(type(weapon)), flags, near, far))
+        return ref
+
+    def add_character(self, character: Character):
+        hit_dice = character.hit_dice
+        dice = b''
+        if hit_dice:
+            dice = b''.join(DIE.pack(sides, face) for sides, face in
+                            zip(hit_dice.die_max_values,
+                                hit_dice.int_results))
+        proficiencies = bytes(self.proficiency(proficiency)
+                              for proficiency in character.proficiencies)
+        ac_stats = b''.join(COUNT.pack(self.string(stat))
+                            for stat in character.include_stats_in_AC)
+        stats = []
+        for stat_name in STAT_NAMES:
+            stat = getattr(character, stat_name)
+            stats += [stat.base_value, stat.bonus]
+        main_hand, off_hand = character.wielding
+        self.character_records.append(CHARACTER_RECORD.pack(
+            self.string(character.name), self.string(character.race),
+            self.string(character.class_), character.base_armor_class,
+            self.add_armor(character.armor), character.uses_shield,
+            character.level, character.wounds,
+            character.base_movement_speed, *stats,
+            self.add_weapon(main_hand), self.add_weapon(off_hand),
+            len(character.include_stats_in_AC),
+            len(hit_dice) if hit_dice else 0,
+            hit_dice.modifier if hit_dice else 0,
+            len(proficiencies)) + ac_stats + dice + proficiencies)
+
+    @staticmethod
+    def proficiency(proficiency: Proficiency) -> int:
+        if isinstance(proficiency, CharacterStat):
+            if proficiency.abbr in STAT_NAMES:
+                return STAT_PROFICIENCY + STAT_NAMES.index(proficiency.abbr)
+        elif proficiency in PROFICIENCY_TYPES:
+            return PROFICIENCY_TYPES.index(proficiency) + 1
+        raise ValueError('Cannot dump proficiency in %r' % (proficiency,))
+
+    def dump(self, kind: int) -> bytes:
+        strings = [COUNT.pack(len(self.strings))]
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            strings.append(STRING_LENGTH.pack(len(encoded)) + encoded)
+        return b''.join([HEADER.pack(DUMP_MAGIC, SCHEMA_VERSION, kind)] +
+                        strings +
+                        [COUNT.pack(len(self.armor_records))] +
+                        self.armor_records +
+                        [COUNT.pack(len(self.weapon_records))] +
+                        self.weapon_records +
+                        [COUNT.pack(len(self.character_records))] +
+                        self.character_records)
+
+
+def dumps(thing: Union[Dumpable, Sequence[Dumpable]]) -> bytes:
+    """
+    A Character, Weapon or Armor, or a list of them all of one kind, as
+    bytes for loads(). Raises ValueError for anything else, and for
+    values too big for the format (like hit dice of over 65535 sides).
+    """
+    encoder = _Encoder()
+    many = isinstance(thing, (list, tuple))
+    things: Sequence[Any] = thing if isinstance(thing, (list, tuple)) \
+        else [thing]
+    kinds = {CHARACTER if isinstance(item, Character) else
+             WEAPON if isinstance(item, Weapon) else
+             ARMOR if isinstance(item, Armor) else 0
+             for item in things}
+    if len(kinds) > 1 or 0 in kinds:
+        raise ValueError('Can only dump Characters, Weapons or Armor, '
+                         'one kind at a time')
+    kind = kinds.pop() if kinds else CHARACTER
+    # Loose items are always written out in full, even SRD ones, so that
+    # loads() has them in its table to return.
+    if kind == WEAPON:
+        encoder.srd_weapons.clear()
+    elif kind == ARMOR:
+        encoder.srd_armor.clear()
+    try:
+        for item in things:
+            if kind == CHARACTER:
+                encoder.add_character(item)
+            elif kind == WEAPON:
+                encoder.add_weapon(item)
+            else:
+                encoder.add_armor(item)
+    except struct.error as e:
+        raise ValueError('Cannot dump %r: %s' % (thing, e))
+    return encoder.dump(kind | (LIST if many else 0))
+
+
+class _Decoder:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, record: struct.Struct) -> tuple:
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+    def count(self) -> int:
+        return self.unpack(COUNT)[0]
+
+    def load(self) -> Union[Dumpable, List[Dumpable]]:
+        magic, version, kind = self.unpack(HEADER)
+        if magic != DUMP_MAGIC:
+            raise ValueError('Not a dnd5e dump')
+        if version > SCHEMA_VERSION:
+            raise ValueError('Dump has schema version %i; this version of '
+                             'dnd5e only reads up to %i' % (version,
+                                                            SCHEMA_VERSION))
+        self.strings: List[str] = []
+        for _ in range(self.count()):
+            length, = self.unpack(STRING_LENGTH)
+            self.strings.append(
+                str(self.data[self.offset:self.offset + length], 'utf-8'))
+            self.offset += length
+        self.armor = [self.armor_record() for _ in range(self.count())]
+        self.weapons = [self.weapon_record() for _ in range(self.count())]
+        characters = [self.character_record() for _ in range(self.count())]
+
+        things: List[Dumpable] = []
+        if kind & ~LIST == CHARACTER:
+            things.extend(characters)
+        elif kind & ~LIST == WEAPON:
+            things.extend(self.weapons)
+        elif kind & ~LIST == ARMOR:
+            things.extend(self.armor)
+        else:
+            raise ValueError('Unknown kind of dump %i' % kind)
+        if kind & LIST:
+            return things
+        if len(things) != 1:
+            raise ValueError('Dump holds %i things, not one' % len(things))
+        return things[0]
+
+    def string(self, index: int) -> Optional[str]:
+        return None if index == NO_STRING else self.strings[index]
+
+    def armor_record(self) -> Armor:
+        name, armor_class, armor_type, min_str, stealth = self.unpack(
+            ARMOR_RECORD)
+        armor = Armor(self.strings[name], armor_class, ARMOR_TYPES[armor_type],
+                      None if min_str == NO_STR_REQUIREMENT else min_str)
+        armor.disadvantages_stealth = stealth
+        return armor
+
+    def weapon_record(self) -> Weapon:
+        name, damage, two_handed_damage, damage_type, weapon_class, flags, \
+            near, far = self.unpack(WEAPON_RECORD)
+        properties: Dict[str, Any] = {attribute: bool(flags & flag)
+                                      for attribute, flag in WEAPON_FLAGS}
+        if flags & VERSATILE and two_handed_damage == NO_STRING:
+            raise ValueError('Versatile weapon without two-handed damage')
+        weapon = WEAPON_CLASSES[weapon_class](
+            self.strings[name], self.string(damage),
+            self.string(two_handed_damage), DAMAGE_TYPES[damage_type],
+            **properties)
+        weapon.range_increment = (near, far) if flags & HAS_RANGE else None
+        return weapon
+
+    def armor_ref(self, ref: int) -> Optional[Armor]:
+        if ref == NO_ITEM:
+            return None
+        if ref & SRD_ITEM:
+            return SRD_ARMOR[ref & ~SRD_ITEM]
+        return self.armor[ref]
+
+    def weapon_ref(self, ref: int) -> Optional[Weapon]:
+        if ref == NO_ITEM:
+            return None
+        if ref & SRD_ITEM:
+            return SRD_WEAPONS[ref & ~SRD_ITEM]
+        return self.weapons[ref]
+
+    def character_record(self) -> Character:
+        (name, race, class_, base_armor_class, armor, uses_shield, level,
+         wounds, base_movement_speed, *stats, main_hand, off_hand,
+         ac_stat_count, dice_count, dice_modifier,
+         proficiency_count) = self.unpack(CHARACTER_RECORD)
+        ac_stats = tuple(self.strings[self.count()]
+                         for _ in range(ac_stat_count))
+        if dice_count and dice_count != level:
+            raise ValueError('%i hit dice for a level %i character'
+                             % (dice_count, level))
+        hit_dice = None
+        if dice_count:
+            dice = [self.unpack(DIE) for _ in range(dice_count)]
+            hit_dice = DiceResult.from_faces(
+                [sides for sides, face in dice],
+                [face for sides, face in dice], modifier=dice_modifier)
+        codes = self.data[self.offset:self.offset + proficiency_count]
+        self.offset += proficiency_count
+
+        character = Character(
+            self.string(name), self.string(race), self.string(class_),
+            base_armor_class=base_armor_class,
+            armor=self.armor_ref(armor), uses_shield=uses_shield,
+            include_stats_in_AC=ac_stats, level=level, hit_dice=hit_dice,
+            wounds=wounds, base_movement_speed=base_movement_speed,
+            str_score=stats[0], str_bonus=stats[1],
+            dex_score=stats[2], dex_bonus=stats[3],
+            con_score=stats[4], con_bonus=stats[5],
+            int_score=stats[6], int_bonus=stats[7],
+            wis_score=stats[8], wis_bonus=stats[9],
+            cha_score=stats[10], cha_bonus=stats[11])
+        for index, stat_name in enumerate(STAT_NAMES):
+            # A score of 0 would have been taken as "use the default".
+            if not stats[2 * index]:
+                getattr(character, stat_name).base_value = 0
+        for code in codes:
+            if code >= STAT_PROFICIENCY:
+                character.proficiencies.append(getattr(
+                    character, STAT_NAMES[code - STAT_PROFICIENCY]))
+            else:
+                character.proficiencies.append(PROFICIENCY_TYPES[code - 1])
+        main_hand, off_hand = self.weapon_ref(main_hand), \
+            self.weapon_ref(off_hand)
+        if main_hand is not None:
+            character.wield_main(main_hand)
+        if off_hand is not None:
+            character.wield_off(off_hand)
+        character.uses_shield = uses_shield
+        return character
+
+
+def loads(data: bytes) -> Union[Dumpable, List[Dumpable]]:
+    """
+    What dumps() dumped. Raises ValueError if data is not a valid dump,
+    or is from a newer version of the format.
+    """
+    try:
+        return _Decoder(data).load()
+    except (struct.error, IndexError) as e:
+        raise ValueError('Dump is corrupt or cut short: %s' % e)
@@ -0,0 +1,286 @@
+"""A local dice-rolling service speaking JSON lines, over TCP or stdin:
+
+    python -m dnd5e.serve --port 8765
+    python -m dnd5e.serve --stdin
+
+Each request is a JSON object like {"id": 1, "roll": "4d6kh3", "count": 2}
+and is answered with {"id": 1, "roll": "4d6kh3", "totals": [...],
+"seed": ..., "offset": ..., "batch_size": ...}. Requests for the same
+expression arriving together are rolled as one batch from
+NumpyRNG(seed); anyone can check an answer by rerolling that batch:
+
+    compile_dice(roll).roll_totals(batch_size, NumpyRNG(seed))[offset:]
+
+{"stats": true} answers with the service's counters instead.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import secrets
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .dicerolls import compile_dice
+from .rng import NumpyRNG
+
+
+MAX_COUNT = 10000
+MAX_DICE = 1000     # dice in one roll of an expression
+MAX_BATCH_DICE = MAX_COUNT * MAX_DICE   # dice in one coalesced draw
+MAX_IN_FLIGHT = 256     # requests per stream being answered at once
+
+
+class RollAnswer(NamedTuple):
+    totals: List[int]
+    seed: int
+    offset: int
+    batch_size: int
+
+
+class ServiceStats:
+    """Latency and throughput counters for a RollService."""
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.rolls = 0
+        self.total_latency = 0.
+        self.max_latency = 0.
+
+    def record_request(self, latency: float):
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self) -> Dict[str, float]:
+        uptime = time.monotonic() - self.started
+        answered = max(self.requests, 1)
+        return {
+            'uptime': uptime,
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'rolls': self.rolls,
+            'requests_per_second': self.requests / uptime if uptime else 0.,
+            'rolls_per_second': self.rolls / uptime if uptime else 0.,
+            'mean_latency': self.total_latency / answered,
+            'max_latency': self.max_latency,
+        }
+
+
+class Batch:
+    """Requests for one expression waiting to be rolled together."""
+    def __init__(self):
+        self.requests: List[Tuple[int, asyncio.Future]] = []
+        self.dice = 0
+
+
+class RollService:
+    """
+    Answers roll requests, coalescing concurrent requests for the same
+    expression into a single batched draw.
+
+    Requests wait up to window seconds for company (by default, only
+    until the event loop has handled everything else already queued).
+    A batch that would roll more than MAX_BATCH_DICE dice is sent off as
+    it is, and later requests start a new one.
+    """
+    def __init__(self, window: float = 0.):
+        self.window = float(window)
+        self.stats = ServiceStats()
+        self.__pending: Dict[str, Batch] = {}
+
+    async def roll(self, expression: str, count: int = 1) -> RollAnswer:
+        count = int(count)
+        if not 1 <= count <= MAX_COUNT:
+            raise ValueError('count must be from 1 to %i' % MAX_COUNT)
+        # Fail here, not for the whole batch.
+        plan = compile_dice(expression)
+        if any(group.sides < 1 for group in plan.groups):
+            raise ValueError('Dice must have at least 1 side')
+        dice = sum(group.dice_count for group in plan.groups)
+        if dice > MAX_DICE:
+            raise ValueError('Rolls can have at most %i dice' % MAX_DICE)
+        dice *= count
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        batch = self.__pending.get(expression)
+        if batch is not None and batch.dice + dice > MAX_BATCH_DICE:
+            # Full: roll it now, and start a new batch.
+            del self.__pending[expression]
+            loop.call_soon(self.__draw, expression, batch)
+            batch = None
+        if batch is None:
+            batch = self.__pending[expression] = Batch()
+            if self.window:
+                loop.call_later(self.window, self.__draw, expression, batch)
+            else:
+                loop.call_soon(self.__draw, expression, batch)
+        batch.requests.append((count, future))
+        batch.dice += dice
+        return await future
+
+    def __draw(self, expression: str, batch: Batch):
+        if self.__pending.get(expression) is batch:
+            del self.__pending[expression]
+        elif not batch.requests:
+            return      # already drawn when it filled up
+        waiting, batch.requests = batch.requests, []
+        batch_size = sum(count for count, future in waiting)
+        seed = secrets.randbits(64)
+        try:
+            totals = compile_dice(expression).roll_totals(batch_size,
+                                                          NumpyRNG(seed))
+        except Exception as e:
+            # Everyone waiting on the batch gets the error, not silence.
+            for count, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.stats.batches += 1
+        self.stats.rolls += batch_size
+
+        offset = 0
+        for count, future in waiting:
+            if not future.done():
+                future.set_result(RollAnswer(
+                    totals[offset:offset + count].tolist(), seed, offset,
+                    batch_size))
+            offset += count
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request."""
+        started = time.monotonic()
+        response: Dict[str, Any] = {'id': request.get('id')}
+        try:
+            if request.get('stats'):
+                response['stats'] = self.stats.as_dict()
+                return response
+            expression = str(request['roll'])
+            answer = await self.roll(expression, request.get('count', 1))
+        except Exception as e:
+            self.stats.errors += 1
+            response['error'] = ('missing "roll"' if isinstance(e, KeyError)
+                                 else str(e))
+        else:
+            response.update(roll=expression, **answer._asdict())
+        self.stats.record_request(time.monotonic() - started)
+        return response
+
+    async def handle_line(self, line: bytes) -> bytes:
+        """Answer one JSON line with another."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('requests must be JSON objects')
+        except ValueError as e:
+            self.stats.errors += 1
+            response: Dict[str, Any] = {'id': None,
+                                        'error': 'bad request: %s' % e}
+        else:
+            response = await self.handle(request)
+        return json.dumps(response).encode() + b'\n'
+
+    async def serve_stream(self, reader: asyncio.StreamReader,
+                           writer: Any):
+        """
+        Answer every line from reader on writer. Lines are answered as
+        soon as they are ready, not necessarily in order; match them up
+        by id.
+        """
+        tasks = set()
+        in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        writing = asyncio.Lock()
+
+        async def answer(line: bytes):
+            try:
+                response = await self.handle_line(line)
+                # Wait for slow readers rather than buffer without limit.
+                async with writing:
+                    writer.write(response)
+                    await writer.drain()
+            finally:
+                in_flight.release()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                # Stop reading while too many answers are outstanding.
+                await in_flight.acquire()
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        await writer.drain()
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+        try:
+            await self.serve_stream(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host: str = '127.0.0.1',
+                        port: int = 8765) -> asyncio.Server:
+        return await asyncio.start_server(self.handle_client, host, port,
+                                          backlog=4096)
+
+    async def serve_stdin(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=1 << 20)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        await self.serve_stream(reader, StdoutWriter())
+
+
+class StdoutWriter:
+    """Just enough of a StreamWriter to answer on stdout."""
+    def write(self, data: bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        return None
+
+
+async def run(host: str, port: int, window: float, use_stdin: bool):
+    service = RollService(window=window)
+    if use_stdin:
+        await service.serve_stdin()
+        return
+    server = await service.serve_tcp(host, port)
+    addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+    print('Rolling dice on %s' % addresses, file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m dnd5e.serve',
+        description='Serve dice rolls as JSON lines over TCP or stdin.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--stdin', action='store_true',
+                        help='answer requests from stdin on stdout')
+    parser.add_argument('--window', type=float, default=0.,
+                        help='seconds to wait for more requests to batch')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args.host, args.port, args.window, args.stdin))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Streaming statistics over rolls and attacks. Every accumulator here keeps
+a fixed amount of state however many results it sees, and can be merged
+with accumulators filled by other workers.
+"""
+from __future__ import annotations
+
+import abc
+import math
+import random
+from typing import (Dict, Generator, Iterable, List, Optional, Sequence,
+                    TypeVar, Union)
+
+import numpy as np
+
+from .characters import AttackResult, HitType
+from .dicerolls import DiceResult
+
+
+T = TypeVar('T')
+Numbers = Union[Sequence[float], np.ndarray]
+
+
+class Accumulator(abc.ABC):
+    """Base for accumulators: add one value, or merge another's state."""
+    @abc.abstractmethod
+    def add(self, value):
+        pass
+
+    @abc.abstractmethod
+    def merge(self, other):
+        pass
+
+    def observe(self, values: Iterable[T]) -> Generator[T, None, None]:
+        """Pass values through unchanged, adding each one on the way."""
+        for value in values:
+            self.add(value)
+            yield value
+
+
+class RunningStats(Accumulator):
+    """Count, mean, variance, minimum and maximum by Welford's method."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self.sum_of_squares = 0.     # of deviations from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float) -> RunningStats:
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_of_squares += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        return self
+
+    def add_many(self, values: Numbers) -> RunningStats:
+        values = np.asarray(values, dtype=np.float64)
+        if values.size:
+            batch = RunningStats()
+            batch.count = int(values.size)
+            batch.mean = float(values.mean())
+            batch.sum_of_squares = float(((values - batch.mean) ** 2).sum())
+            batch.minimum = float(values.min())
+            batch.maximum = float(values.max())
+            self.merge(batch)
+        return self
+
+    def merge(self, other: RunningStats) -> RunningStats:
+        """Fold in another worker's stats (Chan et al.'s formula)."""
+        count = self.count + other.count
+        if not count:
+            return self
+        delta = other.mean - self.mean
+        self.sum_of_squares += (other.sum_of_squares +
+                                delta * delta * self.count * other.count /
+                                count)
+        self.mean += delta * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance of everything seen."""
+        if not self.count:
+            return 0.
+        return self.sum_of_squares / self.count
+
+    @property
+    def sample_variance(self) -> float:
+        if self.count < 2:
+            return 0.
+        return self.sum_of_squares / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def __repr__(self):
+        return '<RunningStats: %i (Mean %.3f; SD %.3f; Range %s..%s)>' % (
+            self.count, self.mean, self.std, self.minimum, self.maximum)
+
+
+class FaceHistogram(Accumulator):
+    """How often each face came up, kept separately for each die size."""
+    def __init__(self):
+        self.counts: Dict[int, np.ndarray] = {}
+
+    def __bins(self, die_max_value: int) -> np.ndarray:
+        bins = self.counts.get(die_max_value)
+        if bins is None:
+            bins = self.counts[die_max_value] = np.zeros(die_max_value + 1,
+                                                         dtype=np.int64)
+        return bins
+
+    def add(self, dice: DiceResult) -> FaceHistogram:
+        for die_max_value, face in zip(dice.die_max_values,
+                                       dice.int_results):
+            self.__bins(die_max_value)[face] += 1
+        return self
+
+    def add_faces(self, die_max_value: int, faces: Numbers) -> FaceHistogram:
+        """Count a whole array of faces, e.g. from roll_batch()."""
+        self.__bins(die_max_value)[:] += np.bincount(
+            np.asarray(faces).reshape(-1), minlength=die_max_value + 1)
+        return self
+
+    def merge(self, other: FaceHistogram) -> FaceHistogram:
+        for die_max_value, counts in other.counts.items():
+            self.__bins(die_max_value)[:] += counts
+        return self
+
+    def frequencies(self, die_max_value: int) -> np.ndarray:
+        """Share of rolls landing on each face 1..die_max_value."""
+        counts = self.__bins(die_max_value)[1:]
+        return counts / max(int(counts.sum()), 1)
+
+
+class QuantileSketch(Accumulator):
+    """
+    Approximate quantiles in bounded memory: a simplified KLL sketch.
+
+    Values land in a buffer at level 0. When a level fills up it is
+    sorted and every other value (from a random start) is promoted to the
+    next level, where each value stands for twice as many. Ranks are
+    typically off by about 1/capacity of the number of values seen.
+    """
+    def __init__(self, capacity: int = 256, seed: Optional[int] = None):
+        self.capacity = int(capacity)
+        self.levels: List[List[float]] = [[]]
+        self.count = 0
+        self.random = random.Random(seed)
+
+    def add(self, value: float) -> QuantileSketch:
+        self.levels[0].append(float(value))
+        self.count += 1
+        if len(self.levels[0]) >= self.capacity:
+            self.__compact()
+        return self
+
+    def add_many(self, values: Numbers) -> QuantileSketch:
+        for value in np.asarray(values, dtype=np.float64).reshape(-1):
+            self.add(value)
+        return self
+
+    def __compact(self):
+        for level, items in enumerate(self.levels):
+            if len(items) < self.capacity:
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items.sort()
+            # An odd one out stays behind, so no weight is lost.
+            kept = [items.pop(self.random.randrange(len(items)))] \
+                if len(items) % 2 else []
+            start = self.random.randint(0, 1)
+            self.levels[level + 1].extend(items[start::2])
+            self.levels[level] = kept
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self.__compact()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Roughly the value below which a share q of values fall."""
+        if not self.count:
+            raise ValueError('No values to take a quantile of')
+        weighted = sorted((value, 1 << level)
+                          for level, items in enumerate(self.levels)
+                          for value in items)
+        target = q * sum(weight for value, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        return [self.quantile(q) for q in qs]
+
+
+class RollStats(Accumulator):
+    """Totals, face counts and total quantiles for DiceResults."""
+    def __init__(self, capacity: int = 256):
+        self.totals = RunningStats()
+        self.faces = FaceHistogram()
+        self.quantiles = QuantileSketch(capacity)
+
+    def add(self, dice: DiceResult) -> RollStats:
+        self.totals.add(dice.total)
+        self.faces.add(dice)
+        self.quantiles.add(dice.total)
+        return self
+
+    def add_totals(self, totals: Numbers) -> RollStats:
+        """Add a batch of totals, e.g. a chunk from roll_stream()."""
+        self.totals.add_many(totals)
+        self.quantiles.add_many(totals)
+        return self
+
+    def merge(self, other: RollStats) -> RollStats:
+        self.totals.merge(other.totals)
+        self.faces.merge(other.faces)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+
+class AttackStats(Accumulator):
+    """Outcome counts and damage statistics for AttackResults."""
+    def __init__(self, capacity: int = 256):
+        self.attacks = 0
+        self.outcomes: Dict[Optional[HitType], int] = {
+            None: 0, HitType.ARMOR_GLANCE: 0, HitType.SHIELD_GLANCE: 0,
+            HitType.FULL: 0,
+        }
+        self.critical_hits = 0
+        self.damage = RunningStats()
+        self.damage_quantiles = QuantileSketch(capacity)
+        self.d20 = FaceHistogram()
+
+    def add(self, result: AttackResult) -> AttackStats:
+        self.attacks += 1
+        self.outcomes[result.hit_type] += 1
+        self.critical_hits += result.critical_hit
+        self.damage.add(result.damage)
+        self.damage_quantiles.add(result.damage)
+        if result.attack_roll is not None:
+            self.d20.add(result.attack_roll)
+        return self
+
+    def merge(self, other: AttackStats) -> AttackStats:
+        self.attacks += other.attacks
+        for hit_type, count in other.outcomes.items():
+            self.outcomes[hit_type] += count
+        self.critical_hits += other.critical_hits
+        self.damage.merge(other.damage)
+        self.damage_quantiles.merge(other.damage_quantiles)
+        self.d20.merge(other.d20)
+        return self
+
+    @property
+    def hit_rate(self) -> float:
+        return self.outcomes[HitType.FULL] / max(self.attacks, 1)
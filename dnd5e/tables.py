@@ -0,0 +1,289 @@
+"""
+Struct-of-arrays storage for large populations of combatants.
+
+A CharacterTable keeps one NumPy column per Character input, so a horde
+of 100k monsters takes a few MB, and derived stats like AC, maxhp and
+hp_status come out of vectorized expressions over the whole table.
+Armor, weapons and other values shared between many rows are kept once
+in a Catalog and referred to by id; -1 means none. Proficiencies are
+kept as their characters.PROFICIENCY_BITS mask.
+"""
+from __future__ import annotations
+
+from typing import (Dict, Generic, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple, TypeVar)
+
+import numpy as np
+
+from .characters import Character, Proficiencies
+from .dicerolls import DiceResult
+from .items import Armor, Weapon
+
+
+T = TypeVar('T')
+
+STAT_NAMES = ('STR', 'DEX', 'CON', 'INT', 'WIS', 'CHA')
+STR, DEX, CON, INT, WIS, CHA = range(len(STAT_NAMES))
+
+HP_STATUSES = ('dead', 'critically wounded', 'badly wounded', 'bloodied',
+               'injured', 'roughed up', 'slightly injured', 'unscathed')
+# Character.hp_status is the first status whose hp_percent bound is not
+# reached; dead is decided by hp alone.
+HP_STATUS_BOUNDS = np.array((11, 25, 50, 70, 90, 99))
+
+
+class Catalog(Generic[T]):
+    """
+    Things shared between rows, numbered in the order they were added.
+    Things are told apart by identity (or equality, for hashable values
+    like tuples), so the same Armor worn by many rows is stored once.
+    """
+    def __init__(self, things: Iterable[T] = ()):
+        self.__things: List[T] = []
+        self.__ids: Dict[object, int] = {}
+        for thing in things:
+            self.add(thing)
+
+    @staticmethod
+    def __key(thing: T) -> object:
+        return thing if isinstance(thing, tuple) else id(thing)
+
+    def add(self, thing: Optional[T]) -> int:
+        """The id of thing, adding it if it is new; -1 for None."""
+        if thing is None:
+            return -1
+        key = self.__key(thing)
+        thing_id = self.__ids.get(key)
+        if thing_id is None:
+            thing_id = self.__ids[key] = len(self.__things)
+            self.__things.append(thing)
+        return thing_id
+
+    def get(self, thing_id: int) -> Optional[T]:
+        return None if thing_id < 0 else self.__things[thing_id]
+
+    def __getitem__(self, thing_id: int) -> T:
+        return self.__things[thing_id]
+
+    def __len__(self):
+        return len(self.__things)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.__things)
+
+
+class CharacterTable:
+    """
+    Many characters, one column per input.
+
+    Columns are plain NumPy arrays and may be changed in place, e.g.
+    table.wounds[hit_rows] += damage. Hit dice are kept only as their
+    total and the largest die, so characters taken back out of the table
+    have hit dice with the same total but not necessarily the same faces,
+    and their proficiencies in bit order.
+    """
+    COLUMNS = ('names', 'races', 'classes', 'scores', 'bonuses', 'level',
+               'wounds', 'hit_dice_total', 'hit_die', 'base_armor_class',
+               'armor', 'uses_shield', 'ac_stats', 'main_hand', 'off_hand',
+               'base_movement_speed', 'proficiencies')
+
+    def __init__(self, size: int = 0):
+        n = int(size)
+        self.names = np.full(n, None, dtype=object)
+        self.races = np.full(n, None, dtype=object)
+        self.classes = np.full(n, None, dtype=object)
+        self.scores = np.full((n, len(STAT_NAMES)), 10, dtype=np.int16)
+        self.bonuses = np.zeros((n, len(STAT_NAMES)), dtype=np.int16)
+        self.level = np.ones(n, dtype=np.int16)
+        self.wounds = np.zeros(n, dtype=np.int32)
+        self.hit_dice_total = np.zeros(n, dtype=np.int32)
+        self.hit_die = np.zeros(n, dtype=np.uint16)
+        self.base_armor_class = np.full(n, 10, dtype=np.int16)
+        self.armor = np.full(n, -1, dtype=np.int16)
+        self.uses_shield = np.zeros(n, dtype=bool)
+        self.ac_stats = np.full(n, -1, dtype=np.int16)
+        self.main_hand = np.full(n, -1, dtype=np.int16)
+        self.off_hand = np.full(n, -1, dtype=np.int16)
+        self.base_movement_speed = np.full(n, 30, dtype=np.int16)
+        self.proficiencies = np.zeros(n, dtype=np.uint16)
+
+        self.armors: Catalog[Armor] = Catalog()
+        self.weapons: Catalog[Weapon] = Catalog()
+        self.ac_stat_names: Catalog[Tuple[str, ...]] = Catalog()
+
+    @classmethod
+    def from_characters(cls,
+                        characters: Sequence[Character]) -> CharacterTable:
+        table = cls(len(characters))
+        for row, character in enumerate(characters):
+            table[row] = character
+        return table
+
+    def __len__(self):
+        return len(self.level)
+
+    def __setitem__(self, row: int, character: Character):
+        self.names[row] = character.name
+        self.races[row] = character.race
+        self.classes[row] = character.class_
+        for index, stat_name in enumerate(STAT_NAMES):
+            stat = getattr(character, stat_name)
+            self.scores[row, index] = stat.base_value
+            self.bonuses[row, index] = stat.bonus
+        self.level[row] = character.level
+        self.wounds[row] = character.wounds
+        hit_dice = character.hit_dice
+        if hit_dice:
+            hit_die = max(hit_dice.die_max_values)
+            if hit_die > np.iinfo(self.hit_die.dtype).max:
+                raise ValueError('A d%i hit die does not fit in a '
+                                 'CharacterTable' % hit_die)
+            self.hit_dice_total[row] = sum(hit_dice.int_results)
+            self.hit_die[row] = hit_die
+        else:
+            self.hit_dice_total[row] = self.hit_die[row] = 0
+        self.base_armor_class[row] = character.base_armor_class
+        self.armor[row] = self.armors.add(character.armor)
+        self.uses_shield[row] = character.uses_shield
+        self.ac_stats[row] = self.ac_stat_names.add(
+            character.include_stats_in_AC or None)
+        main_hand, off_hand = character.wielding
+        self.main_hand[row] = self.weapons.add(main_hand)
+        self.off_hand[row] = self.weapons.add(off_hand)
+        self.base_movement_speed[row] = character.base_movement_speed
+        self.proficiencies[row] = character.proficiencies.mask
+
+    def __getitem__(self, row: int) -> Character:
+        """The character in row, as a standalone Character."""
+        row = int(row)
+        scores = self.scores[row].tolist()
+        bonuses = self.bonuses[row].tolist()
+        character = Character(
+            self.names[row], race=self.races[row], class_=self.classes[row],
+            base_armor_class=int(self.base_armor_class[row]),
+            armor=self.armors.get(int(self.armor[row])),
+            uses_shield=bool(self.uses_shield[row]),
+            include_stats_in_AC=self.ac_stat_names.get(
+                int(self.ac_stats[row])) or (),
+            level=int(self.level[row]),
+            hit_dice=self.__hit_dice(row),
+            wounds=int(self.wounds[row]),
+            base_movement_speed=int(self.base_movement_speed[row]),
+            str_score=scores[STR], str_bonus=bonuses[STR],
+            dex_score=scores[DEX], dex_bonus=bonuses[DEX],
+            con_score=scores[CON], con_bonus=bonuses[CON],
+            int_score=scores[INT], int_bonus=bonuses[INT],
+            wis_score=scores[WIS], wis_bonus=bonuses[WIS],
+            cha_score=scores[CHA], cha_bonus=bonuses[CHA])
+        character.proficiencies = Proficiencies.from_mask(
+            int(self.proficiencies[row]),
+            [getattr(character, stat_name) for stat_name in STAT_NAMES])
+        main_hand = self.weapons.get(int(self.main_hand[row]))
+        off_hand = self.weapons.get(int(self.off_hand[row]))
+        if main_hand is not None:
+            character.wield_main(main_hand)
+        if off_hand is not None:
+            character.wield_off(off_hand)
+        character.uses_shield = bool(self.uses_shield[row])
+        return character
+
+    def __hit_dice(self, row: int) -> Optional[DiceResult]:
+        total = int(self.hit_dice_total[row])
+        count = int(self.level[row])
+        if not total or count < 1:
+            return None
+        sides = max(int(self.hit_die[row]), -(-total // count))
+        # Start every die on 1 and top them up in turn.
+        extra = total - count
+        faces = []
+        for die in range(count):
+            top_up = min(extra, sides - 1)
+            faces.append(1 + top_up)
+            extra -= top_up
+        return DiceResult.from_faces(sides, faces)
+
+    def __iter__(self) -> Iterator[Character]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def to_characters(self) -> List[Character]:
+        return list(self)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Stat values (score plus bonus), shaped (rows, 6)."""
+        return self.scores + self.bonuses
+
+    @property
+    def modifiers(self) -> np.ndarray:
+        """Stat modifiers, shaped (rows, 6), as CharacterStat.modifier."""
+        return (self.values - 10) // 2
+
+    @property
+    def proficiency_bonus(self) -> np.ndarray:
+        return 2 + (self.level - 1) // 4
+
+    @property
+    def AC(self) -> np.ndarray:
+        modifiers = self.modifiers
+        dex = modifiers[:, DEX]
+        armor_class = np.array([armor.armor_class for armor in self.armors]
+                               + [0], dtype=np.int16)
+        max_dex = np.array([armor.max_dex_modifier or 99
+                            for armor in self.armors] + [99], dtype=np.int16)
+        has_armor = self.armor >= 0
+
+        ac = np.where(has_armor,
+                      armor_class[self.armor] +
+                      np.minimum(dex, max_dex[self.armor]),
+                      self.base_armor_class + dex)
+        ac = ac + 2 * self.uses_shield
+
+        # How many times each stat is named in each row's AC stats.
+        weights = np.zeros((len(self.ac_stat_names) + 1, len(STAT_NAMES)),
+                           dtype=np.int16)
+        for stats_id, stat_names in enumerate(self.ac_stat_names):
+            for stat_name in stat_names:
+                abbr = stat_name.upper()[:3]
+                if abbr in STAT_NAMES:
+                    weights[stats_id, STAT_NAMES.index(abbr)] += 1
+        stat_bonus = (weights[self.ac_stats] * modifiers).sum(axis=1)
+        unarmored = ~has_armor & ~self.uses_shield
+        return ac + np.where(unarmored, stat_bonus, 0)
+
+    @property
+    def maxhp(self) -> np.ndarray:
+        con = self.modifiers[:, CON].astype(np.int32)
+        return np.where(self.hit_dice_total > 0,
+                        self.hit_dice_total + con * self.level, 0)
+
+    @property
+    def hp(self) -> np.ndarray:
+        return self.maxhp - self.wounds
+
+    @property
+    def hp_percent(self) -> np.ndarray:
+        maxhp = self.maxhp
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = (maxhp - self.wounds) / maxhp * 100
+        return np.where(maxhp == 0, 0., percent)
+
+    @property
+    def hp_status_codes(self) -> np.ndarray:
+        """Indexes into HP_STATUSES of each row's Character.hp_status."""
+        codes = 1 + np.searchsorted(HP_STATUS_BOUNDS, self.hp_percent,
+                                    side='right')
+        return np.where(self.hp < 1, 0, codes).astype(np.uint8)
+
+    @property
+    def hp_status(self) -> np.ndarray:
+        return np.array(HP_STATUSES, dtype=object)[self.hp_status_codes]
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self.hp >= 1
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns themselves."""
+        return sum(getattr(self, column).nbytes for column in self.COLUMNS)
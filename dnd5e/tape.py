@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import contextlib
+import mmap
+import os
+from typing import BinaryIO, Iterator, Optional, Union
+
+import numpy as np
+
+from .rng import DiceRNG, Shape, get_rng, use_rng
+
+
+# Roll tapes record every die drawn through the RNG, so that a fight can be
+# replayed exactly, die for die. A tape is TAPE_MAGIC followed by one
+# two-byte record per die: the number of sides minus one, then the face
+# minus one. Dice may have up to 256 sides.
+TAPE_MAGIC = b'DNDTAPE\x01'
+MAX_SIDES = 256
+
+PathOrFile = Union[str, os.PathLike, BinaryIO]
+
+
+class RecordingRNG(DiceRNG):
+    """
+    Passes every draw through from rng (by default get_rng()) and appends
+    it to tape, a path or a binary file. Call close(), or use
+    record_rolls(), to flush the last records.
+    """
+    def __init__(self, tape: PathOrFile, rng: Optional[DiceRNG] = None,
+                 buffer_size: int = 1 << 16):
+        self.rng = rng or get_rng()
+        if isinstance(tape, (str, os.PathLike)):
+            self.__file: BinaryIO = open(tape, 'wb')
+            self.__owns_file = True
+        else:
+            self.__file = tape
+            self.__owns_file = False
+        self.__file.write(TAPE_MAGIC)
+        self.__buffer = bytearray()
+        self.buffer_size = int(buffer_size)
+        self.draws = 0
+
+    def randint(self, die_max_value: int) -> int:
+        if not 1 <= die_max_value <= MAX_SIDES:
+            raise ValueError('Tapes can only record dice with 1 to %i '
+                             'sides' % MAX_SIDES)
+        face = self.rng.randint(die_max_value)
+        self.__buffer += bytes((die_max_value - 1, face - 1))
+        self.draws += 1
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+        return face
+
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        if not 1 <= die_max_value <= MAX_SIDES:
+            raise ValueError('Tapes can only record dice with 1 to %i '
+                             'sides' % MAX_SIDES)
+        faces = self.rng.faces(die_max_value, size, dtype=dtype)
+        records = np.empty((faces.size, 2), dtype=np.uint8)
+        records[:, 0] = die_max_value - 1
+        records[:, 1] = faces.reshape(-1) - 1
+        self.flush()
+        self.__file.write(records.tobytes())
+        self.draws += faces.size
+        return faces
+
+    def flush(self):
+        self.__file.write(self.__buffer)
+        self.__buffer.clear()
+        self.__file.flush()
+
+    def close(self):
+        self.flush()
+        if self.__owns_file:
+            self.__file.close()
+
+
+class TapeRNG(DiceRNG):
+    """
+    Replays a tape written by RecordingRNG. Paths are memory-mapped, so
+    even huge tapes are never read into memory all at once.
+
+    Asking for a different die than the one recorded raises ValueError,
+    since the replay has gone off script; running off the end of the
+    tape raises EOFError.
+    """
+    def __init__(self, tape: Union[str, os.PathLike, bytes]):
+        self.__mmap: Optional[mmap.mmap] = None
+        if isinstance(tape, (str, os.PathLike)):
+            with open(tape, 'rb') as tape_file:
+                self.__mmap = mmap.mmap(tape_file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            data: Union[bytes, mmap.mmap] = self.__mmap
+        else:
+            data = tape
+        try:
+            if bytes(data[:len(TAPE_MAGIC)]) != TAPE_MAGIC:
+                raise ValueError('Not a roll tape')
+            if (len(data) - len(TAPE_MAGIC)) % 2:
+                raise ValueError('Truncated roll tape: its last record is '
+                                 'only half written')
+        except ValueError:
+            if self.__mmap is not None:
+                self.__mmap.close()
+            raise
+        self.records = np.frombuffer(data, dtype=np.uint8,
+                                     offset=len(TAPE_MAGIC)).reshape(-1, 2)
+        with memoryview(data) as whole:
+            self.__bytes = whole[len(TAPE_MAGIC):]
+        self.position = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        # Even a spent tape, so that rng or get_rng() still raises EOFError
+        # rather than quietly rolling off the tape.
+        return True
+
+    @property
+    def remaining(self) -> int:
+        return len(self) - self.position
+
+    def randint(self, die_max_value: int) -> int:
+        offset = 2 * self.position
+        try:
+            sides, face = self.__bytes[offset], self.__bytes[offset + 1]
+        except IndexError:
+            raise EOFError('The tape has run out of rolls')
+        if sides + 1 != die_max_value:
+            raise ValueError('Tape has a d%i at roll %i, not a '
+                             'd%i' % (sides + 1, self.position,
+                                      die_max_value))
+        self.position += 1
+        return face + 1
+
+    def faces(self, die_max_value: int, size: Shape,
+              dtype: np.typing.DTypeLike = np.int64) -> np.ndarray:
+        count = int(np.prod(size))
+        if count > self.remaining:
+            raise EOFError('The tape has run out of rolls')
+        records = self.records[self.position:self.position + count]
+        if (records[:, 0] != die_max_value - 1).any():
+            raise ValueError('Tape does not have %i d%i at roll '
+                             '%i' % (count, die_max_value, self.position))
+        self.position += count
+        return (records[:, 1].astype(dtype) + 1).reshape(size)
+
+    def close(self):
+        """
+        Let go of the tape. If views of records are still around, the
+        memory map is left for them and unmapped once they are gone.
+        """
+        self.__bytes.release()
+        self.records = np.empty((0, 2), dtype=np.uint8)
+        if self.__mmap is not None:
+            try:
+                self.__mmap.close()
+            except BufferError:
+                pass
+            self.__mmap = None
+
+
+@contextlib.contextmanager
+def record_rolls(tape: PathOrFile,
+                 rng: Optional[DiceRNG] = None) -> Iterator[RecordingRNG]:
+    """Record every roll made inside the with block onto tape."""
+    recorder = RecordingRNG(tape, rng)
+    try:
+        with use_rng(recorder):
+            yield recorder
+    finally:
+        recorder.close()
+
+
+@contextlib.contextmanager
+def replay_rolls(tape: Union[str, os.PathLike,
+                             bytes]) -> Iterator[TapeRNG]:
+    """Feed every roll made inside the with block from tape."""
+    player = TapeRNG(tape)
+    try:
+        with use_rng(player):
+            yield player
+    finally:
+        player.close()
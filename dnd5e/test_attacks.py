@@ -0,0 +1,164 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from . import Character, roll_dice
+from .attacks import MISS, AttackBatch, attack_odds, resolve_attacks
+from .characters import HitType
+from .items import ArmorType, WeaponType
+from .rng import DiceRNG, NumpyRNG
+from .srd_armor import chain_mail, half_plate
+from .srd_weapons import dagger, greatsword, javelin, longsword, whip
+from .tables import CharacterTable
+
+
+class FixedRNG(DiceRNG):
+    """Every die comes up face (or its highest face, if smaller)."""
+    def __init__(self, face):
+        self.face = face
+
+    def randint(self, die_max_value):
+        return min(self.face, die_max_value)
+
+    def faces(self, die_max_value, size, dtype=np.int64):
+        return np.full(size, min(self.face, die_max_value), dtype=dtype)
+
+
+def fighters():
+    plain = Character('plain', hit_dice=roll_dice('3d8'), level=3,
+                      str_score=8, dex_score=16)
+    armored = Character('armored', hit_dice=roll_dice('5d10'), level=5,
+                        str_score=17, armor=chain_mail,
+                        proficiencies=[WeaponType.MARTIAL, ArmorType.HEAVY])
+    clumsy = Character('clumsy', hit_dice=roll_dice('9d8'), level=9,
+                       dex_score=15, armor=half_plate,
+                       proficiencies=[WeaponType.SIMPLE])
+    plain.wield_main(longsword)
+    plain.wield_off(dagger)
+    armored.wield_main(greatsword)
+    clumsy.wield_main(javelin)
+    clumsy.wield_off(whip)
+    return [plain, armored, clumsy, Character('unarmed', level=1,
+                                              hit_dice=roll_dice('1d4'))]
+
+
+def targets():
+    return [Character('open', base_armor_class=8),
+            Character('shielded', dex_score=14, uses_shield=True),
+            Character('tank', armor=chain_mail, uses_shield=True)]
+
+
+OPTIONS = [dict(zip(('main_hand', 'using_two_hands', 'with_advantage',
+                     'with_disadvantage'), flags))
+           for flags in itertools.product((True, False), repeat=4)]
+
+
+@pytest.mark.parametrize('face', (1, 2, 6, 9, 12, 15, 18, 19, 20))
+def test_same_rules_as_attack(face):
+    for options in OPTIONS:
+        pairs = list(itertools.product(fighters(), targets()))
+        attackers = [attacker for attacker, target in pairs]
+        defenders = [target for attacker, target in pairs]
+        batch = resolve_attacks(attackers, defenders, rng=FixedRNG(face),
+                                **options)
+        for i, (attacker, target) in enumerate(itertools.product(
+                fighters(), targets())):
+            result = attacker.attack(target, rng=FixedRNG(face), **options)
+            assert batch.hit_types()[i] == result.hit_type
+            assert batch.critical_hit[i] == result.critical_hit
+            assert batch.damage[i] == result.damage
+            assert batch.attack_roll[i] == result.attack_roll.total
+            assert batch.modifier[i] == result.modifier
+            assert batch.proficiency_bonus[i] == result.proficiency_bonus
+
+
+def test_thrown_and_ranged():
+    thrower = fighters()[2]
+    batch = resolve_attacks([thrower], [targets()[0]], distance=30,
+                            rng=FixedRNG(20))
+    assert batch.critical_hit[0]
+    assert thrower.wielding == (None, whip)
+
+    with pytest.raises(RuntimeError):
+        resolve_attacks([thrower], [targets()[0]], distance=30)
+
+    table = CharacterTable.from_characters(fighters())
+    resolve_attacks(table, targets(), attacker_rows=[2, 2, 2],
+                    target_rows=[0, 1, 2], distance=[30, 5, 5])
+    assert table.main_hand[2] == -1
+    assert table[2].wielding == (None, whip)
+
+
+def test_batches():
+    table = CharacterTable.from_characters(fighters())
+    rows = np.arange(100000) % 3
+    batch = resolve_attacks(table, targets(), attacker_rows=rows,
+                            target_rows=rows[::-1], rng=NumpyRNG(4))
+    assert isinstance(batch, AttackBatch)
+    assert len(batch) == 100000
+    assert batch.damage[~batch.hits].max() == 0
+    assert batch.damage[batch.hits].min() >= 1
+    assert (batch.hit_type[batch.critical_hit] == 1).all()
+    assert (batch.hit_type == MISS).any()
+    # The second fighter swings a 2d6 greatsword with STR +3.
+    second = (rows == 1) & batch.hits & ~batch.critical_hit
+    assert batch.damage[second].mean() == pytest.approx(10, abs=0.1)
+
+    dead = Character('dead', hit_dice=roll_dice('1d4'), wounds=10)
+    with pytest.raises(RuntimeError):
+        resolve_attacks([dead], targets()[:1])
+    with pytest.raises(ValueError):
+        resolve_attacks(fighters(), targets())
+
+
+def test_attack_odds():
+    # Without advantage, each face of the d20 has a 1/20 share.
+    for attacker, target in itertools.product(fighters(), targets()):
+        for options in OPTIONS:
+            plan = attacker.plan_attack(target, options['main_hand'],
+                                        options['using_two_hands'])
+            if (options['with_advantage'] or options['with_disadvantage'] or
+                    plan.with_disadvantage):
+                continue
+            odds = attack_odds(attacker, target, **options)
+            counts = {None: 0, HitType.ARMOR_GLANCE: 0,
+                      HitType.SHIELD_GLANCE: 0, HitType.FULL: 0}
+            for face in range(1, 21):
+                counts[attacker.attack(target, rng=FixedRNG(face),
+                                       **options).hit_type] += 1
+            assert odds.miss == pytest.approx(counts[None] / 20)
+            assert odds.armor_glance == pytest.approx(
+                counts[HitType.ARMOR_GLANCE] / 20)
+            assert odds.shield_glance == pytest.approx(
+                counts[HitType.SHIELD_GLANCE] / 20)
+            assert odds.hit == pytest.approx(counts[HitType.FULL] / 20)
+            assert odds.critical_hit == pytest.approx(1 / 20)
+            assert odds.damage.pmf(0) == pytest.approx(1 - odds.hit)
+
+    # Unarmed with STR +0: 1 damage, or 2 on a crit.
+    unarmed = fighters()[3]
+    odds = attack_odds(unarmed, targets()[2], with_advantage=True)
+    assert odds.critical_hit == pytest.approx(39 / 400)
+    assert odds.damage.pmf(2) == pytest.approx(39 / 400)
+    assert odds.damage.pmf(1) == pytest.approx(odds.hit - 39 / 400)
+
+    # Half plate without proficiency means disadvantage, or cancels out
+    # advantage.
+    clumsy = fighters()[2]
+    assert attack_odds(clumsy, targets()[0]).critical_hit == \
+        pytest.approx(1 / 400)
+    assert attack_odds(clumsy, targets()[0],
+                       with_advantage=True).critical_hit == \
+        pytest.approx(1 / 20)
+
+    plain, target = fighters()[0], targets()[1]
+    odds = attack_odds(plain, target, with_disadvantage=True)
+    batch = resolve_attacks([plain] * 100000, [target] * 100000,
+                            with_disadvantage=True, rng=NumpyRNG(5))
+    assert batch.hits.mean() == pytest.approx(odds.hit, abs=0.01)
+    assert batch.damage.mean() == pytest.approx(odds.expected_damage,
+                                                abs=0.05)
+
+    with pytest.raises(RuntimeError):
+        attack_odds(plain, target, distance=30)
@@ -1,6 +1,11 @@
+import pickle
+
 from . import roll_dice
-from .characters import Character, CharacterStat, HitType
-from .items import Armor, WeaponType
+from .characters import (DERIVED_STAT_CACHE, PROFICIENCY_BITS,
+                         AttackResult, Character, CharacterStat, HitType,
+                         Proficiencies)
+from .items import Armor, ArmorType, Weapon, WeaponType
+from .srd_armor import chain_mail
 from .srd_weapons import longsword, spear
 
 
@@ -25,6 +30,105 @@ def test_armor_class():
     assert char.AC == 14
 
 
+def test_cached_derived_stats():
+    char = Character(hit_dice=roll_dice('4d8'), level=4, con_score=12)
+    base_hp = sum(char.hit_dice)
+    assert char.maxhp == base_hp + 4
+
+    DERIVED_STAT_CACHE.reset()
+    assert char.maxhp == base_hp + 4
+    assert char.AC == 10
+    assert char.AC == 10
+    assert DERIVED_STAT_CACHE.hits >= 2
+    misses = DERIVED_STAT_CACHE.misses
+
+    # Each input forgets exactly what depends on it.
+    char.wounds = 3
+    assert char.hp == base_hp + 1
+    assert char.maxhp == base_hp + 4
+    char.CON += 2
+    assert char.maxhp == base_hp + 8
+    char.CON.base_value = 6
+    assert char.maxhp == base_hp - 4
+    char.CON = CharacterStat('Constitution', 10)
+    assert char.maxhp == base_hp
+    char.DEX.bonus = 4
+    assert char.AC == 12
+    char.uses_shield = True
+    assert char.AC == 14
+    char.base_armor_class = 11
+    assert char.AC == 15
+    assert char.proficiency_bonus == 2
+    char.hit_dice = roll_dice('5d8')
+    char.level = 5
+    assert char.proficiency_bonus == 3
+    assert char.maxhp == sum(char.hit_dice)
+    assert DERIVED_STAT_CACHE.misses > misses
+
+    char.wounds = char.maxhp
+    assert char.hp_status == 'dead'
+    char.wounds = 0
+    assert char.hp_status == 'unscathed'
+    assert 0 < DERIVED_STAT_CACHE.hit_rate < 1
+
+
+def test_compact_characters():
+    char = Character('hero', hit_dice=roll_dice('3d8'), level=3,
+                     con_score=14)
+    result = AttackResult(HitType.FULL, 5, target=char)
+    for obj in (char, char.CON, result):
+        assert not hasattr(obj, '__dict__')
+
+    copy = pickle.loads(pickle.dumps(char))
+    assert repr(copy) == repr(char)
+    copy.CON.base_value = 18
+    assert copy.maxhp == char.maxhp + 6
+    assert pickle.loads(pickle.dumps(result)).damage == 5
+
+
+def test_proficiencies():
+    char = Character(proficiencies=(WeaponType.SIMPLE,))
+    assert isinstance(char.proficiencies, Proficiencies)
+    assert char.proficiencies == [WeaponType.SIMPLE]
+    assert char.is_proficient_with(spear)
+    assert not char.is_proficient_with(longsword)
+    assert not char.is_proficient_with(Weapon('Stick', '1d4'))
+
+    char.proficiencies.append(WeaponType.MARTIAL)
+    char.proficiencies += [ArmorType.HEAVY, char.STR]
+    assert char.is_proficient_with(longsword)
+    assert char.is_proficient_with(chain_mail)
+    assert CharacterStat('strength') in char.proficiencies
+    assert char.DEX not in char.proficiencies
+    assert char.proficiencies.mask == (
+        PROFICIENCY_BITS[WeaponType.SIMPLE] |
+        PROFICIENCY_BITS[WeaponType.MARTIAL] |
+        PROFICIENCY_BITS[ArmorType.HEAVY] | 1 << 5)
+
+    char.proficiencies.remove(ArmorType.HEAVY)
+    assert not char.is_proficient_with(chain_mail)
+    del char.proficiencies[0]
+    assert not char.is_proficient_with(spear)
+    char.proficiencies[0] = WeaponType.SIMPLE
+    assert char.is_proficient_with(spear)
+    assert not char.is_proficient_with(longsword)
+    assert char.proficiencies.pop() is char.STR
+    assert char.STR not in char.proficiencies
+    char.proficiencies = [ArmorType.LIGHT]
+    assert char.proficiencies.mask == PROFICIENCY_BITS[ArmorType.LIGHT]
+    char.proficiencies.clear()
+    assert char.proficiencies.mask == 0 and len(char.proficiencies) == 0
+
+    char.proficiencies.extend([WeaponType.MARTIAL, char.WIS])
+    assert repr(char.proficiencies) == repr([WeaponType.MARTIAL, char.WIS])
+    assert eval(repr(char)).proficiencies.mask == char.proficiencies.mask
+    copy = pickle.loads(pickle.dumps(char))
+    assert copy.proficiencies.mask == char.proficiencies.mask
+    assert Proficiencies.from_mask(char.proficiencies.mask,
+                                   [copy.STR, copy.WIS]) == \
+        [WeaponType.MARTIAL, copy.WIS]
+
+
 def test_proficiency_bonus():
     expected_bonus_by_lvl = (
         (1, 2), (2, 2), (3, 2), (4, 2),
@@ -0,0 +1,133 @@
+import io
+
+import numpy as np
+import pytest
+
+from . import Character, roll_dice
+from .attacks import MISS, AttackBatch, resolve_attacks
+from .characters import HitType
+from .combatlog import (LOG_MAGIC, NO_WEAPON, RECORD_SIZE, CombatLog,
+                        CombatLogWriter)
+from .rng import NumpyRNG
+from .srd_weapons import longsword
+
+
+def duel():
+    hero = Character('hero', hit_dice=roll_dice('5d8'), level=5,
+                     str_score=18)
+    hero.wield_main(longsword)
+    dummy = Character('dummy', hit_dice=roll_dice('5d8'), level=5)
+    return hero, dummy
+
+
+def test_write_and_read(tmp_path):
+    path = tmp_path / 'session.log'
+    hero, dummy = duel()
+    rng = NumpyRNG(6)
+    with CombatLogWriter(path, buffer_size=100) as writer:
+        results = [hero.attack(dummy, rng=rng) for _ in range(50)]
+        for result in results:
+            writer.write_result(result, hero)
+        writer.write_result(dummy.attack(hero, rng=rng), dummy)
+    assert writer.records == 51
+    assert path.stat().st_size == len(LOG_MAGIC) + 51 * RECORD_SIZE
+
+    with CombatLog(path) as log:
+        assert len(log) == 51
+        damage = log['damage']
+        assert not damage.flags.owndata and not damage.flags.writeable
+        assert damage[:50].tolist() == [r.damage for r in results]
+        assert log['hit_type'][:50].tolist() == [
+            MISS if r.hit_type is None else r.hit_type.value
+            for r in results]
+        assert log.hits.sum() == sum(r.hit_type is HitType.FULL
+                                     for r in results)
+        assert log['critical_hit'][:50].tolist() == [
+            r.critical_hit for r in results]
+        assert (log['d20'][:50] + log['modifier'][:50] +
+                log['proficiency_bonus'][:50]).tolist() == [
+            r.attack_roll.total for r in results]
+        assert log['attacker'].tolist() == [0] * 50 + [1]
+        assert log['target'].tolist() == [1] * 50 + [0]
+        assert log['weapon'].tolist() == [0] * 50 + [NO_WEAPON]
+    # Columns outlive the log they came from.
+    assert damage[:50].tolist() == [r.damage for r in results]
+
+    # Logs are appended to, and a torn last record is ignored.
+    with CombatLogWriter(path) as writer:
+        writer.write(7, 8, 9, 20, -1, 2, HitType.FULL.value, True, 300)
+    with open(path, 'ab') as log_file:
+        log_file.write(b'\x01\x02')
+    with CombatLog(path) as log:
+        assert len(log) == 52
+        assert log.records[-1].tolist() == (7, 8, 9, 20, -1, 2, 1, True,
+                                            300)
+
+    # Appending to a torn log first cuts off the torn record.
+    with CombatLogWriter(path) as writer:
+        writer.write(1, 2, 3, 4, 5, 6, 7, False, 8)
+    assert path.stat().st_size == len(LOG_MAGIC) + 53 * RECORD_SIZE
+    with CombatLog(path) as log:
+        assert len(log) == 53
+        assert log.records[-2].tolist() == (7, 8, 9, 20, -1, 2, 1, True,
+                                            300)
+        assert log.records[-1].tolist() == (1, 2, 3, 4, 5, 6, 7, False, 8)
+
+
+def test_bad_logs(tmp_path):
+    with pytest.raises(ValueError):
+        CombatLog(b'DNDTAPE\x01')
+    path = tmp_path / 'not.log'
+    path.write_bytes(b'DNDTAPE\x01\x00\x00')
+    with pytest.raises(ValueError):
+        CombatLogWriter(path)
+    assert path.read_bytes() == b'DNDTAPE\x01\x00\x00'
+    with pytest.raises(ValueError):
+        CombatLogWriter(io.BytesIO(b'DND'))
+    writer = CombatLogWriter(io.BytesIO())
+    with pytest.raises(ValueError):
+        writer.write(0, 0, 0, 21, 0, 0, 0, False, 70000)
+    # Weapon NO_WEAPON is taken, to mean none.
+    hero, dummy = duel()
+    other_weapons = [object() for _ in range(NO_WEAPON)]
+    for weapon in other_weapons:
+        writer.weapons.add(weapon)
+    with pytest.raises(ValueError):
+        writer.write_result(hero.attack(dummy), hero)
+    with pytest.raises(ValueError):
+        writer.write(-1, 0, 0, 1, 0, 0, 0, False, 0)
+
+
+def test_write_batch():
+    hero, dummy = duel()
+    batch = resolve_attacks([hero] * 1000, [dummy] * 1000, rng=NumpyRNG(7))
+    log_file = io.BytesIO()
+    writer = CombatLogWriter(log_file)
+    writer.write(0, 1, 0, 1, 0, 0, MISS, False, 0)
+    writer.write_batch(batch, np.zeros(1000, dtype=int),
+                       np.ones(1000, dtype=int), np.full(1000, -1))
+    for attackers, weapons, field, value in (
+            (np.zeros(1000), np.zeros(1000, dtype=int), None, None),
+            (np.full(1000, -1), np.zeros(1000, dtype=int), None, None),
+            (np.zeros(1000, dtype=int), np.full(1000, 1 << 16), None, None),
+            (np.zeros(1000, dtype=int), np.full(1000, NO_WEAPON), None,
+             None),
+            (np.zeros(1000, dtype=int), np.zeros(1000, dtype=int),
+             'damage', 70000),
+            (np.zeros(1000, dtype=int), np.zeros(1000, dtype=int),
+             'modifier', 200)):
+        bad_batch = batch
+        if field is not None:
+            column = getattr(batch, field).astype(np.int64)
+            column[-1] = value
+            bad_batch = AttackBatch(**dict(batch._asdict(), **{field: column}))
+        with pytest.raises(ValueError):
+            writer.write_batch(bad_batch, attackers,
+                               np.ones(1000, dtype=int), weapons)
+    writer.close()
+    log = CombatLog(log_file.getvalue())
+    assert len(log) == 1001
+    assert log['damage'][1:].tolist() == batch.damage.tolist()
+    assert log['hit_type'][1:].tolist() == batch.hit_type.tolist()
+    assert log['d20'][1:].tolist() == batch.d20.tolist()
+    assert (log['weapon'][1:] == NO_WEAPON).all()
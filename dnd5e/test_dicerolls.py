@@ -1,8 +1,16 @@
+import numpy as np
 import operator
 import pytest
 
-from . import roll, reroll_if
-from .dicerolls import parse_condition
+from . import (drop_highest, drop_lowest, keep_highest, keep_lowest, roll,
+               roll_batch, roll_d20, roll_dice, roll_pool, roll_stream,
+               reroll_if)
+from .dicerolls import (MAX_EXPLOSIONS, DiceGroup, DiceResult, DieResult,
+                        PoolResult, RerollPolicy, RollChunk, compile_dice,
+                        kept_indices, parse_condition, roll_d20_batch,
+                        roll_pool_batch, select_batch)
+from .distributions import dice_distribution
+from .rng import NumpyRNG, PythonRNG
 
 
 def test_roll():
@@ -42,6 +50,156 @@ def test_roll():
         list(roll(1))
 
 
+def test_dice_result():
+    result = DiceResult.from_faces(6, [4, 3, 1, 6])
+    assert not hasattr(result, '__dict__')
+    assert not hasattr(result[0], '__dict__')
+    assert len(result) == 4
+    assert result.total == result.dice_total == 14
+    assert list(result.int_results) == [4, 3, 1, 6]
+    assert result[-1].result == 6
+    assert result[-1].die_max_value == 6
+    assert [die.result for die in result[1:3]] == [3, 1]
+    assert result == DiceResult(DieResult(6, face) for face in (4, 3, 1, 6))
+    assert result != DiceResult.from_faces(8, [4, 3, 1, 6])
+    with pytest.raises(IndexError):
+        result[4]
+
+    result - 2
+    assert result.total == 12
+    assert result.dice_total == 14
+
+    mixed = result + DiceResult.from_faces(300, [299])
+    assert mixed.die_max_values == (6, 6, 6, 6, 300)
+    assert mixed.total == 311
+    assert mixed[4].result == 299
+    assert eval(repr(mixed)) == mixed
+
+
+def test_roll_batch():
+    results = roll_batch('1d1', 10)
+    assert results.shape == (10, 1)
+    assert (results == 1).all()
+
+    results = roll_batch('4d6', 1000)
+    assert results.shape == (1000, 4)
+    assert results.min() >= 1
+    assert results.max() <= 6
+    assert set(results.flatten()) == {1, 2, 3, 4, 5, 6}
+
+    totals = roll_batch('4d6', 1000, summed=True)
+    assert totals.shape == (1000,)
+    assert 4 <= totals.min() <= totals.max() <= 24
+
+    assert roll_batch('3d300', 5).max() <= 300
+    assert roll_batch('0d0', 3).shape == (3, 0)
+    assert (roll_batch('0d0', 3, summed=True) == 0).all()
+
+    with pytest.raises(ValueError):
+        roll_batch(None, 10)
+
+    with pytest.raises(ValueError):
+        roll_batch('1d6', -1)
+
+
+def test_compile_dice():
+    plan = compile_dice('2d6+1d4+3')
+    assert plan.groups == (DiceGroup(2, 6), DiceGroup(1, 4))
+    assert plan.modifier == 3
+    assert compile_dice('2d6+1d4+3') is plan
+    result = plan.roll()
+    assert len(result) == 3
+    assert 6 <= result.total <= 19
+    assert [die.die_max_value for die in result] == [6, 6, 4]
+
+    assert compile_dice('4d6kh3').groups == (DiceGroup(4, 6, drop_lowest=1),)
+    assert compile_dice('4d6kl1').groups == (DiceGroup(4, 6,
+                                                       drop_highest=3),)
+    assert compile_dice('4d6dl').groups == (DiceGroup(4, 6, drop_lowest=1),)
+    assert compile_dice('1d20adv').groups == (DiceGroup(1, 20, advantage=1),)
+    assert compile_dice('D20DIS').groups == (DiceGroup(1, 20,
+                                                       advantage=-1),)
+    assert compile_dice('4d6r1r<=2').groups == (
+        DiceGroup(4, 6, reroll=RerollPolicy(('x==1', 'x<=2'))),)
+    assert compile_dice(' 1d8 - 1 ').modifier == -1
+    assert compile_dice('3').groups == ()
+
+    assert len(compile_dice('10d6kh3').roll()) == 3
+    assert len(compile_dice('10d6kl3').roll()) == 3
+    assert len(compile_dice('1d20adv').roll()) == 1
+    assert compile_dice('3d1r1').roll().total == 3
+
+    kept = compile_dice('6d20dl2dh2').roll()
+    assert len(kept) == 2
+    # Keeping and dropping add up, each working on the dice still kept.
+    assert compile_dice('4d6kh3kl2').groups == (
+        DiceGroup(4, 6, drop_lowest=1, drop_highest=1),)
+    assert compile_dice('4d6kl2kh1').groups == (
+        DiceGroup(4, 6, drop_lowest=1, drop_highest=2),)
+    assert compile_dice('6d6dl1kh3').groups == (
+        DiceGroup(6, 6, drop_lowest=3),)
+    assert compile_dice('6d6kh4dh1').groups == (
+        DiceGroup(6, 6, drop_lowest=2, drop_highest=1),)
+    assert len(compile_dice('4d6kh3kl2').roll()) == 2
+
+    for expression in ('', None, 'd', '1d6+', '2d6 3', '1d6-1d4', '1d6kx',
+                       '2d6dl5', '2d6dl2', '4d6dl2dh2', '3d6kh0'):
+        with pytest.raises(ValueError):
+            compile_dice(expression)
+
+
+def test_roll_totals():
+    rng = NumpyRNG(5)
+    totals = compile_dice('4d6r1dl').roll_totals(20000, rng)
+    exact = dice_distribution('4d6', 'x==1', dropping_lowest=True)
+    assert totals.shape == (20000,)
+    assert exact.min_value <= totals.min() <= totals.max() <= exact.max_value
+    assert abs(totals.mean() - exact.mean) < 0.05
+
+    totals = compile_dice('1d20adv').roll_totals(20000, rng)
+    assert abs(totals.mean() - 13.825) < 0.15
+    totals = compile_dice('1d20dis').roll_totals(20000, rng)
+    assert abs(totals.mean() - 7.175) < 0.15
+
+    totals = compile_dice('2d6+1d4+3').roll_totals(1000, rng)
+    assert 6 <= totals.min() <= totals.max() <= 19
+    assert (compile_dice('0d0+2').roll_totals(3, rng) == 2).all()
+    assert (compile_dice('3d1r1').roll_totals(3, rng) == 3).all()
+
+
+def test_roll_stream():
+    chunks = list(roll_stream('1d6', chunk_size=100, chunks=3))
+    assert len(chunks) == 3
+    assert all(chunk.shape == (100,) for chunk in chunks)
+
+    stream = roll_stream('2d6', chunk_size=1000, with_stats=True)
+    for _ in range(5):
+        chunk = next(stream)
+        assert isinstance(chunk, RollChunk)
+        assert chunk.minimum == chunk.totals.min() >= 2
+        assert chunk.maximum == chunk.totals.max() <= 12
+        assert abs(chunk.mean - 7) < 0.5
+
+    first = list(roll_stream('4d6', 10, chunks=2, rng=NumpyRNG(1)))
+    again = list(roll_stream('4d6', 10, chunks=2, rng=NumpyRNG(1)))
+    assert [chunk.tolist() for chunk in first] == \
+        [chunk.tolist() for chunk in again]
+
+    with pytest.raises(ValueError):
+        next(roll_stream('1d6', chunk_size=0))
+
+
+def test_roll_dice():
+    result = roll_dice('4d6', rerolling_if='x==1', dropping_lowest=True)
+    assert len(result) == 3
+    result = roll_dice('4d1', rerolling_if=['x==1'], dropping_lowest=True)
+    assert result.total == 3
+    assert roll_dice('2d1+1d1+2').total == 5
+
+    with pytest.raises(ValueError):
+        roll_dice(None)
+
+
 def test_reroll():
     results = tuple(reroll_if(roll('4d6'), 'x<2'))
     assert len(results) == 4
@@ -68,6 +226,78 @@ def test_reroll():
     assert r3 is r3_
 
 
+def test_reroll_policy():
+    policy = RerollPolicy('x==1')
+    assert policy(1)
+    assert not policy(2)
+    assert policy.matches(1)
+    assert bool(policy)
+    assert not RerollPolicy()
+    assert RerollPolicy.from_conditions(policy) is policy
+    assert RerollPolicy.from_conditions('x==1') == policy
+    assert RerollPolicy.from_conditions(['x==1']) is \
+        RerollPolicy.from_conditions(('x==1',))
+
+    combined = policy | 'x>=1000'
+    assert combined == RerollPolicy(('1==x', 'x >= 1000'))
+    assert combined(1) and combined(1000) and combined(5000)
+    assert not combined(999)
+    assert eval(repr(combined)) == combined
+
+    faces = np.array([[1, 2, 3], [3, 1, 1]])
+    assert (policy.mask(faces) == (faces == 1)).all()
+
+    faces = roll_batch('10d1', 10)
+    assert (RerollPolicy('x==1').apply(faces, 1) == 1).all()
+    faces = np.ones((100, 4), dtype=np.uint8)
+    RerollPolicy('x<2').apply(faces, 6)
+    assert faces.max() > 1
+
+    assert (roll_batch('4d6', 1000, rerolling_if=policy) >= 1).all()
+    assert roll_dice('3d1', rerolling_if=combined).total == 3
+
+    r1, r2 = roll('2d1')
+    r1_, r2_ = reroll_if((r1, r2), policy)
+    assert r1 is not r1_
+    assert r2 is not r2_
+
+
+def test_keep_and_drop():
+    rolls = [DieResult(6, face) for face in (3, 1, 5, 1, 6, 5)]
+    assert [int(die) for die in drop_lowest(rolls)] == [3, 5, 1, 6, 5]
+    assert drop_lowest(rolls)[1] is rolls[2]
+    assert [int(die) for die in drop_lowest(rolls, 3)] == [5, 6, 5]
+    assert [int(die) for die in drop_highest(rolls, 2)] == [3, 1, 1, 5]
+    assert [int(die) for die in keep_highest(rolls, 2)] == [6, 5]
+    assert [int(die) for die in keep_lowest(rolls, 2)] == [1, 1]
+    assert keep_highest(rolls, 10) == rolls
+    assert keep_lowest(rolls, 0) == []
+
+    with pytest.raises(ValueError):
+        drop_lowest([])
+    with pytest.raises(ValueError):
+        drop_highest(rolls, 7)
+
+    assert kept_indices([3, 1, 5, 1, 6, 5], 1, 1) == [0, 2, 3, 5]
+    assert kept_indices([2, 2, 2], drop_lowest=1) == [1, 2]
+    assert len(roll_dice('20d20kl5')) == 5
+
+
+def test_select_batch():
+    faces = np.random.default_rng(4).integers(1, 20, size=(500, 12),
+                                              endpoint=True)
+    ordered = np.sort(faces, axis=1)
+    for low, high in ((0, 0), (3, 0), (0, 4), (2, 5), (6, 6), (12, 0)):
+        kept = np.sort(select_batch(faces, low, high), axis=1)
+        assert (kept == ordered[:, low:12 - high]).all()
+
+    kept = roll_batch('10d6', 100, dropping_lowest=7)
+    assert kept.shape == (100, 3)
+    totals = roll_batch('4d6', 100, summed=True, dropping_lowest=True,
+                        dropping_highest=True)
+    assert 2 <= totals.min() <= totals.max() <= 12
+
+
 def test_parse_condition():
     op, val = parse_condition('x < 1')
     assert op == operator.lt
@@ -266,3 +496,65 @@ def test_parse_condition():
 
     with pytest.raises(ValueError):
         parse_condition('x + y')
+
+
+def test_exploding_dice():
+    plan = compile_dice('3d6!')
+    assert plan.groups[0].explode
+    rng = NumpyRNG(13)
+    for _ in range(200):
+        result = plan.roll(rng)
+        assert len(result) - 3 == list(result.int_results).count(6)
+    assert (plan.roll_totals(1000, rng) >= 3).all()
+    assert plan.roll_totals(100000, rng).mean() == pytest.approx(12.6,
+                                                                 abs=0.1)
+
+    # A die that always comes up 6 explodes MAX_EXPLOSIONS times, no more.
+    class Sixes(PythonRNG):
+        def randint(self, die_max_value):
+            return die_max_value
+
+        def faces(self, die_max_value, size, dtype=np.int64):
+            return np.full(size, die_max_value, dtype=dtype)
+
+    assert compile_dice('1d6!').roll(Sixes()).total == \
+        6 * (MAX_EXPLOSIONS + 1)
+    assert compile_dice('1d6!').roll_totals(2, Sixes()).tolist() == \
+        [6 * (MAX_EXPLOSIONS + 1)] * 2
+
+    with pytest.raises(ValueError):
+        compile_dice('4d6!kh3')
+    with pytest.raises(ValueError):
+        compile_dice('1d1!')
+
+
+def test_roll_d20():
+    assert roll_d20(rng=NumpyRNG(3)).die_max_values == (20,)
+    rng = PythonRNG.from_seed(5)
+    first, second = rng.randint(20), rng.randint(20)
+    assert roll_d20(1, PythonRNG.from_seed(5)).total == max(first, second)
+    assert roll_d20(-1, PythonRNG.from_seed(5)).total == min(first, second)
+
+    rng = NumpyRNG(3)
+    straight = roll_d20_batch(100000, rng=rng)
+    assert straight.min() == 1 and straight.max() == 20
+    assert roll_d20_batch(100000, 1, rng).mean() == pytest.approx(13.825,
+                                                                  abs=0.1)
+    assert roll_d20_batch(100000, -1, rng).mean() == pytest.approx(7.175,
+                                                                   abs=0.1)
+
+
+def test_roll_pool():
+    pool = roll_pool('6d10', 7, NumpyRNG(8))
+    assert isinstance(pool, PoolResult)
+    assert len(pool.dice) == 6
+    assert pool.successes == sum(face >= 7 for face in pool.dice.int_results)
+
+    successes = roll_pool_batch('6d10', 100000, 7, NumpyRNG(8))
+    assert successes.min() >= 0 and successes.max() <= 6
+    assert successes.mean() == pytest.approx(2.4, abs=0.05)
+    assert roll_pool_batch('5d6kh2', 1000, 1, NumpyRNG(8)).tolist() == \
+        [2] * 1000
+
+    with pytest.raises(ValueError):
+        roll_pool('3d6!', 5)
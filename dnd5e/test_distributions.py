@@ -0,0 +1,155 @@
+import itertools
+import pytest
+
+from .dicerolls import RerollPolicy, compile_dice, parse_condition
+from .distributions import (Distribution, dice_distribution, plan_distribution,
+                            pool_distribution)
+
+
+def brute_force(m, n, conditions=(), dropping_lowest=False):
+    """Enumerate every (first face, reroll face) pair of every die."""
+    conditions = [parse_condition(c) for c in conditions]
+    die = {}
+    for first, second in itertools.product(range(1, n + 1), repeat=2):
+        face = first
+        if any(op(first, val) for op, val in conditions):
+            face = second
+        die[face] = die.get(face, 0) + 1 / (n * n)
+
+    totals = {}
+    for faces in itertools.product(die, repeat=m):
+        prob = 1.
+        for face in faces:
+            prob *= die[face]
+        total = sum(faces) - (min(faces) if dropping_lowest else 0)
+        totals[total] = totals.get(total, 0) + prob
+    return totals
+
+
+def assert_matches(dist, expected):
+    for value, prob in expected.items():
+        assert dist.pmf(value) == pytest.approx(prob)
+    assert sum(dist.as_dict().values()) == pytest.approx(1.)
+
+
+def test_plain_dice():
+    dist = dice_distribution('2d6')
+    assert dist.min_value == 2
+    assert dist.max_value == 12
+    assert dist.pmf(7) == pytest.approx(1 / 6)
+    assert dist.pmf(1) == 0.
+    assert dist.mean == pytest.approx(7.)
+    assert dist.variance == pytest.approx(35 / 6)
+    assert dist.cdf(12) == pytest.approx(1.)
+    assert dist.at_least(2) == pytest.approx(1.)
+    assert dist.at_least(12) == pytest.approx(1 / 36)
+
+    assert dice_distribution('1d1') == Distribution.constant(1)
+    assert dice_distribution('0d0') == Distribution.constant(0)
+
+
+def test_reroll_and_drop_lowest():
+    assert_matches(dice_distribution('3d6', rerolling_if='x==1'),
+                   brute_force(3, 6, ('x==1',)))
+    assert_matches(dice_distribution('3d4', rerolling_if=('x<2', 'x==4')),
+                   brute_force(3, 4, ('x<2', 'x==4')))
+    assert_matches(dice_distribution('4d6', dropping_lowest=True),
+                   brute_force(4, 6, dropping_lowest=True))
+    assert_matches(dice_distribution('4d6', rerolling_if='x==1',
+                                     dropping_lowest=True),
+                   brute_force(4, 6, ('x==1',), dropping_lowest=True))
+    assert_matches(dice_distribution('1d8', dropping_lowest=True), {0: 1.})
+
+    dist = dice_distribution('4d6', dropping_lowest=True)
+    assert dist.mean == pytest.approx(15869 / 1296)
+
+    # Like roll_dice(), dropping the lowest of no dice totals 0.
+    assert dice_distribution('0d6', dropping_lowest=True) == \
+        Distribution.constant(0)
+
+
+def test_expressions():
+    assert dice_distribution('2d6+3') == dice_distribution('2d6') + 3
+    assert dice_distribution('4d6kh3') == \
+        dice_distribution('4d6', dropping_lowest=True)
+    assert dice_distribution('4d6kh3', 'x==1') is \
+        plan_distribution('4d6r1dl')
+    assert dice_distribution('1d20adv').mean == pytest.approx(13.825)
+    with pytest.raises(ValueError):
+        dice_distribution('1d6-1d4')
+
+
+def test_memoized():
+    assert dice_distribution('4d6', 'x==1') is \
+        dice_distribution('4d6', ('x == 1',))
+    assert dice_distribution('4d6', RerollPolicy('x==1')) is \
+        dice_distribution('4d6', 'x==1')
+    with pytest.raises(ValueError):
+        dice_distribution('4d6').probabilities[0] = 1.
+
+
+def test_arithmetic():
+    dist = dice_distribution('1d4') + dice_distribution('1d6') + 3
+    assert dist.min_value == 5
+    assert dist.max_value == 13
+    assert dist.mean == pytest.approx(2.5 + 3.5 + 3)
+    assert (dist - 3).min_value == 2
+
+
+def test_plan_distribution():
+    assert plan_distribution('4d6r1dl') == \
+        dice_distribution('4d6', 'x==1', True)
+    assert plan_distribution('2d6+1d4+3') == \
+        dice_distribution('2d6') + dice_distribution('1d4') + 3
+    assert plan_distribution(compile_dice('3d6')) is plan_distribution('3d6')
+
+    # 5d4, keeping the middle three
+    expected = {}
+    for faces in itertools.product(range(1, 5), repeat=5):
+        total = sum(sorted(faces)[1:4])
+        expected[total] = expected.get(total, 0) + 1 / 4 ** 5
+    assert_matches(plan_distribution('5d4dl1dh1'), expected)
+
+    advantage = plan_distribution('1d20adv')
+    assert advantage.pmf(20) == pytest.approx(39 / 400)
+    assert advantage.pmf(1) == pytest.approx(1 / 400)
+    assert advantage.mean == pytest.approx(13.825)
+    disadvantage = plan_distribution('1d20dis')
+    assert disadvantage.pmf(1) == pytest.approx(39 / 400)
+    assert disadvantage.mean == pytest.approx(7.175)
+
+    exploding = plan_distribution('1d6!')
+    assert exploding.pmf(5) == pytest.approx(1 / 6)
+    assert exploding.pmf(6) == 0.
+    assert exploding.pmf(9) == pytest.approx(1 / 36)
+    assert exploding.mean == pytest.approx(4.2)
+
+
+def test_pool_distribution():
+    dist = pool_distribution('6d10', 7)
+    assert dist.max_value == 6
+    assert dist.pmf(0) == pytest.approx(0.6 ** 6)
+    assert dist.mean == pytest.approx(2.4)
+    assert pool_distribution('2d6r1', 6).mean == pytest.approx(
+        2 * (1 / 6 + 1 / 36))
+    with pytest.raises(ValueError):
+        pool_distribution('4d6kh3', 5)
+    with pytest.raises(ValueError):
+        pool_distribution('4d6!', 5)
+
+
+def test_mixture_and_clip():
+    d6 = dice_distribution('1d6')
+    mixed = Distribution.mixture(((0.5, Distribution.constant(0)),
+                                  (0.5, d6 + 10)))
+    assert mixed.pmf(0) == pytest.approx(0.5)
+    assert mixed.pmf(13) == pytest.approx(1 / 12)
+    assert mixed.pmf(5) == 0.
+    assert mixed.mean == pytest.approx(6.75)
+
+    clipped = (d6 - 3).clip_below(1)
+    assert clipped.min_value == 1
+    assert clipped.pmf(1) == pytest.approx(4 / 6)
+    assert clipped.pmf(3) == pytest.approx(1 / 6)
+    assert d6.clip_below(0) is d6
+    assert d6.clip_below(9) == Distribution.constant(9)
@@ -0,0 +1,136 @@
+import pickle
+
+import pytest
+
+from . import Character, roll_dice
+from .dicerolls import DiceResult
+from .encounters import (Encounter, copies, first_foe, random_foe, simulate,
+                         throw_first, weakest_foe)
+from .enemies import kobold
+from .items import WeaponType
+from .rng import NumpyRNG
+from .srd_weapons import javelin, shortsword, spear
+
+
+def hero():
+    character = Character('hero', hit_dice=DiceResult.from_faces(8, (5,) * 5),
+                          level=5, str_score=18, dex_score=18,
+                          proficiencies=[WeaponType.SIMPLE,
+                                         WeaponType.MARTIAL])
+    character.wield_main(shortsword)
+    return character
+
+
+def kobolds(n):
+    pack = []
+    for i in range(n):
+        kobold = Character('kobold %i' % i, str_score=7, dex_score=15,
+                           con_score=9,
+                           hit_dice=DiceResult.from_faces(6, (3, 4)),
+                           level=2)
+        kobold.wield_main(spear)
+        pack.append(kobold)
+    return pack
+
+
+def test_encounter():
+    with pytest.raises(ValueError):
+        Encounter([hero()])
+    with pytest.raises(ValueError):
+        Encounter([hero()], [kobold, kobold])
+
+    fighter, pack = hero(), kobolds(3)
+    fight = Encounter([fighter], pack, max_rounds=1000)
+    result = fight.run(NumpyRNG(1))
+    assert result.winner in (0, 1)
+    loser = 1 - result.winner
+    assert result.survivors[loser] == 0
+    assert result.survivors[result.winner] > 0
+    assert 1 <= result.rounds and result.hits <= result.attacks
+    assert sum(kobold.hp < 1 for kobold in pack) == 3 - result.survivors[1]
+    assert (fighter.hp < 1) == (result.survivors[0] == 0)
+
+    # Every run starts over from the same wounds and weapons.
+    assert fight.run(NumpyRNG(1)) == result
+    fight.reset()
+    assert fighter.wounds == 0 and all(not k.wounds for k in pack)
+
+    results = list(fight.run_many(200, NumpyRNG(2)))
+    assert len(results) == 200
+    wins = sum(result.winner == 0 for result in results)
+    assert wins > 150   # a fighter should beat three kobolds
+
+
+def test_draw():
+    a = Character('a', hit_dice=roll_dice('10d8'), level=10,
+                  str_score=1, dex_score=1)
+    b = Character('b', hit_dice=roll_dice('10d8'), level=10,
+                  base_armor_class=30)
+    result = Encounter([a], [b], max_rounds=3).run()
+    assert result.winner is None and result.rounds == 3
+    assert result.attacks == 6 and result.survivors == (1, 1)
+
+
+@pytest.mark.parametrize('policy', [first_foe, random_foe, weakest_foe])
+def test_target_policies(policy):
+    pack = kobolds(3)
+    pack[1].wounds = pack[1].maxhp - 1
+    fighter = hero()
+    fight = Encounter([fighter], pack, [Character(
+        'bystander', hit_dice=roll_dice('1d4'), level=1)],
+        target_policy=policy)
+    result = fight.run(NumpyRNG(3))
+    assert len(result.survivors) == len(result.damage) == 3
+    if policy is weakest_foe:
+        assert weakest_foe(fighter, pack, NumpyRNG(0)) is pack[1]
+
+
+def test_thrown_weapons():
+    thrower = hero()
+    thrower.wield_main(javelin)
+    target = Character('target', hit_dice=roll_dice('10d8'), level=10)
+    fight = Encounter([thrower], [target], weapon_policy=throw_first,
+                      max_rounds=3)
+    fight.run(NumpyRNG(4))
+    assert fight.thrown == [(thrower, javelin)]
+    assert thrower.wielding == (None, None)
+    fight.reset()
+    assert fight.thrown == [] and thrower.wielding == (javelin, None)
+
+
+def test_copies():
+    pack = copies(kobold, 3)
+    assert len(set(map(id, pack))) == 3
+    pack[0].wounds += 1
+    pack[0].STR.bonus += 1
+    assert pack[1].wounds == kobold.wounds
+    assert pack[1].STR.value == kobold.STR.value
+    assert pack[1].hp == kobold.hp
+
+
+def test_simulate():
+    fight = Encounter([hero()], copies(kobolds(1)[0], 2))
+    fight = pickle.loads(pickle.dumps(fight))
+    assert fight.run(NumpyRNG(5)).winner is not None
+
+    summary = simulate(fight, 250, seed=9, shard_size=40)
+    assert summary.fights == 250
+    assert summary.wins.sum() + summary.draws == 250
+    assert summary.win_rates[0] > 0.9
+    assert summary.damage[0].count == 250
+    assert 1 <= summary.rounds.minimum <= summary.rounds.mean
+
+    def totals(summary):
+        return (summary.wins.tolist(), summary.draws, summary.attacks,
+                summary.hits, summary.survivors.tolist(),
+                summary.rounds.mean, summary.rounds.sum_of_squares,
+                [(damage.mean, damage.sum_of_squares)
+                 for damage in summary.damage])
+
+    # The same seed gives the same numbers, however many workers.
+    assert totals(simulate(fight, 250, seed=9, shard_size=40)) == \
+        totals(summary)
+    assert totals(simulate(fight, 250, seed=9, shard_size=40,
+                           workers=2)) == totals(summary)
+    assert totals(simulate(fight, 250, seed=10, shard_size=40)) != \
+        totals(summary)
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from . import Character, roll_dice
+from .characters import AttackEvent, HitType
+from .encounters import Encounter
+from .events import (BackgroundSink, EventBus, JSONLSink, NullSink,
+                     RingBuffer, Sink, TextSink, get_bus, use_bus)
+from .rng import NumpyRNG
+from .srd_weapons import spear
+
+
+def fighters():
+    ann = Character('Ann', hit_dice=roll_dice('3d8'), level=3,
+                    str_score=16)
+    ann.wield_main(spear)
+    bob = Character('Bob', hit_dice=roll_dice('3d8'), level=3)
+    return ann, bob
+
+
+def test_attack_events(capsys):
+    ann, bob = fighters()
+    assert not get_bus().active
+    result = ann.attack(bob, rng=NumpyRNG(1))
+    assert result.describe() is result
+    assert capsys.readouterr().out == ''
+
+    event = AttackEvent.from_result(result, ann)
+    assert event.attacker == 'Ann' and event.target == 'Bob'
+    assert event.weapon == 'Spear'
+    assert event.d20 + event.modifier + event.proficiency_bonus == \
+        result.attack_roll.total
+    assert event.describe().startswith("Ann's Spear attack ")
+    assert result.description.startswith('The Spear attack ')
+    assert json.loads(json.dumps(event.as_dict()))['damage'] == \
+        result.damage
+
+    hit = event._replace(hit_type=HitType.FULL, damage=7)
+    assert hit.describe() == "Ann's Spear attack hits Bob for 7 damage!"
+    assert hit.as_dict()['hit_type'] == 'FULL'
+    assert event._replace(hit_type=None, attacker=None,
+                          weapon=None).describe() == \
+        'The attack missed Bob.'
+
+
+def test_sinks(tmp_path):
+    ann, bob = fighters()
+    ring = RingBuffer(3)
+    text_path = tmp_path / 'fight.txt'
+    jsonl_path = tmp_path / 'fight.jsonl'
+    with EventBus(ring, NullSink(), TextSink(text_path),
+                  BackgroundSink(JSONLSink(jsonl_path))) as bus:
+        with use_bus(bus):
+            assert get_bus() is bus
+            for _ in range(5):
+                ann.attack(bob, rng=NumpyRNG(2)).describe(ann)
+        assert not get_bus().active
+        # use_bus() leaves a bus it was given open.
+        bus.publish(list(ring)[-1])
+
+    assert len(ring) == 3
+    lines = text_path.read_text().splitlines()
+    assert len(lines) == 6 and lines[-3:] == ring.describe()
+    records = [json.loads(line)
+               for line in jsonl_path.read_text().splitlines()]
+    assert len(records) == 6
+    assert records[-1] == list(ring)[-1].as_dict()
+
+
+def test_background_flush(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    sink = BackgroundSink(JSONLSink(path))
+    ann, bob = fighters()
+    event = AttackEvent.from_result(ann.attack(bob), ann)
+    for _ in range(1000):
+        sink.write(event)
+    sink.flush()
+    assert len(path.read_text().splitlines()) == 1000
+    sink.close()
+    sink.close()
+
+
+def test_background_errors():
+    class FlakySink(RingBuffer):
+        def write(self, event):
+            if event == 'bad':
+                raise OSError('disk full')
+            super().write(event)
+
+    flaky = FlakySink()
+    sink = BackgroundSink(flaky)
+    for event in ('one', 'bad', 'two'):
+        sink.write(event)
+    with pytest.raises(OSError):
+        sink.flush()
+    sink.flush()
+    assert list(flaky) == ['one', 'two']
+
+    sink.write('bad')
+    with pytest.raises(OSError):
+        sink.close()
+    sink.close()
+
+
+def test_incomplete_sink():
+    class Drain(Sink):
+        def flush(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Drain()
+
+
+def test_quiet_bus():
+    with pytest.raises(RuntimeError):
+        get_bus().subscribe(RingBuffer())
+    assert not get_bus().active
+
+
+def test_encounter_events():
+    ann, bob = fighters()
+    with use_bus() as bus:
+        ring = bus.subscribe(RingBuffer(1000))
+        result = Encounter([ann], [bob]).run(NumpyRNG(3))
+    assert len(ring) == result.attacks
+    assert {event.attacker for event in ring} == {'Ann', 'Bob'}
+    assert sum(event.damage for event in ring
+               if event.attacker == 'Ann') == result.damage[0]
@@ -1,4 +1,7 @@
-from .items import Weapon
+import pickle
+
+from .items import Armor, ArmorType, Weapon
+from .srd_weapons import longsword
 
 
 def test_weapon_properties():
@@ -35,3 +38,11 @@ def test_weapon_properties():
     glaive = Weapon('Glaive', '1d10', is_heavy=True, has_reach=True,
                     requires_two_hands=True)
     assert glaive.properties == ['Heavy', 'Reach', 'Two-handed']
+
+
+def test_compact_items():
+    plate = Armor('Half plate', 15, ArmorType.MEDIUM)
+    for item in (plate, longsword, Weapon('Club', '1d4')):
+        assert not hasattr(item, '__dict__')
+        assert repr(pickle.loads(pickle.dumps(item))) == repr(item)
+    assert pickle.loads(pickle.dumps(longsword)).versatile
@@ -0,0 +1,58 @@
+import pytest
+
+from . import Character, roll_dice
+from .montecarlo import Estimate, attack_sampler, estimate, roll_sampler
+from .rng import NumpyRNG
+from .srd_weapons import javelin, longsword
+
+
+def test_estimate_roll():
+    result = estimate(roll_sampler('2d6'), precision=0.05, rng=NumpyRNG(1))
+    assert isinstance(result, Estimate)
+    assert result.converged
+    assert result.low <= 7 <= result.high
+    assert result.half_width <= 0.05
+    assert result.samples % 4096 == 0
+    assert result.seconds >= 0
+
+    # Tighter precision needs more samples.
+    tighter = estimate(roll_sampler('2d6'), precision=0.01, rng=NumpyRNG(1))
+    assert tighter.samples > result.samples
+    assert tighter.mean == pytest.approx(7, abs=0.02)
+
+    relative = estimate(roll_sampler('10d10'), precision=0.01, relative=True,
+                        rng=NumpyRNG(1))
+    assert relative.half_width <= 0.01 * relative.mean
+
+    capped = estimate(roll_sampler('1d100'), precision=0.001,
+                      batch_size=100, max_samples=1000, rng=NumpyRNG(1))
+    assert capped.samples == 1000
+    assert not capped.converged
+
+    constant = estimate(roll_sampler('1d1+4'), rng=NumpyRNG(1))
+    assert constant.mean == 5 and constant.samples == 4096
+
+    with pytest.raises(ValueError):
+        estimate(roll_sampler('1d6'), confidence=1.)
+
+
+def test_estimate_attack():
+    hero = Character('hero', hit_dice=roll_dice('5d8'), level=5,
+                     str_score=18)
+    dummy = Character('dummy', hit_dice=roll_dice('5d8'), level=5)
+    hero.wield_main(longsword)
+
+    # Hits on 7 or better: STR +4 (and no proficiency) against AC 10.
+    hits = estimate(attack_sampler(hero, dummy, 'hit'), precision=0.01,
+                    batch_size=1000, rng=NumpyRNG(2))
+    assert hits.converged
+    assert hits.mean == pytest.approx(0.7, abs=0.02)
+
+    hero.wield_main(javelin)
+    thrown = estimate(attack_sampler(hero, dummy, distance=30),
+                      precision=0.1, batch_size=500, rng=NumpyRNG(2))
+    assert thrown.mean > 0
+    assert hero.wielding[0] is javelin
+
+    with pytest.raises(ValueError):
+        attack_sampler(hero, dummy, 'kill')
@@ -0,0 +1,161 @@
+import random
+import threading
+
+import pytest
+
+from . import Character, roll, roll_batch, roll_dice, reroll_if
+from .rng import (DiceRNG, NumpyRNG, PooledRNG, PythonRNG, get_rng,
+                  use_rng)
+from .srd_weapons import longsword
+
+
+def test_python_rng():
+    random.seed(1234)
+    first = [roll_dice('4d6').total for _ in range(10)]
+    random.seed(1234)
+    assert [roll_dice('4d6').total for _ in range(10)] == first
+
+    rng = PythonRNG.from_seed(99)
+    faces = [rng.randint(6) for _ in range(1000)]
+    assert set(faces) == {1, 2, 3, 4, 5, 6}
+    rng = PythonRNG.from_seed(99)
+    assert [rng.randint(6) for _ in range(1000)] == faces
+
+
+@pytest.mark.parametrize('bit_generator', ['pcg64', 'philox'])
+def test_numpy_rng(bit_generator):
+    def totals(rng):
+        return ([roll_dice('4d6dl', rng=rng).total for _ in range(20)] +
+                [int(die) for die in roll('3d8', rng=rng)] +
+                [int(die) for die in reroll_if(roll('3d2', rng=rng), 'x==1',
+                                               rng=rng)] +
+                roll_batch('2d20', 5, summed=True, rng=rng).tolist())
+
+    first = totals(NumpyRNG(42, bit_generator=bit_generator))
+    assert totals(NumpyRNG(42, bit_generator=bit_generator)) == first
+    assert totals(NumpyRNG(43, bit_generator=bit_generator)) != first
+
+    with pytest.raises(ValueError):
+        NumpyRNG(42, bit_generator='mersenne')
+
+
+# Chi-square critical values at p = 0.001, by degrees of freedom
+CHI_SQUARE_CRITICAL = {3: 16.266, 5: 20.515, 6: 22.458, 19: 43.820,
+                       99: 148.230}
+
+
+def chi_square(counts, expected):
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+def homogeneity(counts_a, counts_b):
+    """Two-sample chi-square statistic: do both come from one die?"""
+    total_a, total_b = sum(counts_a), sum(counts_b)
+    statistic = 0.
+    for a, b in zip(counts_a, counts_b):
+        both = a + b
+        expected_a = both * total_a / (total_a + total_b)
+        expected_b = both * total_b / (total_a + total_b)
+        statistic += (a - expected_a) ** 2 / expected_a
+        statistic += (b - expected_b) ** 2 / expected_b
+    return statistic
+
+
+@pytest.mark.parametrize('sides', [4, 6, 7, 20, 100])
+def test_pooled_rng_uniformity(sides):
+    draws = 200 * sides
+    pooled = PooledRNG(2024, block_size=1000)
+    reference = PythonRNG.from_seed(2024)
+
+    pooled_counts = [0] * sides
+    reference_counts = [0] * sides
+    for _ in range(draws):
+        pooled_counts[pooled.randint(sides) - 1] += 1
+        reference_counts[reference.randint(sides) - 1] += 1
+    bulk_counts = PooledRNG(2025).faces(sides, (draws, 2)) \
+        .flatten().tolist()
+    bulk_counts = [bulk_counts.count(face) for face in range(1, sides + 1)]
+
+    critical = CHI_SQUARE_CRITICAL[sides - 1]
+    assert chi_square(pooled_counts, draws / sides) < critical
+    assert chi_square(bulk_counts, 2 * draws / sides) < critical
+    assert homogeneity(pooled_counts, reference_counts) < critical
+    assert homogeneity(bulk_counts, reference_counts) < critical
+
+
+def test_incomplete_rng():
+    class FacelessRNG(DiceRNG):
+        def randint(self, die_max_value):
+            return 1
+
+    with pytest.raises(TypeError):
+        FacelessRNG()
+
+
+def test_pooled_rng():
+    rng = PooledRNG(3, block_size=10)
+    faces = [rng.randint(20) for _ in range(1000)]
+    assert min(faces) == 1 and max(faces) == 20
+    rng = PooledRNG(3, block_size=10)
+    assert [rng.randint(20) for _ in range(1000)] == faces
+    assert PooledRNG(3).faces(6, (10, 4), dtype='uint8').shape == (10, 4)
+    assert all(isinstance(child, PooledRNG) for child in rng.spawn(2))
+    faces = PooledRNG(3).faces(1 << 16, 1000)
+    assert 1 <= faces.min() and faces.max() <= 1 << 16
+    assert faces.max() > 1 << 15
+    faces = PooledRNG(3).faces(1 << 40, 1000)
+    assert 1 <= faces.min() and faces.max() <= 1 << 40
+    assert 1 <= rng.randint(1 << 16) <= 1 << 16
+    assert 1 <= rng.randint(1 << 40) <= 1 << 40
+    with pytest.raises(ValueError):
+        rng.randint(0)
+    with pytest.raises(ValueError):
+        rng.faces(0, 10)
+    with use_rng(PooledRNG(3)):
+        assert 3 <= roll_dice('3d6').total <= 18
+
+
+def test_worker_streams():
+    a, b = NumpyRNG(7).spawn(2)
+    assert a.faces(20, 50).tolist() != b.faces(20, 50).tolist()
+    a_again = NumpyRNG(7).spawn(2)[0]
+    assert a_again.faces(20, 50).tolist() == NumpyRNG(7).spawn(2)[0] \
+        .faces(20, 50).tolist()
+
+    worker_3 = NumpyRNG.for_worker(7, 3).faces(100, 20).tolist()
+    assert NumpyRNG.for_worker(7, 3).faces(100, 20).tolist() == worker_3
+    assert NumpyRNG.for_worker(7, 4).faces(100, 20).tolist() != worker_3
+
+
+def test_use_rng():
+    default = get_rng()
+    seen = {}
+
+    def worker(index):
+        with use_rng(NumpyRNG.for_worker(5, index)) as rng:
+            assert get_rng() is rng
+            seen[index] = [roll_dice('1d20').total for _ in range(20)]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert get_rng() is default
+    with use_rng(NumpyRNG.for_worker(5, 2)):
+        assert [roll_dice('1d20').total for _ in range(20)] == seen[2]
+    assert get_rng() is default
+
+
+def test_attack_rng():
+    def swings(rng):
+        hero = Character('hero', hit_dice=roll_dice('5d8'), level=5,
+                         str_score=18)
+        dummy = Character('dummy', hit_dice=roll_dice('5d8'), level=5)
+        hero.wield_main(longsword)
+        return [(result.hit_type, result.damage)
+                for result in (hero.attack(dummy, rng=rng)
+                               for _ in range(30))]
+
+    assert swings(NumpyRNG(11)) == swings(NumpyRNG(11))
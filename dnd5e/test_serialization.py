@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from . import Character, roll_dice
+from .enemies import kobold
+from .items import (Armor, ArmorType, MartialWeapon, Weapon,
+                    WeaponDamageType, WeaponType)
+from .serialization import (CHARACTER_RECORD, DIE, SCHEMA_VERSION,
+                            SRD_ARMOR, SRD_WEAPONS, dumps, loads)
+from .srd_armor import chain_mail
+from .srd_weapons import javelin, longsword, shortsword
+
+
+def hero():
+    character = Character('Hero', 'elf', 'fighter', armor=chain_mail,
+                          level=3, hit_dice=roll_dice('3d10') + 2,
+                          wounds=4, include_stats_in_AC=('wis',),
+                          proficiencies=[ArmorType.HEAVY,
+                                         WeaponType.MARTIAL],
+                          str_score=17, dex_bonus=2)
+    character.WIS.base_value = 0
+    character.proficiencies.append(character.STR)
+    character.wield_main(longsword)
+    character.wield_off(shortsword)
+    return character
+
+
+def test_character_round_trip():
+    character = hero()
+    data = dumps(character)
+    assert len(data) < len(repr(character)) / 4
+    loaded = loads(data)
+    assert repr(loaded) == repr(character)
+    assert loaded.wielding == character.wielding
+    assert loaded.wielding[0] is longsword
+    assert loaded.armor is chain_mail
+    assert loaded.hit_dice == character.hit_dice
+    assert loaded.hit_dice.total == character.hit_dice.total
+    assert loaded.WIS.base_value == 0
+    assert loaded.proficiencies[-1] is loaded.STR
+    assert (loaded.AC, loaded.hp, loaded.hp_status) == \
+        (character.AC, character.hp, character.hp_status)
+    assert repr(loads(dumps(Character()))) == repr(Character())
+
+
+def test_items_round_trip():
+    boomstick = MartialWeapon('Boomstick', '2d6', None,
+                              WeaponDamageType.PIERCING,
+                              range_increment=(30, 90), requires_ammo=True)
+    loaded = loads(dumps(boomstick))
+    assert type(loaded) is MartialWeapon
+    assert repr(loaded) == repr(boomstick)
+    assert loads(dumps(javelin)).range_increment == javelin.range_increment
+    for item in SRD_ARMOR + SRD_WEAPONS:
+        assert repr(loads(dumps(item))) == repr(item)
+    loaded = loads(dumps([Armor('Mithral', 13, ArmorType.MEDIUM, 0)]))
+    assert loaded == [Armor('Mithral', 13, ArmorType.MEDIUM, 0)]
+
+
+def test_bulk():
+    axe = Weapon('Big axe', '1d12', damage_type=WeaponDamageType.SLASHING)
+    horde = []
+    for i in range(100):
+        orc = Character('orc', hit_dice=roll_dice('2d8'), level=2)
+        orc.wield_main(axe)
+        horde.append(orc)
+    data = dumps(horde + [kobold])
+    # Names and the axe are written once for the whole horde.
+    assert len(dumps(horde)) - len(dumps(horde[:-1])) == \
+        CHARACTER_RECORD.size + 2 * DIE.size
+    loaded = loads(data)
+    assert len(loaded) == 101
+    assert loaded[0].wielding[0] is loaded[99].wielding[0]
+    assert repr(loaded[0].wielding[0]) == repr(axe)
+    assert [c.hp for c in loaded] == [c.hp for c in horde + [kobold]]
+    assert loads(dumps([])) == []
+
+
+def test_bad_dumps():
+    with pytest.raises(ValueError):
+        dumps([longsword, chain_mail])
+    with pytest.raises(ValueError):
+        dumps('hero')
+    with pytest.raises(ValueError):
+        dumps(Character(hit_dice=roll_dice('1d70000'), level=1))
+
+    data = dumps(hero())
+    with pytest.raises(ValueError):
+        loads(b'nope' + data[4:])
+    with pytest.raises(ValueError):
+        loads(data[:4] + bytes([SCHEMA_VERSION + 1]) + data[5:])
+    with pytest.raises(ValueError):
+        loads(data[:-5])
+
+    # 0xFF means no strength requirement at all.
+    with pytest.raises(ValueError):
+        dumps(Armor('Lead plate', 20, ArmorType.HEAVY, 255))
+    assert loads(dumps(Armor('Plate', 18, ArmorType.HEAVY, 254))) \
+        .min_str_requirement == 254
+
+
+def test_corrupt_dumps():
+    rng = random.Random(5)
+    dumped = [dumps(hero()), dumps([hero(), kobold]),
+              dumps([longsword, javelin]), dumps(chain_mail)]
+    for _ in range(3000):
+        data = bytearray(rng.choice(dumped))
+        for _ in range(3):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+        try:
+            loads(bytes(data))
+        except ValueError:
+            pass
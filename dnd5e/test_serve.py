@@ -0,0 +1,162 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+from .dicerolls import DicePlan, compile_dice
+from .rng import NumpyRNG
+from . import serve
+from .serve import RollService
+
+
+def verify(response):
+    totals = compile_dice(response['roll']).roll_totals(
+        response['batch_size'], NumpyRNG(response['seed']))
+    offset = response['offset']
+    return totals[offset:offset + len(response['totals'])].tolist() == \
+        response['totals']
+
+
+def test_requests_are_batched():
+    async def main():
+        service = RollService()
+        requests = [{'id': i, 'roll': '4d6kh3' if i % 2 else '1d20',
+                     'count': 1 + i % 3} for i in range(200)]
+        responses = await asyncio.gather(*map(service.handle, requests))
+        return service, responses
+
+    service, responses = asyncio.run(main())
+    assert [response['id'] for response in responses] == list(range(200))
+    assert all(len(response['totals']) == 1 + i % 3
+               for i, response in enumerate(responses))
+    assert all(map(verify, responses))
+    assert service.stats.batches == 2
+    assert service.stats.requests == 200
+    assert service.stats.rolls == sum(1 + i % 3 for i in range(200))
+    assert len({response['seed'] for response in responses}) == 2
+
+
+def test_bad_requests():
+    async def main():
+        service = RollService()
+        lines = [b'not json', b'[1, 2]', b'{"id": 1}',
+                 b'{"id": 2, "roll": "1d6-1d4"}',
+                 b'{"id": 3, "roll": "1d6", "count": 0}',
+                 b'{"id": 4, "stats": true}']
+        answers = [json.loads(await service.handle_line(line))
+                   for line in lines]
+        return service, answers
+
+    service, answers = asyncio.run(main())
+    assert all('error' in answer for answer in answers[:5])
+    assert answers[5]['stats']['errors'] == 5
+    assert service.stats.errors == 5
+
+
+def test_bad_expressions(monkeypatch):
+    async def main(requests):
+        service = RollService()
+        answers = await asyncio.wait_for(
+            asyncio.gather(*map(service.handle, requests)), 5)
+        return service, answers
+
+    requests = [{'id': 1, 'roll': '1d0'}, {'id': 2, 'roll': '99999999999d6'},
+                {'id': 3, 'roll': '1d6'}]
+    service, answers = asyncio.run(main(requests))
+    assert ['error' in answer for answer in answers] == [True, True, False]
+    assert service.stats.batches == 1
+
+    def broken(self, n, rng=None):
+        raise RuntimeError('out of dice')
+
+    # A batch that fails answers everyone waiting on it.
+    monkeypatch.setattr(DicePlan, 'roll_totals', broken)
+    service, answers = asyncio.run(main([{'id': i, 'roll': '2d6'}
+                                         for i in range(5)]))
+    assert [answer['error'] for answer in answers] == ['out of dice'] * 5
+    assert service.stats.errors == 5
+
+
+def test_batch_limit(monkeypatch):
+    monkeypatch.setattr(serve, 'MAX_BATCH_DICE', 40)
+
+    async def main():
+        service = RollService()
+        requests = [{'id': i, 'roll': '4d6', 'count': 3} for i in range(10)]
+        responses = await asyncio.gather(*map(service.handle, requests))
+        return service, responses
+
+    service, responses = asyncio.run(main())
+    assert all(map(verify, responses))
+    # Three requests, 36 dice, fit in a batch; a fourth would not.
+    assert service.stats.batches == 4
+    assert max(response['batch_size'] for response in responses) == 9
+
+
+def test_stream_drains():
+    class SlowWriter:
+        def __init__(self):
+            self.lines = []
+            self.unsent = 0
+            self.most_unsent = 0
+
+        def write(self, data):
+            self.lines.append(data)
+            self.unsent += 1
+            self.most_unsent = max(self.most_unsent, self.unsent)
+
+        async def drain(self):
+            await asyncio.sleep(0)
+            self.unsent = 0
+
+    async def main():
+        reader = asyncio.StreamReader()
+        for i in range(100):
+            reader.feed_data(json.dumps({'id': i, 'roll': '1d6'}).encode() +
+                             b'\n')
+        reader.feed_eof()
+        writer = SlowWriter()
+        await RollService().serve_stream(reader, writer)
+        return writer
+
+    writer = asyncio.run(main())
+    assert len(writer.lines) == 100
+    assert writer.most_unsent == 1
+
+
+def test_tcp_clients():
+    async def client(port, i):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for j in range(3):
+            writer.write(json.dumps({'id': j, 'roll': '2d6+1'}).encode() +
+                         b'\n')
+        writer.write_eof()
+        answers = [json.loads(line) async for line in reader]
+        writer.close()
+        return answers
+
+    async def main():
+        service = RollService(window=0.01)
+        server = await service.serve_tcp('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            results = await asyncio.gather(*(client(port, i)
+                                             for i in range(50)))
+        return service, results
+
+    service, results = asyncio.run(main())
+    assert all(sorted(answer['id'] for answer in answers) == [0, 1, 2]
+               for answers in results)
+    assert all(verify(answer) for answers in results for answer in answers)
+    assert service.stats.batches < service.stats.requests
+
+
+def test_stdin():
+    requests = b''.join(json.dumps({'id': i, 'roll': '1d8'}).encode() + b'\n'
+                        for i in range(5))
+    output = subprocess.run([sys.executable, '-m', 'dnd5e.serve', '--stdin'],
+                            input=requests, capture_output=True, timeout=30,
+                            check=True).stdout
+    answers = [json.loads(line) for line in output.splitlines()]
+    assert sorted(answer['id'] for answer in answers) == list(range(5))
+    assert all(verify(answer) for answer in answers)
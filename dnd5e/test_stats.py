@@ -0,0 +1,105 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from . import Character, roll_batch, roll_dice, roll_stream
+from .characters import HitType
+from .rng import NumpyRNG
+from .srd_weapons import longsword
+from .stats import (Accumulator, AttackStats, FaceHistogram, QuantileSketch,
+                    RollStats, RunningStats)
+
+
+def test_running_stats():
+    values = np.random.default_rng(1).normal(10, 3, size=5000)
+    stats = RunningStats()
+    for value in values[:2000]:
+        stats.add(value)
+    other = RunningStats().add_many(values[2000:])
+    stats.merge(other)
+    assert stats.count == 5000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var())
+    assert stats.sample_variance == pytest.approx(values.var(ddof=1))
+    assert stats.minimum == values.min()
+    assert stats.maximum == values.max()
+
+    empty = RunningStats()
+    assert empty.merge(RunningStats()).count == 0
+    assert empty.variance == 0.
+
+
+def test_incomplete_accumulator():
+    class Counter(Accumulator):
+        def add(self, value):
+            return self
+
+    with pytest.raises(TypeError):
+        Counter()
+
+
+def test_face_histogram():
+    histogram = FaceHistogram()
+    histogram.add(roll_dice('2d6+1d4'))
+    assert histogram.counts[6].sum() == 2
+    assert histogram.counts[4].sum() == 1
+
+    other = FaceHistogram().add_faces(6, roll_batch('4d6', 1000))
+    histogram.merge(other)
+    assert histogram.counts[6].sum() == 4002
+    assert histogram.counts[6][0] == 0
+    assert histogram.frequencies(6) == pytest.approx([1 / 6] * 6, abs=0.03)
+
+
+def test_quantile_sketch():
+    values = np.random.default_rng(2).permutation(100000)
+    sketches = [QuantileSketch(capacity=128, seed=i).add_many(chunk)
+                for i, chunk in enumerate(np.array_split(values, 4))]
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+
+    assert sketch.count == 100000
+    assert sum(map(len, sketch.levels)) < 128 * len(sketch.levels)
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == pytest.approx(q * 100000, abs=3000)
+
+    with pytest.raises(ValueError):
+        QuantileSketch().quantile(0.5)
+
+
+def test_roll_stats():
+    stats = RollStats()
+    results = list(stats.observe(roll_dice('3d6') for _ in range(500)))
+    assert len(results) == 500
+    for chunk in roll_stream('3d6', chunk_size=500, chunks=4,
+                             rng=NumpyRNG(3)):
+        stats.add_totals(chunk)
+
+    assert stats.totals.count == 2500
+    assert stats.faces.counts[6].sum() == 1500
+    assert stats.totals.mean == pytest.approx(10.5, abs=0.3)
+    assert 9 <= stats.quantiles.quantile(0.5) <= 12
+
+    merged = pickle.loads(pickle.dumps(stats)).merge(stats)
+    assert merged.totals.count == 5000
+
+
+def test_attack_stats():
+    hero = Character('hero', hit_dice=roll_dice('5d8'), level=5,
+                     str_score=18)
+    dummy = Character('dummy', hit_dice=roll_dice('5d8'), level=5)
+    hero.wield_main(longsword)
+
+    stats = AttackStats()
+    for seed in range(300):
+        stats.add(hero.attack(dummy, rng=NumpyRNG(seed)))
+    assert stats.attacks == 300
+    assert sum(stats.outcomes.values()) == 300
+    assert stats.outcomes[HitType.FULL] >= stats.critical_hits > 0
+    assert 0 < stats.hit_rate < 1
+    assert stats.d20.counts[20].sum() == 300
+    assert stats.damage.count == 300
+
+    assert AttackStats().merge(stats).attacks == 300
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from . import Character, roll_dice
+from .dicerolls import DiceResult
+from .items import ArmorType, WeaponType
+from .srd_armor import chain_mail, half_plate, leather_armor
+from .srd_weapons import dagger, greatsword, longsword
+from .tables import HP_STATUSES, CharacterTable
+
+
+def random_characters(count, seed=3):
+    rng = random.Random(seed)
+    characters = []
+    for i in range(count):
+        level = rng.randint(1, 12)
+        hit_dice = roll_dice('%id8' % level) if rng.random() < .9 else None
+        character = Character(
+            'c%i' % i, level=level, hit_dice=hit_dice,
+            armor=rng.choice((leather_armor, half_plate, chain_mail, None,
+                              None)),
+            uses_shield=rng.random() < .3,
+            include_stats_in_AC=rng.choice(((), ('wisdom',),
+                                            ('con', 'dex', 'Wis'),
+                                            ('bogus',))),
+            str_score=rng.randint(3, 20), dex_score=rng.randint(3, 20),
+            con_score=rng.randint(3, 20), wis_score=rng.randint(3, 20),
+            dex_bonus=rng.randint(-2, 2))
+        character.wounds = rng.randint(0, max(character.maxhp, 1))
+        characters.append(character)
+    return characters
+
+
+def test_vectorized_stats():
+    characters = random_characters(2000)
+    table = CharacterTable.from_characters(characters)
+    assert len(table) == 2000
+    assert table.AC.tolist() == [c.AC for c in characters]
+    assert table.maxhp.tolist() == [c.maxhp for c in characters]
+    assert table.hp.tolist() == [c.hp for c in characters]
+    assert np.allclose(table.hp_percent, [c.hp_percent for c in characters])
+    assert table.hp_status.tolist() == [c.hp_status for c in characters]
+    assert table.proficiency_bonus.tolist() == \
+        [c.proficiency_bonus for c in characters]
+    assert table.modifiers[:, 1].tolist() == \
+        [c.DEX.modifier for c in characters]
+    assert (table.alive == (table.hp >= 1)).all()
+    assert HP_STATUSES[table.hp_status_codes[0]] == characters[0].hp_status
+
+    table.wounds[:] = 0
+    assert set(table.hp_status[table.maxhp > 0]) == {'unscathed'}
+
+
+def test_round_trip():
+    hero = Character('hero', 'human', 'fighter', armor=half_plate,
+                     uses_shield=True, level=3, hit_dice=roll_dice('3d10'),
+                     wounds=4, proficiencies=[ArmorType.MEDIUM,
+                                              WeaponType.MARTIAL],
+                     str_score=16, str_bonus=2, dex_score=14)
+    hero.wield_main(longsword)
+    brute = Character('brute', hit_dice=roll_dice('2d12'), level=2)
+    brute.wield_main(greatsword)
+    rogue = Character('rogue', include_stats_in_AC=('dexterity',))
+    rogue.wield_main(dagger)
+    rogue.wield_off(dagger)
+
+    characters = [hero, brute, rogue]
+    table = CharacterTable.from_characters(characters)
+    assert len(table.weapons) == 3
+    assert table.proficiencies.tolist() == [
+        c.proficiencies.mask for c in characters]
+    for original, copy in zip(characters, table.to_characters()):
+        assert repr(copy) == repr(original).replace(
+            repr(original.hit_dice), repr(copy.hit_dice))
+        assert sum(copy.hit_dice or ()) == sum(original.hit_dice or ())
+        assert copy.wielding == original.wielding
+        assert copy.uses_shield == original.uses_shield
+        assert copy.AC == original.AC
+        assert copy.hp_status == original.hp_status
+
+    table[2] = hero
+    assert table[2].name == 'hero'
+    assert table.armor[2] == table.armor[0]
+
+    giant = Character('giant', hit_dice=DiceResult.from_faces(300, (1, 1)),
+                      level=2)
+    table[2] = giant
+    assert list(table[2].hit_dice.int_results) == [1, 1]
+    assert list(table[2].hit_dice.die_max_values) == [300, 300]
+    with pytest.raises(ValueError):
+        table[2] = Character('titan', level=1,
+                             hit_dice=DiceResult.from_faces(1 << 16, (1,)))
+
+
+def test_compact():
+    table = CharacterTable.from_characters(random_characters(10) * 10000)
+    assert len(table) == 100000
+    assert table.nbytes < 10 * 1024 * 1024
+    assert len(table.armors) <= 3
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+from . import Character, roll_batch, roll_dice
+from .rng import NumpyRNG
+from .srd_weapons import longsword
+from .tape import (TAPE_MAGIC, RecordingRNG, TapeRNG, record_rolls,
+                   replay_rolls)
+
+
+def fight():
+    hero = Character('hero', hit_dice=roll_dice('5d8'), level=5,
+                     str_score=18)
+    dummy = Character('dummy', hit_dice=roll_dice('5d8'), level=5)
+    hero.wield_main(longsword)
+    swings = [hero.attack(dummy, with_advantage=bool(i % 2))
+              for i in range(50)]
+    return ([(swing.hit_type, swing.damage) for swing in swings] +
+            [roll_dice('4d6', rerolling_if='x==1').total] +
+            roll_batch('3d6', 10, rerolling_if='x<3').tolist())
+
+
+def test_record_and_replay(tmp_path):
+    tape_path = tmp_path / 'fight.tape'
+    with record_rolls(tape_path, NumpyRNG(8)) as recorder:
+        recorded = fight()
+    assert recorder.draws > 50
+    assert tape_path.stat().st_size == 8 + 2 * recorder.draws
+
+    with replay_rolls(tape_path) as player:
+        assert len(player) == recorder.draws
+        assert fight() == recorded
+        assert player.remaining == 0
+        with pytest.raises(EOFError):
+            roll_dice('1d6')
+        records = player.records
+    # Views outlive the tape they came from.
+    assert records.shape == (recorder.draws, 2)
+
+    bad_path = tmp_path / 'bad.tape'
+    bad_path.write_bytes(b'DNDLOG\x00\x01 and more')
+    with pytest.raises(ValueError):
+        TapeRNG(bad_path)
+
+
+def test_tape_mismatch():
+    tape_file = io.BytesIO()
+    recorder = RecordingRNG(tape_file, NumpyRNG(1))
+    faces = [recorder.randint(6) for _ in range(3)]
+    recorder.faces(20, (2, 2))
+    recorder.close()
+
+    player = TapeRNG(tape_file.getvalue())
+    assert [player.randint(6) for _ in range(3)] == faces
+    with pytest.raises(ValueError):
+        player.faces(6, 4)
+    assert player.faces(20, (2, 2)).shape == (2, 2)
+
+    player = TapeRNG(tape_file.getvalue())
+    with pytest.raises(ValueError):
+        player.randint(8)
+
+    with pytest.raises(ValueError):
+        TapeRNG(b'not a tape')
+    with pytest.raises(ValueError, match='Truncated'):
+        TapeRNG(tape_file.getvalue()[:-1])
+
+    empty = TapeRNG(TAPE_MAGIC)
+    with pytest.raises(EOFError):
+        roll_dice('1d6', rng=empty)
+    with pytest.raises(EOFError):
+        roll_batch('1d6', 1, rng=empty)
+
+    with pytest.raises(ValueError):
+        recorder.randint(1000)